@@ -0,0 +1,33 @@
+"""
+Query backends: the execution engines underneath app/utils/analytics.py and
+app/utils/helpers.apply_filter.
+
+A backend supplies a few primitives over a DataFrame slice (structured-filter
+masks, date-filter masks, grouped aggregation and calendar-part counts); the analytics layer keeps
+turning their output into GraphData/TableData, so every backend returns the
+same models. Select one with the QUERY_BACKEND setting.
+"""
+from importlib import import_module
+
+from app.core.config import settings
+from .base import QueryBackend
+
+# name -> "module:class", imported on first use so optional engines stay optional
+BACKENDS = {
+    "pandas": "app.backends.pandas_backend:PandasBackend",
+    "duckdb": "app.backends.duckdb_backend:DuckDBBackend",
+    "polars": "app.backends.polars_backend:PolarsBackend",
+}
+
+_instances = {}
+
+
+def get_backend(name: str = None) -> QueryBackend:
+    """Return the (shared) backend instance for name, defaulting to QUERY_BACKEND."""
+    name = name or settings.QUERY_BACKEND
+    if name not in _instances:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown query backend: '{name}'")
+        module_name, class_name = BACKENDS[name].split(":")
+        _instances[name] = getattr(import_module(module_name), class_name)()
+    return _instances[name]
@@ -0,0 +1,85 @@
+import numbers
+from datetime import date
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+# Operators whose values only make sense against a column of a compatible type
+ORDERING_OPERATORS = {"greater_than", "greater_than_equals", "less_than", "less_than_equals", "between"}
+
+
+def comparable(dtype, value) -> bool:
+    """
+    Whether a column of dtype holds values pandas could find equal to value:
+    numbers for numeric and boolean columns, strings and dates for datetime
+    columns, strings for everything else. Equality filters with anything else
+    match nothing (not_equals / not_in: everything), and ordering filters are
+    an error, on every backend.
+    """
+    if value is None:
+        return False
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        return isinstance(value, numbers.Number)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return isinstance(value, (str, date))
+    return isinstance(value, str)
+
+
+def check_ordering(dtype, column: str, op: str, values) -> None:
+    """Raise ValueError if an ordering filter compares column with an incomparable value."""
+    for value in values:
+        if not comparable(dtype, value):
+            raise ValueError(f"Cannot compare column '{column}' with {value!r} using '{op}'")
+
+
+class QueryBackend:
+    """Interface implemented by every query backend."""
+
+    name = "base"
+
+    def filter_mask(self, df: pd.DataFrame, filter_obj: dict) -> pd.Series:
+        """
+        Evaluate a structured filter ({"and"/"or"/"not": ...} or a
+        {"column", "operator", "value"} leaf) to a boolean mask aligned with df.
+
+        Missing values follow pandas semantics on every backend: a comparison
+        against a missing value is false, except not_equals / not_in, which
+        are true; the mask itself never holds nulls. An empty "and" is true,
+        an empty "or" false.
+
+        Raises:
+            ValueError: On unknown columns or operators, or an ordering
+                operator with a value the column cannot be compared with
+        """
+        raise NotImplementedError
+
+    def apply_date_filters(self, df: pd.DataFrame, year=None, month=None, week=None, day=None,
+                           range_days=None, start_date=None, end_date=None) -> pd.DataFrame:
+        """Return the rows of a date-prepared frame that match the date filters."""
+        raise NotImplementedError
+
+    def aggregate(self, df: pd.DataFrame, keys: List[str],
+                  aggs: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        """
+        Group df by keys and compute named aggregations {name: (column, func)},
+        func being one of sum, count, mean, min, max, std, nunique or first
+        (the first non-null value in row order). Float sums and means may
+        differ from pandas in the last bits: each engine adds in its own order.
+
+        Returns one row per key combination (null keys dropped), ordered by the
+        keys, with the key columns followed by the named results.
+        """
+        raise NotImplementedError
+
+
+    def date_part_counts(self, df: pd.DataFrame, parts: List[str],
+                         count_col: str = "transaction_id") -> Dict[str, pd.DataFrame]:
+        """
+        Count non-null count_col values per calendar part of `date`, for each
+        of parts: day_of_week, hour_of_day, month_of_year (English names),
+        quarter_of_year ("Q1".."Q4") or date (the calendar day).
+
+        Returns {part: frame of [part, "transaction_count"]} ordered by the part
+        value, missing dates dropped.
+        """
+        raise NotImplementedError
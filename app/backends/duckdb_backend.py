@@ -0,0 +1,191 @@
+"""
+Embedded DuckDB backend.
+
+Runs in-process (no server): each call registers the DataFrame slice it is
+given as a DuckDB relation, compiles structured and date filters into SQL
+predicates and lets DuckDB's vectorised, multi-threaded engine evaluate them
+or aggregate. Masks are read back in row order (DuckDB preserves insertion
+order for projections), so pandas keeps selecting the rows and every
+downstream step sees exactly the frame the pandas backend would produce.
+"""
+import os
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.partitions import date_bounds
+from .base import ORDERING_OPERATORS, QueryBackend, check_ordering, comparable
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+COMPARISONS = {
+    "equals": "=",
+    "greater_than": ">",
+    "greater_than_equals": ">=",
+    "less_than": "<",
+    "less_than_equals": "<=",
+}
+
+ROW_NUMBER = "__row"    # row position column added for order-sensitive aggregations
+
+SQL_AGGREGATIONS = {
+    "sum": "sum({})",
+    "count": "count({})",
+    "mean": "avg({})",
+    "min": "min({})",
+    "max": "max({})",
+    "std": "stddev_samp({})",
+    "nunique": "count(DISTINCT {})",
+    "first": 'arg_min({0}, "__row") FILTER (WHERE {0} IS NOT NULL)',   # first non-null, in ROW_NUMBER order
+}
+
+DATE_PARTS = {
+    "day_of_week": 'dayname("date")',
+    "hour_of_day": 'hour("date")',
+    "month_of_year": 'monthname("date")',
+    "quarter_of_year": "'Q' || quarter(\"date\")",
+    "date": 'CAST("date" AS DATE)',
+}
+
+
+def quote(identifier: str) -> str:
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def compile_filter(filter_obj: dict, dtypes: pd.Series) -> Tuple[str, list]:
+    """
+    Compile a structured filter to a null-free SQL boolean expression, with
+    the semantics of QueryBackend.filter_mask.
+
+    Returns:
+        (sql, params) with positional `?` parameters
+    """
+    if 'and' in filter_obj or 'or' in filter_obj:
+        joiner, subs, empty = (" AND ", filter_obj['and'], "true") if 'and' in filter_obj \
+            else (" OR ", filter_obj['or'], "false")
+        parts = [compile_filter(f, dtypes) for f in subs]
+        if not parts:
+            return empty, []
+        return "(" + joiner.join(sql for sql, _ in parts) + ")", [p for _, ps in parts for p in ps]
+
+    if 'not' in filter_obj:
+        sql, params = compile_filter(filter_obj['not'], dtypes)
+        return f"(NOT {sql})", params
+
+    col = filter_obj['column']
+    op = filter_obj['operator']
+    val = filter_obj['value']
+
+    if col not in dtypes:
+        raise ValueError(f"Unsupported column: '{col}'")
+
+    c = quote(col)
+    dtype = dtypes[col]
+    if op in ORDERING_OPERATORS:
+        check_ordering(dtype, col, op, val if op == 'between' else [val])
+    if op == 'equals' and not comparable(dtype, val):
+        return "false", []
+    if op in COMPARISONS:
+        return f"coalesce({c} {COMPARISONS[op]} ?, false)", [val]
+    elif op == 'not_equals':
+        return (f"({c} IS DISTINCT FROM ?)", [val]) if comparable(dtype, val) else ("true", [])
+    elif op == 'between':
+        return f"coalesce({c} BETWEEN ? AND ?, false)", [val[0], val[1]]
+    elif op in ('in', 'not_in'):
+        values = [v for v in val if comparable(dtype, v)]
+        sql = f"coalesce({c} IN ({', '.join('?' * len(values))}), false)" if values else "false"
+        return (sql if op == 'in' else f"(NOT {sql})"), values
+    else:
+        raise ValueError(f"Unsupported operator: '{op}' for column '{col}'")
+
+
+def compile_date_filters(year=None, month=None, week=None, day=None,
+                         range_days=None, start_date=None, end_date=None) -> Tuple[str, list]:
+    """Compile the date filters of _apply_date_filters into one SQL predicate."""
+    conditions, params = [], []
+    start, end = date_bounds(range_days, start_date, end_date)
+    if start is not None:
+        conditions.append('"date" BETWEEN ? AND ?')
+        params += [start.to_pydatetime(), end.to_pydatetime()]
+    for column, value in (("year", year), ("month", month), ("week", week), ("day", day)):
+        if value is not None:
+            conditions.append(f"{quote(column)} = ?")
+            params.append(value)
+    # Rows without a date never match, as in pandas
+    return (f"coalesce({' AND '.join(conditions)}, false)" if conditions else "true"), params
+
+
+class DuckDBBackend(QueryBackend):
+    """Evaluates filters and aggregations with an embedded DuckDB database."""
+
+    name = "duckdb"
+
+    def __init__(self):
+        if duckdb is None:
+            raise RuntimeError("QUERY_BACKEND=duckdb needs duckdb; install it with `pip install duckdb`")
+        threads = settings.DUCKDB_THREADS or os.cpu_count() or 1
+        self._db = duckdb.connect(config={"threads": threads, "preserve_insertion_order": True})
+        self._local = threading.local()
+
+    def _cursor(self):
+        """A connection per thread; DuckDB connections are not thread-safe."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self._db.cursor()
+        return cursor
+
+    def _fetch(self, df: pd.DataFrame, sql: str, params: list, numpy: bool = False):
+        """Run sql against df (visible as `tx`) and fetch the result."""
+        cursor = self._cursor()
+        cursor.register("tx", df)
+        try:
+            result = cursor.execute(sql, params)
+            return result.fetchnumpy() if numpy else result.df()
+        finally:
+            cursor.unregister("tx")
+
+    def _mask(self, df: pd.DataFrame, predicate: str, params: list) -> pd.Series:
+        keep = self._fetch(df, f"SELECT {predicate} AS keep FROM tx", params, numpy=True)["keep"]
+        return pd.Series(keep.astype(bool), index=df.index)
+
+    def filter_mask(self, df, filter_obj):
+        sql, params = compile_filter(filter_obj, df.dtypes)
+        return self._mask(df, sql, params)
+
+    def apply_date_filters(self, df, year=None, month=None, week=None, day=None,
+                           range_days=None, start_date=None, end_date=None):
+        sql, params = compile_date_filters(year, month, week, day, range_days, start_date, end_date)
+        if not params:
+            return df
+        return df[self._mask(df, sql, params)]
+
+    def aggregate(self, df: pd.DataFrame, keys: List[str],
+                  aggs: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        key_sql = ", ".join(quote(k) for k in keys)
+        select = ", ".join(
+            f"{SQL_AGGREGATIONS[func].format(quote(col))} AS {quote(name)}"
+            for name, (col, func) in aggs.items()
+        )
+        if any(func == "first" for _, func in aggs.values()):
+            df = df.assign(**{ROW_NUMBER: np.arange(len(df))})
+        not_null = " AND ".join(f"{quote(k)} IS NOT NULL" for k in keys)
+        sql = f"SELECT {key_sql}, {select} FROM tx WHERE {not_null} GROUP BY {key_sql} ORDER BY {key_sql}"
+        return self._fetch(df, sql, [])
+
+    def date_part_counts(self, df, parts, count_col="transaction_id"):
+        frame = df[["date", count_col]]
+        return {
+            part: self._fetch(
+                frame,
+                f"SELECT {DATE_PARTS[part]} AS {quote(part)}, count({quote(count_col)}) AS transaction_count "
+                f'FROM tx WHERE "date" IS NOT NULL GROUP BY 1 ORDER BY 1',
+                [],
+            )
+            for part in parts
+        }
@@ -0,0 +1,98 @@
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from app.core.partitions import date_bounds
+from .base import ORDERING_OPERATORS, QueryBackend, check_ordering
+
+DATE_PARTS = {
+    "day_of_week": lambda d: d.dt.day_name(),
+    "hour_of_day": lambda d: d.dt.hour,
+    "month_of_year": lambda d: d.dt.month_name(),
+    "quarter_of_year": lambda d: 'Q' + d.dt.quarter.astype(str),
+    "date": lambda d: d.dt.date,
+}
+
+
+class PandasBackend(QueryBackend):
+    """The default backend: plain pandas over the in-memory frame."""
+
+    name = "pandas"
+
+    def filter_mask(self, df, filter_obj):
+        if 'and' in filter_obj:
+            masks = [self.filter_mask(df, f) for f in filter_obj['and']]
+            return pd.concat(masks, axis=1).all(axis=1) if masks else pd.Series(True, index=df.index)
+
+        elif 'or' in filter_obj:
+            masks = [self.filter_mask(df, f) for f in filter_obj['or']]
+            return pd.concat(masks, axis=1).any(axis=1) if masks else pd.Series(False, index=df.index)
+
+        elif 'not' in filter_obj:
+            mask = self.filter_mask(df, filter_obj['not'])
+            return ~mask
+
+        else:
+            col = filter_obj['column']
+            op = filter_obj['operator']
+            val = filter_obj['value']
+
+            if col not in df.columns:
+                raise ValueError(f"Unsupported column: '{col}'")
+
+            s = df[col]
+            if op in ORDERING_OPERATORS:
+                check_ordering(s.dtype, col, op, val if op == 'between' else [val])
+            if op == 'equals':
+                return s == val
+            elif op == 'not_equals':
+                return s != val
+            elif op == 'greater_than':
+                return s > val
+            elif op == 'greater_than_equals':
+                return s >= val
+            elif op == 'less_than':
+                return s < val
+            elif op == 'less_than_equals':
+                return s <= val
+            elif op == 'between':
+                return s.between(val[0], val[1])
+            elif op == 'in':
+                return s.isin(val)
+            elif op == 'not_in':
+                return ~s.isin(val)
+            else:
+                raise ValueError(f"Unsupported operator: '{op}' for column '{col}'")
+
+    def apply_date_filters(self, df, year=None, month=None, week=None, day=None,
+                           range_days=None, start_date=None, end_date=None):
+        # Date range filters
+        start, end = date_bounds(range_days, start_date, end_date)
+        if start is not None:
+            df = df[(df["date"] >= start) & (df["date"] <= end)]
+
+        # Individual date component filters
+        if year is not None:
+            df = df[df["year"] == year]
+        if month is not None:
+            df = df[df["month"] == month]
+        if week is not None:
+            df = df[df["week"] == week]
+        if day is not None:
+            df = df[df["day"] == day]
+
+        return df
+
+    def aggregate(self, df: pd.DataFrame, keys: List[str],
+                  aggs: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        return df.groupby(keys).agg(**aggs).reset_index()
+
+    def date_part_counts(self, df, parts, count_col="transaction_id"):
+        return {
+            part: (
+                df.groupby(DATE_PARTS[part](df["date"]).rename(part))[count_col]
+                .count()
+                .reset_index(name="transaction_count")
+            )
+            for part in parts
+        }
@@ -0,0 +1,175 @@
+"""
+Polars lazy-frame backend.
+
+Each call hands Polars only the columns the query touches (projection at the
+pandas boundary), builds one lazy query (filter -> group_by -> sort) and
+collects it once, so the optimiser can push predicates and projections down
+and run the plan on all cores without the intermediate copies the pandas
+pipelines make. Masks come back in row order and pandas keeps selecting the
+rows, so everything downstream sees the frame the pandas backend would.
+"""
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from app.core.partitions import date_bounds
+from .base import ORDERING_OPERATORS, QueryBackend, check_ordering, comparable
+
+try:
+    import polars as pl
+except ImportError:  # optional dependency
+    pl = None
+
+COMPARISONS = {
+    "equals": "__eq__",
+    "greater_than": "__gt__",
+    "greater_than_equals": "__ge__",
+    "less_than": "__lt__",
+    "less_than_equals": "__le__",
+}
+
+
+def compile_filter(filter_obj: dict, dtypes: pd.Series) -> "pl.Expr":
+    """
+    Compile a structured filter to a null-free Polars boolean expression, with
+    the semantics of QueryBackend.filter_mask.
+    """
+    if 'and' in filter_obj:
+        return pl.all_horizontal([compile_filter(f, dtypes) for f in filter_obj['and']] or [pl.lit(True)])
+    if 'or' in filter_obj:
+        return pl.any_horizontal([compile_filter(f, dtypes) for f in filter_obj['or']] or [pl.lit(False)])
+    if 'not' in filter_obj:
+        return ~compile_filter(filter_obj['not'], dtypes)
+
+    col = filter_obj['column']
+    op = filter_obj['operator']
+    val = filter_obj['value']
+
+    if col not in dtypes:
+        raise ValueError(f"Unsupported column: '{col}'")
+
+    c = pl.col(col)
+    dtype = dtypes[col]
+    if op in ORDERING_OPERATORS:
+        check_ordering(dtype, col, op, val if op == 'between' else [val])
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        # pandas parses date strings; Polars only compares datetimes with datetimes
+        val = [_datetime(v) for v in val] if op in ('between', 'in', 'not_in') else _datetime(val)
+    if op == 'equals' and not comparable(dtype, val):
+        return pl.lit(False)
+    if op in COMPARISONS:
+        return getattr(c, COMPARISONS[op])(val).fill_null(False)
+    elif op == 'not_equals':
+        return (c != val).fill_null(True) if comparable(dtype, val) else pl.lit(True)
+    elif op == 'between':
+        return c.is_between(val[0], val[1]).fill_null(False)
+    elif op in ('in', 'not_in'):
+        values = [v for v in val if comparable(dtype, v)]
+        matched = c.is_in(values).fill_null(False) if values else pl.lit(False)
+        return matched if op == 'in' else ~matched
+    else:
+        raise ValueError(f"Unsupported operator: '{op}' for column '{col}'")
+
+
+def _datetime(value):
+    return pd.Timestamp(value).to_pydatetime() if isinstance(value, str) else value
+
+
+def filter_columns(filter_obj: dict) -> List[str]:
+    """The columns a structured filter reads."""
+    for joiner in ('and', 'or'):
+        if joiner in filter_obj:
+            return [c for f in filter_obj[joiner] for c in filter_columns(f)]
+    if 'not' in filter_obj:
+        return filter_columns(filter_obj['not'])
+    return [filter_obj['column']]
+
+
+def compile_date_filters(year=None, month=None, week=None, day=None,
+                         range_days=None, start_date=None, end_date=None):
+    """Compile the date filters of _apply_date_filters; returns (expr or None, columns read)."""
+    conditions, columns = [], []
+    start, end = date_bounds(range_days, start_date, end_date)
+    if start is not None:
+        conditions.append(pl.col("date").is_between(start.to_pydatetime(), end.to_pydatetime()))
+        columns.append("date")
+    for column, value in (("year", year), ("month", month), ("week", week), ("day", day)):
+        if value is not None:
+            conditions.append(pl.col(column) == value)
+            columns.append(column)
+    if not conditions:
+        return None, columns
+    return pl.all_horizontal(conditions).fill_null(False), columns
+
+
+AGGREGATIONS = {
+    "sum": lambda c: c.sum(),
+    "count": lambda c: c.count(),
+    "mean": lambda c: c.mean(),
+    "min": lambda c: c.min(),
+    "max": lambda c: c.max(),
+    "std": lambda c: c.std(),
+    "nunique": lambda c: c.drop_nulls().n_unique(),
+    "first": lambda c: c.drop_nulls().first(),
+}
+
+DATE_PARTS = {
+    "day_of_week": lambda d: d.dt.strftime("%A"),
+    "hour_of_day": lambda d: d.dt.hour(),
+    "month_of_year": lambda d: d.dt.strftime("%B"),
+    "quarter_of_year": lambda d: pl.lit("Q") + d.dt.quarter().cast(pl.String),
+    "date": lambda d: d.dt.date(),
+}
+
+
+class PolarsBackend(QueryBackend):
+    """Evaluates filters and aggregations as Polars lazy queries."""
+
+    name = "polars"
+
+    def __init__(self):
+        if pl is None:
+            raise RuntimeError("QUERY_BACKEND=polars needs polars; install it with `pip install polars`")
+
+    @staticmethod
+    def _lazy(df: pd.DataFrame, columns) -> "pl.LazyFrame":
+        """A lazy frame over just the given columns of df."""
+        return pl.from_pandas(df[list(dict.fromkeys(columns))]).lazy()
+
+    def _mask(self, df: pd.DataFrame, predicate: "pl.Expr", columns) -> pd.Series:
+        # with_columns, so a constant predicate still yields one value per row
+        keep = self._lazy(df, columns).with_columns(predicate.alias("keep")).collect()["keep"]
+        return pd.Series(keep.to_numpy(), index=df.index)
+
+    def filter_mask(self, df, filter_obj):
+        predicate = compile_filter(filter_obj, df.dtypes)
+        return self._mask(df, predicate, filter_columns(filter_obj))
+
+    def apply_date_filters(self, df, year=None, month=None, week=None, day=None,
+                           range_days=None, start_date=None, end_date=None):
+        predicate, columns = compile_date_filters(year, month, week, day, range_days, start_date, end_date)
+        if predicate is None:
+            return df
+        return df[self._mask(df, predicate, columns)]
+
+    def aggregate(self, df: pd.DataFrame, keys: List[str],
+                  aggs: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        query = (
+            self._lazy(df, keys + [col for col, _ in aggs.values()])
+            .drop_nulls(keys)
+            .group_by(keys)
+            .agg([AGGREGATIONS[func](pl.col(col)).alias(name) for name, (col, func) in aggs.items()])
+            .sort(keys)
+        )
+        return query.collect().to_pandas()
+
+    def date_part_counts(self, df, parts, count_col="transaction_id"):
+        source = self._lazy(df, ["date", count_col]).drop_nulls("date")
+        queries = [
+            source.group_by(DATE_PARTS[part](pl.col("date")).alias(part))
+            .agg(pl.col(count_col).count().alias("transaction_count"))
+            .sort(part)
+            for part in parts
+        ]
+        # One pass over the shared source for all parts
+        return {part: frame.to_pandas() for part, frame in zip(parts, pl.collect_all(queries))}
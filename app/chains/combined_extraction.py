@@ -0,0 +1,89 @@
+from typing_extensions import TypedDict, Annotated
+from app.chains.llm import LazyChain
+
+# === Output Schema ===
+class CombinedExtraction(TypedDict):
+    filter_intent: Annotated[
+        bool,
+        "True if the query is about filtering data, false otherwise."
+    ]
+    group_by_column: Annotated[
+        str | None,
+        "The entity ID column to group by for computing aggregated metrics. Return null if no grouping column is detected."
+    ]
+    filter_object: Annotated[
+        dict | None,
+        """
+        A JSON object representing the filter criteria using:
+        - Logical operators: "and", "or", "not"
+        - Leaf comparison expressions: { "column": "<column_name>", "operator": "<operator>", "value": "<value>" }
+        The filter object can be infinitely nested and contain any number of conditions in logical operators.
+        Return null if no filtering criteria are found.
+        """
+    ]
+
+# === System Prompt ===
+combined_extraction_system = """
+You are a data query assistant. Analyze the user's natural language query and answer three things at once:
+
+1. filter_intent: whether the query is a data filter request (true or false).
+2. group_by_column: the entity ID column the results should be grouped by, chosen from:
+{available_entity_id_columns}
+   Return null if no grouping column is detected.
+3. filter_object: the structured JSON filter for the query, or null if it has no filtering criteria.
+
+**Data Schema:**
+{schema_prompt}
+
+Computed columns only exist for the group-by columns listed next to them; use only columns
+available for the group_by_column you chose.
+
+**Filter Object Structure:**
+- Logical operators: "and", "or", "not"
+- Logical operators can contain **any number of sub-filters or conditions** (not limited to two).
+- Leaf comparison expressions: {{ "column": "<column_name>", "operator": "<operator>", "value": "<value>" }}
+- The filter object can be **infinitely nested** to represent any level of logical complexity implied by the query.
+
+**Supported operators:**
+- equals
+- not_equals
+- greater_than
+- greater_than_equals
+- less_than
+- less_than_equals
+- between
+- in
+- not_in
+
+**Example Output:**
+{{
+  "filter_intent": true,
+  "group_by_column": "merchant_id",
+  "filter_object": {{
+    "and": [
+      {{ "column": "total_transactions", "operator": "greater_than", "value": 50 }},
+      {{ "column": "unique_customers", "operator": "greater_than_equals", "value": 20 }}
+    ]
+  }}
+}}
+"""
+
+# === User Prompt ===
+combined_extraction_user = """
+User query:
+{query}
+
+Classify the intent, pick the group-by column and generate the structured filter object.
+"""
+
+# === Final Chain ===
+def _build_combined_extraction_chain(model):
+    from langchain.prompts import ChatPromptTemplate
+
+    combined_extraction_prompt = ChatPromptTemplate.from_messages([
+        ("system", combined_extraction_system),
+        ("user", combined_extraction_user)
+    ])
+    return combined_extraction_prompt | model.with_structured_output(CombinedExtraction)
+
+combined_extraction_chain = LazyChain(_build_combined_extraction_chain)
@@ -1,6 +1,5 @@
 from typing_extensions import TypedDict, Annotated
-from langchain.prompts import ChatPromptTemplate
-from app.core.config import model
+from app.chains.llm import LazyChain
 
 # === Output Schema ===
 class ExtractedFilterObject(TypedDict):
@@ -90,11 +89,14 @@ User query:
 Generate the structured filter object.
 """
 
-# === Build the Prompt Template ===
-filter_extraction_prompt = ChatPromptTemplate.from_messages([
-    ("system", filter_extraction_system),
-    ("user", filter_extraction_user)
-])
-
 # === Final Chain ===
-filter_extraction_chain = filter_extraction_prompt | model.with_structured_output(ExtractedFilterObject)
+def _build_filter_extraction_chain(model):
+    from langchain.prompts import ChatPromptTemplate
+
+    filter_extraction_prompt = ChatPromptTemplate.from_messages([
+        ("system", filter_extraction_system),
+        ("user", filter_extraction_user)
+    ])
+    return filter_extraction_prompt | model.with_structured_output(ExtractedFilterObject)
+
+filter_extraction_chain = LazyChain(_build_filter_extraction_chain)
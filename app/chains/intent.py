@@ -1,6 +1,5 @@
 from typing_extensions import TypedDict, Annotated
-from langchain.prompts import ChatPromptTemplate
-from app.core.config import model
+from app.chains.llm import LazyChain
 
 class FilterIntentDecision(TypedDict):
     filter_intent: Annotated[
@@ -21,9 +20,13 @@ User query:
 Is this a data filter request?
 """
 
-intent_classification_prompt = ChatPromptTemplate.from_messages([
-    ("system", intent_classification_system),
-    ("user", intent_classification_user)
-])
+def _build_intent_classification_chain(model):
+    from langchain.prompts import ChatPromptTemplate
 
-intent_classification_chain = intent_classification_prompt | model.with_structured_output(FilterIntentDecision)
+    intent_classification_prompt = ChatPromptTemplate.from_messages([
+        ("system", intent_classification_system),
+        ("user", intent_classification_user)
+    ])
+    return intent_classification_prompt | model.with_structured_output(FilterIntentDecision)
+
+intent_classification_chain = LazyChain(_build_intent_classification_chain)
@@ -0,0 +1,90 @@
+"""
+The chat model behind the NL chains, created on first use.
+
+Importing the app never imports langchain or builds a client: get_model()
+creates the model the first time an NL request needs it, and each chain is a
+LazyChain that builds `prompt | model.with_structured_output(Schema)` on its
+first call. Endpoints that never touch the LLM never pay for it.
+
+LLM_PROVIDER names a factory in PROVIDERS ("openai", "stub"), or any
+"package.module:callable" taking the settings and returning a chat model.
+set_model() injects a model directly, e.g. a fake in a benchmark; chains
+pick it up on their next call.
+"""
+import importlib
+import threading
+
+from app.core.config import settings
+
+
+def _openai(settings):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=settings.LLM_MODEL, temperature=0, api_key=settings.OPENAI_API_KEY)
+
+
+def _stub(settings):
+    from app.chains.stub import StubChatModel
+    return StubChatModel(settings.STUB_LLM_RESPONSES, settings.STUB_LLM_LATENCY_MS, settings.STUB_LLM_LATENCY_JITTER)
+
+
+PROVIDERS = {
+    "openai": _openai,
+    "stub": _stub,  # offline canned responses
+}
+
+_model = None
+_lock = threading.Lock()
+
+
+def create_model(settings=settings):
+    """A new chat model for settings.LLM_PROVIDER."""
+    provider = settings.LLM_PROVIDER
+    factory = PROVIDERS.get(provider)
+    if factory is None and ":" in provider:
+        module_name, _, attr = provider.partition(":")
+        factory = getattr(importlib.import_module(module_name), attr)
+    if factory is None:
+        raise ValueError(f"Unknown LLM_PROVIDER {provider!r}; expected one of {sorted(PROVIDERS)} "
+                         f"or 'package.module:callable'")
+    return factory(settings)
+
+
+def get_model():
+    """The process-wide chat model, created on first use."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = create_model()
+    return _model
+
+
+def set_model(model) -> None:
+    """Use model for every chain from now on; None recreates it from the settings on next use."""
+    global _model
+    with _lock:
+        _model = model
+
+
+class LazyChain:
+    """A chain built by build(model) on first use, and rebuilt if the model is replaced."""
+
+    def __init__(self, build):
+        self.name = build.__name__.removeprefix("_build_").removesuffix("_chain")
+        self._build = build
+        self._chain = None
+        self._model = None
+
+    def _get(self):
+        model = get_model()
+        chain = self._chain
+        if chain is None or self._model is not model:
+            chain = self._build(model)
+            self._chain, self._model = chain, model
+        return chain
+
+    def invoke(self, inputs, *args, **kwargs):
+        return self._get().invoke(inputs, *args, **kwargs)
+
+    async def ainvoke(self, inputs, *args, **kwargs):
+        return await self._get().ainvoke(inputs, *args, **kwargs)
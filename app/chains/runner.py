@@ -0,0 +1,54 @@
+"""
+Guarded async invocation of the LLM chains.
+
+Every chain call from a request goes through ainvoke_chain: it awaits the
+chain's ainvoke (never blocking the event loop), holds a slot of a bounded
+semaphore so a burst of NL queries cannot open unbounded connections to the
+provider, and gives up after LLM_TIMEOUT_SECONDS with a 504.
+"""
+import asyncio
+import time
+import weakref
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import LLM_CALLS, LLM_CALL_SECONDS
+from app.core.timing import span
+
+# One semaphore per event loop: asyncio primitives are bound to the loop they first wait on
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+async def _guarded(chain, inputs: dict, name: str):
+    async with _llm_semaphore():
+        # Timed once a slot is held, so this is the model's own latency
+        started = time.perf_counter()
+        with span(f"llm.{name}"):
+            result = await chain.ainvoke(inputs)
+        LLM_CALL_SECONDS.labels(name).observe(time.perf_counter() - started)
+        return result
+
+
+async def ainvoke_chain(chain, inputs: dict):
+    """Run chain.ainvoke(inputs) under the LLM concurrency limit and timeout."""
+    name = getattr(chain, "name", "chain")
+    try:
+        # The timeout covers the wait for a slot too: a saturated provider fails fast
+        result = await asyncio.wait_for(_guarded(chain, inputs, name), timeout=settings.LLM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        LLM_CALLS.labels(name, "timeout").inc()
+        raise HTTPException(status_code=504, detail="Timed out waiting for the language model")
+    except Exception:
+        LLM_CALLS.labels(name, "error").inc()
+        raise
+    LLM_CALLS.labels(name, "ok").inc()
+    return result
@@ -0,0 +1,78 @@
+"""
+Offline stand-in for the chat model, selected with LLM_PROVIDER=stub.
+
+Chains are built as `prompt | model.with_structured_output(Schema)`; the stub
+answers each structured-output call from canned responses keyed by the
+schema's field and the user query, so the NL endpoints (and the translation
+cache in front of them) can run without network access or an API key.
+
+STUB_LLM_RESPONSES points at a JSON file shaped like
+{"filter_object": {"<query>": {...}}, "group_by_column": {"<query>": "merchant_id"}}
+and STUB_LLM_LATENCY_MS simulates the round-trip of a real model; with
+STUB_LLM_LATENCY_JITTER > 0 each call instead takes a log-normal latency with
+that median and sigma, the long-tailed shape of real model latencies.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.runnables import RunnableLambda
+
+from app.utils.nl_cache import normalize_query
+
+# Answers for queries that have no canned response
+DEFAULT_RESPONSES = {
+    "filter_intent": True,
+    "group_by_column": "merchant_id",
+    "filter_object": None,
+}
+
+_QUERY_PATTERN = re.compile(r"User query:\s*(.*?)\n\s*\n", re.DOTALL)
+
+
+class StubChatModel:
+    """Answers structured-output prompts from a responses file instead of an LLM."""
+
+    def __init__(self, responses_path: Optional[Path] = None, latency_ms: int = 0, jitter: float = 0.0):
+        self.responses = json.loads(Path(responses_path).read_text()) if responses_path else {}
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema):
+        fields = list(schema.__annotations__)
+
+        def answer(prompt):
+            self._count()
+            time.sleep(self._latency())
+            return self._answer(fields, prompt)
+
+        async def aanswer(prompt):
+            self._count()
+            await asyncio.sleep(self._latency())
+            return self._answer(fields, prompt)
+
+        return RunnableLambda(answer, afunc=aanswer)
+
+    def _latency(self) -> float:
+        seconds = self.latency_ms / 1000
+        return seconds * random.lognormvariate(0.0, self.jitter) if self.jitter else seconds
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _answer(self, fields, prompt) -> dict:
+        match = _QUERY_PATTERN.search(prompt.to_messages()[-1].content)
+        query = normalize_query(match.group(1)) if match else ""
+        answer = {}
+        for field in fields:
+            canned = {normalize_query(q): v for q, v in self.responses.get(field, {}).items()}
+            answer[field] = canned.get(query, DEFAULT_RESPONSES.get(field))
+        return answer
@@ -1,6 +1,5 @@
 from typing_extensions import TypedDict, Annotated
-from langchain.prompts import ChatPromptTemplate
-from app.core.config import model
+from app.chains.llm import LazyChain
 
 # === Output Schema ===
 class GroupByColumnExtraction(TypedDict):
@@ -30,11 +29,14 @@ User query:
 What is the column to group by for this query?
 """
 
-# === Build the Prompt Template ===
-group_by_extraction_prompt = ChatPromptTemplate.from_messages([
-    ("system", group_by_extraction_system),
-    ("user", group_by_extraction_user)
-])
-
 # === Final Chain ===
-group_by_extraction_chain = group_by_extraction_prompt | model.with_structured_output(GroupByColumnExtraction)
+def _build_group_by_extraction_chain(model):
+    from langchain.prompts import ChatPromptTemplate
+
+    group_by_extraction_prompt = ChatPromptTemplate.from_messages([
+        ("system", group_by_extraction_system),
+        ("user", group_by_extraction_user)
+    ])
+    return group_by_extraction_prompt | model.with_structured_output(GroupByColumnExtraction)
+
+group_by_extraction_chain = LazyChain(_build_group_by_extraction_chain)
@@ -0,0 +1,17 @@
+"""
+Access check for operator-only routes (profiling and diagnostics).
+"""
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from .config import settings
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dependency: the request must carry X-Admin-Token equal to ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin routes are disabled; set ADMIN_TOKEN")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
@@ -19,6 +19,11 @@ OUTLIER_DETECTION = {
     "std_multiplier": 1.0,  # Number of standard deviations to consider as outlier
 }
 
+# Days-between-transactions summary histogram
+DAYS_BETWEEN_HISTOGRAM = {
+    "bin_edges": [0, 1, 2, 8, 15, 31, 61, 91, 181, 366],  # Lower bound in days of each bin; the last is open-ended
+}
+
 # Time granularity formats
 TIME_FORMATS = {
     "daily": "%Y-%m-%d",
@@ -1,15 +1,39 @@
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 import os
-from langchain_openai import ChatOpenAI
 
 class Settings(BaseSettings):
     DATA_DIR: Path = Field(default=Path(__file__).parents[2] / "data")
     CSV_NAME: str = Field(default="transactions.csv")  # always saved as this
     AUTO_RELOAD: bool = True
+    PARTITIONED_STORAGE: bool = False  # also persist month partitions as Parquet (needs pyarrow)
+    OUT_OF_CORE_MEMORY_MB: int = 256   # working-set budget for out-of-core aggregation
+    OUT_OF_CORE_THRESHOLD_MB: int = 0  # CSVs larger than this are streamed, never loaded; 0 = always load
+    DAY_ROLLUP: bool = True            # per-(entity, day) totals built at load; time series read them
+    PAIR_AGGREGATES: bool = True       # per-(entity, customer) totals and gaps built at load
+    QUERY_BACKEND: str = "pandas"      # pandas | duckdb | polars
+    DUCKDB_THREADS: int = 0            # 0 = one per CPU
     OPENAI_API_KEY: str = Field(default="")
     LLM_MODEL: str = Field(default="")
+    LLM_PROVIDER: str = "openai"       # openai | stub | package.module:factory
+    STUB_LLM_RESPONSES: Optional[Path] = None
+    STUB_LLM_LATENCY_MS: int = 0
+    STUB_LLM_LATENCY_JITTER: float = 0.0  # log-normal sigma around STUB_LLM_LATENCY_MS; 0 = fixed
+    NL_CACHE_SIZE: int = 1000          # cached NL filter translations; 0 disables
+    NL_COMBINED_EXTRACTION: bool = True  # one LLM call for intent + group-by + filter
+    NL_RULE_PARSER: bool = True        # answer simple NL filters locally, before the LLM
+    LLM_MAX_CONCURRENCY: int = 8       # in-flight LLM calls per event loop
+    LLM_TIMEOUT_SECONDS: float = 30.0  # per call, including the wait for a slot
+    NL_BATCH_MAX_QUERIES: int = 50     # queries per /nl-filter-batch request
+    NL_BATCH_CONCURRENCY: int = 4      # queries of one batch resolved at a time
+    BATCH_MAX_IDS: int = 500           # entity ids per /{entity}/batch request
+    SERVER_TIMING_HEADER: bool = True  # per-stage durations in a Server-Timing response header
+    SLOW_REQUEST_MS: float = 1000      # log slower requests to DATA_DIR/slow_requests.jsonl; 0 disables
+    SLOW_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_LOG_BACKUPS: int = 5
+    ADMIN_TOKEN: str = Field(default="")  # X-Admin-Token for /profiler; empty disables those routes
 
     class Config:
         env_file = ".env"
@@ -18,13 +42,14 @@ class Settings(BaseSettings):
     def csv_path(self) -> Path:
         return self.DATA_DIR / self.CSV_NAME
     
+    @property
+    def partitions_dir(self) -> Path:
+        return self.DATA_DIR / "partitions"
+
     @property
     def llm(self):
-        return ChatOpenAI(
-            model=self.LLM_MODEL,
-            temperature=0,
-            api_key=self.OPENAI_API_KEY
-        )
+        # Imported here so loading the settings never pulls in langchain
+        from app.chains.llm import create_model
+        return create_model(self)
 
 settings = Settings()
-model = settings.llm
@@ -1,45 +1,268 @@
+import os
+import shutil
 import threading
-from typing import Optional
+import time
+import weakref
+from dataclasses import dataclass, field
+from functools import cached_property
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 from fastapi import HTTPException
 
 from .config import settings
-from app.utils.caching import timed_cache
+from .metrics import DATASET_LOAD_SECONDS
+from .ordering import customer_rank
+from .pairs import PairTable, build_pair_tables
+from .partitions import month_keys, partition_stats, prune_partitions, is_current, write_partitions
+from .rollup import DayRollup, build_rollups
+from app.utils.caching import clear_cache
 
-# ─── In-memory DataFrame cache ─────────────────────────────────────────────
-_df: Optional[pd.DataFrame] = None
-_lock = threading.Lock()        # <- single-process upload lock
+# Entity columns that get a row-position index at load time
+INDEXED_ENTITY_COLUMNS = ["agent_id", "merchant_id", "terminal_id", "branch_admin_id", "customer_id"]
 
-# ─── Loader helpers ────────────────────────────────────────────────────────
-def load_data() -> pd.DataFrame:
-    """Initial or forced load from the canonical CSV_PATH."""
-    if not settings.csv_path.exists():
-        raise HTTPException(500, "Data file not found; upload a CSV first.")
-    return _load_from_path(settings.csv_path)
+# ─── Dataset versions ──────────────────────────────────────────────────────
+@dataclass(eq=False)
+class DatasetVersion:
+    """
+    A fully prepared, read-only snapshot of the transactions dataset.
+
+    Requests resolve the current version once and keep using it, so a reload
+    swapping in a newer generation never changes data under a running request.
+    """
+    generation: int
+    df: pd.DataFrame
+    loaded_at: datetime
+    load_seconds: float
+    entity_index: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict, repr=False)
+    month_key: Optional[np.ndarray] = field(default=None, repr=False)
+    partitions: List[Dict] = field(default_factory=list, repr=False)
+    rollups: Dict[Optional[str], DayRollup] = field(default_factory=dict, repr=False)
+    customer_rank: Optional[np.ndarray] = field(default=None, repr=False)
+    pair_tables: Dict[str, PairTable] = field(default_factory=dict, repr=False)
+
+    def entity_rows(self, entity_id_col: str, entity_id) -> Optional[np.ndarray]:
+        """Row positions for one entity, or None if the column is not indexed."""
+        index = self.entity_index.get(entity_id_col)
+        if index is None:
+            return None
+        return index.get(entity_id, np.empty(0, dtype=np.int32))
+
+    def day_rollup(self, entity_id_col: Optional[str]) -> Optional[DayRollup]:
+        """The day rollup of an entity level (None = whole dataset), if one was built."""
+        return self.rollups.get(entity_id_col)
+
+    def pair_table(self, entity_id_col: str) -> Optional[PairTable]:
+        """The (entity, customer) pair table of an entity level, if one was built."""
+        return self.pair_tables.get(entity_id_col)
+
+    @cached_property
+    def memory_bytes(self) -> int:
+        """Deep memory footprint of the frame; measured once, on first use."""
+        return int(self.df.memory_usage(deep=True).sum())
+
+    def prune_rows(self, rows: np.ndarray, **date_filters) -> np.ndarray:
+        """Drop row positions whose month partition the date filters rule out."""
+        kept = prune_partitions(self.partitions, **date_filters)
+        if kept is None:
+            return rows
+        return rows[np.isin(self.month_key[rows], [p["key"] for p in kept])]
 
-def _load_from_path(path) -> pd.DataFrame:
-    global _df
+# ─── Out-of-core datasets ──────────────────────────────────────────────────
+@dataclass(frozen=True)
+class StreamedSlice:
+    """
+    Stands in for an entity's rows when the dataset is served out of core.
+
+    Routes whose analytics app.utils.out_of_core covers receive one in place of
+    the frame; those analytics stream the rows it names from disk (the
+    filters argument they get only labels the metric, as with a frame).
+    """
+    entity_id_col: Optional[str] = None
+    entity_id: Any = None
+    filters: Dict = field(default_factory=dict)  # date filters the rows must match
+
+    def __len__(self) -> int:
+        return 0    # no rows are held in memory
+
+STREAMED = StreamedSlice()  # the whole dataset
+
+def is_streamed(df) -> bool:
+    """True for a StreamedSlice rather than transaction rows."""
+    return isinstance(df, StreamedSlice)
+
+def serves_out_of_core(path=None) -> bool:
+    """True if the dataset file (default: CSV_PATH) is over OUT_OF_CORE_THRESHOLD_MB."""
+    path = path or settings.csv_path
+    limit = settings.OUT_OF_CORE_THRESHOLD_MB
+    return limit > 0 and path.exists() and path.stat().st_size > limit * 1024 * 1024
+
+# ─── In-memory dataset state ───────────────────────────────────────────────
+_current: Optional[DatasetVersion] = None
+_generation = 0
+_lock = threading.Lock()        # <- serialises version swaps (never held while parsing)
+_load_lock = threading.Lock()   # <- one loader at a time, so reloads don't pile up
+_versions = weakref.WeakValueDictionary()   # id(df) -> DatasetVersion still in use
+
+# ─── Loader helpers ────────────────────────────────────────────────────────
+def _read_csv(path) -> pd.DataFrame:
     try:
-        _df = pd.read_csv(path)
+        return pd.read_csv(path)
     except Exception as exc:
         raise HTTPException(422, f"Could not read CSV: {exc}") from exc
-    return _df
 
-@timed_cache(seconds=60)  # Cache for 1 minute
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse dates and derive the date-part columns every query filters on."""
+    df["date"] = pd.to_datetime(df["date"])
+    df["year"] = df["date"].dt.year
+    df["month"] = df["date"].dt.month
+    df["day"] = df["date"].dt.day
+    df["week"] = df["date"].dt.isocalendar().week
+    return df
+
+def _build_entity_index(df: pd.DataFrame) -> Dict[str, Dict[str, np.ndarray]]:
+    """Map each entity id to the (ascending) row positions it occupies."""
+    index = {}
+    for col in INDEXED_ENTITY_COLUMNS:
+        if col in df.columns:
+            index[col] = {
+                key: rows.astype(np.int32, copy=False)
+                for key, rows in df.groupby(col, sort=False).indices.items()
+            }
+    return index
+
+def _publish(prepared: Dict) -> DatasetVersion:
+    """Swap a prepared frame in as the next generation."""
+    global _current, _generation
+    with _lock:
+        _generation += 1
+        version = DatasetVersion(generation=_generation, loaded_at=datetime.now(), **prepared)
+        df = version.df
+        _versions[id(df)] = version
+        _current = version
+    clear_cache()   # cached results belong to the previous generation
+    return version
+
+def _retire_current() -> None:
+    """Drop the in-memory version once the dataset on disk is served out of core."""
+    global _current, _generation
+    with _lock:
+        _generation += 1
+        _current = None
+    clear_cache()
+
+def _load_frame(path) -> Dict:
+    """Read and fully prepare a dataset file without touching the live version."""
+    started = time.perf_counter()
+    df = _prepare_frame(_read_csv(path))
+    keys = month_keys(df["date"])
+    rank = customer_rank(df) if "customer_id" in df.columns else None
+    return {
+        "df": df,
+        "entity_index": _build_entity_index(df),
+        "month_key": keys,
+        "partitions": partition_stats(df, keys),
+        "rollups": build_rollups(df) if settings.DAY_ROLLUP else {},
+        "customer_rank": rank,
+        "pair_tables": build_pair_tables(df, rank) if settings.PAIR_AGGREGATES and rank is not None else {},
+        "load_seconds": time.perf_counter() - started,
+    }
+
+def _persist_partitions(prepared: Dict, source) -> None:
+    """Mirror the dataset to the on-disk month layout, if enabled and stale."""
+    if settings.PARTITIONED_STORAGE and not is_current(settings.partitions_dir, source):
+        write_partitions(
+            prepared["df"], prepared["month_key"], prepared["partitions"],
+            settings.partitions_dir, source
+        )
+
+def _load_version(path) -> DatasetVersion:
+    started = time.perf_counter()
+    prepared = _load_frame(path)
+    _persist_partitions(prepared, path)
+    version = _publish(prepared)
+    DATASET_LOAD_SECONDS.labels("load").observe(time.perf_counter() - started)
+    return version
+
+def load_data() -> Optional[pd.DataFrame]:
+    """Initial or forced load from the canonical CSV_PATH; None if it is served out of core."""
+    if not settings.csv_path.exists():
+        raise HTTPException(500, "Data file not found; upload a CSV first.")
+    if serves_out_of_core():
+        return None
+    with _load_lock:
+        return _load_version(settings.csv_path).df
+
+def get_dataset() -> DatasetVersion:
+    """Return the current dataset version, lazy-loading it on first use."""
+    version = _current
+    if version is None:
+        with _load_lock:
+            version = _current
+            if version is None:
+                if not settings.csv_path.exists():
+                    raise HTTPException(500, "Data file not found; upload a CSV first.")
+                if serves_out_of_core():
+                    raise HTTPException(
+                        503, "The dataset is over OUT_OF_CORE_THRESHOLD_MB and is not loaded; "
+                             "this endpoint needs it in memory."
+                    )
+                version = _load_version(settings.csv_path)
+    return version
+
+def loaded_dataset() -> Optional[DatasetVersion]:
+    """The current version, or None before the first load; never loads."""
+    return _current
+
 def get_df() -> pd.DataFrame:
-    """Return cached DataFrame or lazy-load."""
-    return _df if _df is not None else load_data()
+    """Return the current version's DataFrame (a stable snapshot for the request)."""
+    return get_dataset().df
+
+def get_source():
+    """
+    Like get_df, but the whole-dataset StreamedSlice when the dataset is served
+    out of core; for routes whose analytics app.utils.out_of_core covers.
+    """
+    if _current is None and serves_out_of_core():
+        return STREAMED
+    return get_df()
+
+def dataset_for(df: pd.DataFrame) -> Optional[DatasetVersion]:
+    """Return the version a full-dataset frame belongs to, if it is one."""
+    version = _versions.get(id(df))
+    return version if version is not None and version.df is df else None
 
 # ─── Called by /upload ─────────────────────────────────────────────────────
-def replace_dataset(src_path) -> int:
+def replace_dataset(src_path) -> Optional[DatasetVersion]:
     """
-    Atomically replace the canonical CSV with src_path.
-    Returns new row count.
+    Load src_path as a new dataset version and atomically swap it in.
+
+    Parsing and indexing run before the swap lock is taken, so the current
+    version keeps serving until the new one is ready. Blocking; call it from a worker
+    thread. Returns the version it published (a concurrent upload may already
+    have replaced it as current), or None for a file over
+    OUT_OF_CORE_THRESHOLD_MB, which is put in place without being loaded.
     """
-    with _lock:
+    with _load_lock:
+        started = time.perf_counter()
         settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
-        settings.csv_path.unlink(missing_ok=True)
-        src_path.replace(settings.csv_path)        # overwrite
-        df = _load_from_path(settings.csv_path)    # reload into memory
-    return len(df)
+        staged = settings.csv_path.with_name(f".{settings.CSV_NAME}.incoming")
+        shutil.copyfile(src_path, staged)           # same filesystem as csv_path
+        if serves_out_of_core(staged):
+            os.replace(staged, settings.csv_path)
+            os.unlink(src_path)
+            _retire_current()
+            return None
+        try:
+            prepared = _load_frame(staged)
+        except Exception:
+            staged.unlink(missing_ok=True)
+            raise
+        os.replace(staged, settings.csv_path)       # atomic; the CSV never goes missing
+        os.unlink(src_path)
+        _persist_partitions(prepared, settings.csv_path)
+        version = _publish(prepared)
+        DATASET_LOAD_SECONDS.labels("replace").observe(time.perf_counter() - started)
+    return version
@@ -0,0 +1,203 @@
+"""
+Prometheus metrics, rendered in the text exposition format by GET /metrics.
+
+Recording is lock-free: every metric keeps one pre-allocated list of values
+per thread (a shard), created the first time that thread records, and
+observe()/inc() only touch the calling thread's shard. A scrape sums the
+shards. Histogram buckets are fixed at definition.
+
+Values that already exist elsewhere (dataset size, translation cache stats)
+are read at scrape time by collectors registered with register_collector().
+"""
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; request and load latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Tuple]]] = []
+
+
+class _Child:
+    """One label combination: a list of `size` floats per recording thread."""
+
+    __slots__ = ("_size", "_local", "_shards", "_lock")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> List[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = [0.0] * self._size
+            with self._lock:  # once per thread, never per observation
+                self._shards.append(values)
+            return values
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0.0] * self._size
+
+
+class _Metric:
+    type = ""
+    size = 1
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _Child] = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+        _registry.append(self)
+
+    def labels(self, *values) -> "_Bound":
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, _Child(self.size))
+        return _Bound(self, child)
+
+    def _unlabelled(self) -> "_Bound":
+        if self._default is None:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self._default
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for key, child in list(self._children.items()):
+            yield from self._child_samples(dict(zip(self.labelnames, key)), child.totals())
+
+    def _child_samples(self, labels, totals):
+        yield self.name, labels, totals[0]
+
+
+class _Bound:
+    """A metric bound to one label combination."""
+
+    __slots__ = ("_metric", "_child")
+
+    def __init__(self, metric: _Metric, child: _Child):
+        self._metric = metric
+        self._child = child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._child._shard()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._child._shard()[0] -= amount
+
+    def observe(self, value: float) -> None:
+        values = self._child._shard()
+        values[bisect.bisect_left(self._metric.buckets, value)] += 1
+        values[-1] += value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    """A gauge moved with inc()/dec(); values read from elsewhere belong in a collector."""
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabelled().dec(amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.size = len(self.buckets) + 2  # finite buckets, +Inf, sum
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def _child_samples(self, labels, totals):
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (math.inf,), totals):
+            cumulative += count
+            yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{self.name}_sum", labels, totals[-1]
+        yield f"{self.name}_count", labels, cumulative
+
+
+def register_collector(collect: Callable[[], Iterable[Tuple]]) -> None:
+    """
+    collect() yields (name, type, help, [(labels dict, value), ...]) tuples
+    read at scrape time.
+    """
+    _collectors.append(collect)
+
+
+# ─── Text exposition ───────────────────────────────────────────────────────
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _sample_line(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def render() -> str:
+    """All registered metrics and collector output in Prometheus text format 0.0.4."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(_sample_line(*sample) for sample in metric.samples())
+    for collect in _collectors:
+        for name, kind, documentation, samples in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_sample_line(name, labels, value) for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# ─── Application metrics ───────────────────────────────────────────────────
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the response start, per route template.",
+    ["method", "route"],
+)
+HTTP_REQUESTS = Counter("http_requests_total", "Responses sent, per route template and status.",
+                        ["method", "route", "status"])
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served.")
+LLM_CALL_SECONDS = Histogram("llm_call_duration_seconds", "Language model call latency, per chain.",
+                             ["chain"], buckets=LLM_BUCKETS)
+LLM_CALLS = Counter("llm_calls_total", "Language model calls, per chain and outcome (ok, error, timeout).",
+                    ["chain", "outcome"])
+DATASET_LOAD_SECONDS = Histogram(
+    "dataset_load_duration_seconds", "Dataset load (load_data, first use) and replace (upload) durations.",
+    ["operation"],
+)
@@ -0,0 +1,133 @@
+"""
+(entity, customer) pair aggregates of the transactions dataset.
+
+Built once per dataset version: for each entity level, one record per
+(entity, customer) with the amount sum and count, the first and last
+transaction date, and the mean, median and max whole days between that
+customer's consecutive transactions with the entity, plus a histogram of
+every gap per entity. Top customers, outliers and the days-between summary
+then read the entity's customer list instead of regrouping its rows.
+
+Records cover the whole dataset, so only requests without date filters can
+be answered from them. Sums are taken in row order, like a groupby over the
+entity's rows, so results match the row path exactly.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .analytics_config import DAYS_BETWEEN_HISTOGRAM
+from .ordering import sequence_gaps
+
+# Entity levels that get a pair table
+PAIR_ENTITY_COLUMNS = ["merchant_id", "agent_id", "terminal_id", "branch_admin_id"]
+
+
+def is_pair_table(df: pd.DataFrame) -> bool:
+    """True for a frame returned by PairTable.pairs rather than transaction rows."""
+    return "gap_median" in df.columns
+
+
+class PairTable:
+    """Per-(entity, customer) totals and gap statistics of one entity level, sorted by entity then customer."""
+
+    def __init__(self, frame: pd.DataFrame, bounds: Dict, histograms: np.ndarray):
+        self.frame = frame
+        self.bounds = bounds            # entity id -> (start, stop, position) in frame / histograms
+        self._histograms = histograms   # per entity: gap counts per DAYS_BETWEEN_HISTOGRAM bin
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __contains__(self, entity_id) -> bool:
+        return entity_id in self.bounds
+
+    @property
+    def memory_bytes(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum()) + self._histograms.nbytes
+
+    def pairs(self, entity_id) -> pd.DataFrame:
+        """The entity's customer records (empty for an unknown entity)."""
+        lo, hi, _ = self.bounds.get(entity_id, (0, 0, None))
+        return self.frame.iloc[lo:hi]
+
+    def histogram(self, entity_id) -> Optional[np.ndarray]:
+        """The entity's gap counts per histogram bin, or None for an unknown entity."""
+        bounds = self.bounds.get(entity_id)
+        return self._histograms[bounds[2]] if bounds is not None else None
+
+
+def _pair_table(df: pd.DataFrame, entity_id_col: str, customer_id_col: str, customers: np.ndarray,
+                customer_ids, by_rank: np.ndarray, name_col: Optional[str]) -> PairTable:
+    entities, ids = pd.factorize(df[entity_id_col], sort=True)
+
+    # Rows in (entity, customer, date) order: a stable sort of the (customer, date) order by entity
+    order = by_rank[np.argsort(entities[by_rank], kind="stable")]
+    order = order[(entities[order] >= 0) & (customers[order] >= 0)]
+    sorted_entities, sorted_customers = entities[order], customers[order]
+    dates = df["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)[order]
+    first, gaps = sequence_gaps(sorted_entities, sorted_customers, dates)
+    groups = np.cumsum(first) - 1
+    starts = np.flatnonzero(first)
+    stops = np.append(starts[1:], len(order)) - 1
+
+    # Totals grouped in row order, so each sum adds up like the row path's groupby
+    group_of_row = np.full(len(df), -1, dtype=np.int64)
+    group_of_row[order] = groups
+    in_pair = group_of_row >= 0
+    columns = {"amount": df["amount"].to_numpy()[in_pair]}
+    if name_col is not None:
+        columns[name_col] = df[name_col].to_numpy()[in_pair]
+    totals = pd.DataFrame(columns).groupby(group_of_row[in_pair], sort=True)
+    amounts = totals["amount"].agg(["sum", "count"])
+    stats = pd.Series(gaps).groupby(groups, sort=True).agg(["mean", "median", "max"])
+
+    frame = pd.DataFrame({
+        entity_id_col: ids[sorted_entities[starts]],
+        customer_id_col: customer_ids[sorted_customers[starts]],
+        "total_amount": amounts["sum"].to_numpy(),
+        "transaction_count": amounts["count"].to_numpy(),
+        "first_date": dates[starts].view("datetime64[ns]"),
+        "last_date": dates[stops].view("datetime64[ns]"),
+        "gap_mean": stats["mean"].to_numpy(),
+        "gap_median": stats["median"].to_numpy(),
+        "gap_max": stats["max"].to_numpy(),
+    })
+    if name_col is not None:
+        frame[name_col] = totals[name_col].first().to_numpy()
+
+    edges = DAYS_BETWEEN_HISTOGRAM["bin_edges"]
+    known = ~np.isnan(gaps)
+    bins = np.searchsorted(edges, gaps[known], side="right") - 1
+    histograms = np.bincount(
+        sorted_entities[known] * len(edges) + bins, minlength=len(ids) * len(edges)
+    ).reshape(len(ids), len(edges))
+
+    pair_entities = sorted_entities[starts]
+    present = np.unique(pair_entities)
+    lo = np.searchsorted(pair_entities, present, side="left")
+    hi = np.searchsorted(pair_entities, present, side="right")
+    bounds = {ids[c]: (int(s), int(e), int(c)) for c, s, e in zip(present, lo, hi)}
+    return PairTable(frame, bounds, histograms)
+
+
+def build_pair_tables(df: pd.DataFrame, rank: np.ndarray, levels: Optional[List[str]] = None,
+                      customer_id_col: str = "customer_id") -> Dict[str, PairTable]:
+    """
+    Pair tables for the given entity levels (default: every PAIR_ENTITY_COLUMNS
+    level in df); rank is the dataset's customer_rank.
+    """
+    if customer_id_col not in df.columns:
+        return {}
+    if levels is None:
+        levels = [c for c in PAIR_ENTITY_COLUMNS if c in df.columns]
+    name_col = customer_id_col.replace("_id", "_name")
+    name_col = name_col if name_col in df.columns else None
+    customers, customer_ids = pd.factorize(df[customer_id_col], sort=True)
+    by_rank = np.empty_like(rank)
+    by_rank[rank] = np.arange(len(rank))     # row positions in (customer, date) order
+    return {
+        col: _pair_table(df, col, customer_id_col, customers, customer_ids, by_rank, name_col)
+        for col in levels
+    }
@@ -0,0 +1,183 @@
+"""
+Month partitioning of the transactions dataset.
+
+Every loaded dataset is split logically into (year, month) partitions with
+per-partition row counts and min/max statistics. Date filters are resolved
+against those statistics first, so whole months are pruned before any row
+is touched. When PARTITIONED_STORAGE is enabled the same partitions are also
+written to DATA_DIR/partitions as Parquet files (one per month) next to a
+manifest.json, which the out-of-core engine streams back batch by batch.
+Each file keeps its rows' positions in the dataset, so they can be streamed
+back in the original row order.
+Rows without a date share one "undated" partition that pruning never drops.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+UNDATED_KEY = -1    # month key of rows whose date is missing
+ROW_COLUMN = "_row"  # row position in the source dataset, stored in every partition file
+
+
+def month_keys(dates: pd.Series) -> np.ndarray:
+    """Encode each timestamp's (year, month) as one sortable int32; UNDATED_KEY for NaT."""
+    keys = dates.dt.year * 12 + dates.dt.month - 1
+    return keys.fillna(UNDATED_KEY).to_numpy(dtype=np.int32)
+
+
+def _key_label(key: int) -> str:
+    if key == UNDATED_KEY:
+        return "undated"
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+def partition_stats(df: pd.DataFrame, keys: np.ndarray) -> List[Dict]:
+    """Per-month row counts and min/max statistics, ordered by month."""
+    grouped = df.groupby(keys, sort=True).agg(
+        rows=("amount", "size"),
+        min_date=("date", "min"),
+        max_date=("date", "max"),
+        min_amount=("amount", "min"),
+        max_amount=("amount", "max"),
+    )
+    return [
+        {
+            "key": int(key),
+            "label": _key_label(int(key)),
+            "year": int(key) // 12 if key != UNDATED_KEY else None,
+            "month": int(key) % 12 + 1 if key != UNDATED_KEY else None,
+            "rows": int(row.rows),
+            "min_date": row.min_date,
+            "max_date": row.max_date,
+            "min_amount": float(row.min_amount),
+            "max_amount": float(row.max_amount),
+        }
+        for key, row in grouped.iterrows()
+    ]
+
+
+def date_bounds(range_days=None, start_date=None, end_date=None):
+    """The inclusive [start, end] window implied by the range filters (mirrors _apply_date_filters)."""
+    if start_date and end_date:
+        return pd.to_datetime(start_date), pd.to_datetime(end_date)
+    if range_days:
+        end = pd.Timestamp.today().normalize()
+        return end - pd.Timedelta(days=range_days), end
+    return None, None
+
+
+def prune_partitions(partitions: List[Dict], year=None, month=None, week=None, day=None,
+                     range_days=None, start_date=None, end_date=None) -> Optional[List[Dict]]:
+    """
+    Return the partitions that can hold rows matching the date filters, or
+    None when the filters cannot exclude any month (week/day alone, or none).
+    The undated partition is always kept; the row filters decide its rows.
+    """
+    start, end = date_bounds(range_days, start_date, end_date)
+    if start is None and end is None and year is None and month is None:
+        return None
+
+    return [
+        p for p in partitions
+        if p["key"] == UNDATED_KEY or (
+            (start is None or p["max_date"] >= start)
+            and (end is None or p["min_date"] <= end)
+            and (year is None or p["year"] == year)
+            and (month is None or p["month"] == month)
+        )
+    ]
+
+
+# ─── On-disk layout ────────────────────────────────────────────────────────
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError(
+            "PARTITIONED_STORAGE needs pyarrow; install it with `pip install pyarrow`"
+        ) from exc
+    return pq
+
+
+def _source_fingerprint(source: Path) -> Dict:
+    stat = source.stat()
+    return {"name": source.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_manifest(root: Path) -> Optional[Dict]:
+    """Read a partition manifest, restoring timestamps; None if there is none."""
+    path = root / MANIFEST_NAME
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text())
+    for p in manifest["partitions"]:
+        p["min_date"] = pd.Timestamp(p["min_date"])
+        p["max_date"] = pd.Timestamp(p["max_date"])
+    return manifest
+
+
+def is_current(root: Path, source: Path) -> bool:
+    """True if root already holds the partitions written from this source file."""
+    manifest = load_manifest(root)
+    return (
+        manifest is not None
+        and manifest.get("source") == _source_fingerprint(source)
+        and manifest.get("row_column") == ROW_COLUMN    # older layouts lack row positions
+    )
+
+
+def write_partitions(df: pd.DataFrame, keys: np.ndarray, partitions: List[Dict],
+                     root: Path, source: Path) -> Dict:
+    """
+    Write one Parquet file per month plus a manifest, replacing root as a whole.
+
+    The new layout is built in a sibling directory and renamed into place, so
+    readers never see a half-written set of partitions.
+    """
+    pq = _require_pyarrow()
+    import pyarrow as pa
+
+    staging = root.with_name(f".{root.name}.incoming")
+    shutil.rmtree(staging, ignore_errors=True)
+
+    order = np.argsort(keys, kind="stable")
+    bounds = np.searchsorted(keys[order], [p["key"] for p in partitions] + [np.iinfo(np.int32).max])
+    entries = []
+    for i, p in enumerate(partitions):
+        if p["key"] == UNDATED_KEY:
+            rel = Path("undated") / "part-0.parquet"
+        else:
+            rel = Path(f"year={p['year']:04d}") / f"month={p['month']:02d}" / "part-0.parquet"
+        (staging / rel).parent.mkdir(parents=True, exist_ok=True)
+        rows = order[bounds[i]:bounds[i + 1]]
+        chunk = df.take(rows).assign(**{ROW_COLUMN: rows})
+        pq.write_table(pa.Table.from_pandas(chunk, preserve_index=False), staging / rel)
+        entries.append({
+            **p,
+            "path": rel.as_posix(),
+            "min_date": p["min_date"].isoformat(),
+            "max_date": p["max_date"].isoformat(),
+        })
+
+    manifest = {
+        "source": _source_fingerprint(source),
+        "columns": list(df.columns),
+        "row_column": ROW_COLUMN,
+        "partitions": entries,
+    }
+    (staging / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+
+    retired = root.with_name(f".{root.name}.retired")
+    shutil.rmtree(retired, ignore_errors=True)
+    if root.exists():
+        os.replace(root, retired)
+    os.replace(staging, root)
+    shutil.rmtree(retired, ignore_errors=True)
+    return manifest
+
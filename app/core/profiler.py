@@ -0,0 +1,123 @@
+"""
+On-demand statistical sampling profiler.
+
+A ProfileSession samples Python stacks with sys._current_frames() from a
+background thread every interval, either for a number of seconds or until K
+requests whose path matches a pattern have finished, and folds them into
+collapsed stacks: one "outer;...;inner count" line per distinct stack, the
+input format of flamegraph.pl, speedscope and inferno.
+
+Nothing runs while no session is active: the request hooks (TimingMiddleware
+and TimedRoute's endpoint wrapper) only read the module global `session`.
+
+In request mode only the threads running a matching request's endpoint are
+sampled: the worker thread of a sync endpoint, or the event loop thread while
+an async endpoint runs (which then also shows other requests' async work).
+"""
+import contextvars
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+# Set by TimingMiddleware for requests the active session is profiling
+profiled_request: contextvars.ContextVar[bool] = contextvars.ContextVar("profiled_request", default=False)
+
+session: Optional["ProfileSession"] = None
+_start_lock = threading.Lock()
+
+# Innermost frames of a thread that is only waiting for work
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+class ProfileSession:
+    def __init__(self, seconds: float, requests: Optional[int] = None,
+                 path_pattern: Optional[str] = None, interval_ms: float = 5.0,
+                 include_idle: bool = False):
+        self.seconds = seconds
+        self.requests = requests
+        self.pattern = re.compile(path_pattern) if path_pattern else None
+        self.interval = interval_ms / 1000
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.finished_requests = 0
+        self.elapsed = 0.0
+        self.done = threading.Event()
+        self._threads: Counter = Counter()  # thread id -> matching endpoints running on it
+        self._lock = threading.Lock()
+
+    # ─── Request hooks ─────────────────────────────────────────────────────
+    def matches(self, path: str) -> bool:
+        return self.requests is not None and (self.pattern is None or self.pattern.search(path) is not None)
+
+    def enter_thread(self) -> None:
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.finished_requests += 1
+            if self.finished_requests >= self.requests:
+                self.done.set()
+
+    # ─── Sampling ──────────────────────────────────────────────────────────
+    def _sample(self, own_ident: int) -> None:
+        if self.requests is not None:
+            with self._lock:
+                targets = set(self._threads)
+            if not targets:
+                return
+        else:
+            targets = None
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or (targets is not None and ident not in targets):
+                continue
+            if not self.include_idle and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def run(self) -> None:
+        """Sample until the deadline or the request count is reached; blocking."""
+        global session
+        own_ident = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + self.seconds
+        try:
+            while not self.done.is_set() and time.perf_counter() < deadline:
+                self._sample(own_ident)
+                self.done.wait(self.interval)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            session = None
+            self.done.set()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def start(new_session: ProfileSession) -> bool:
+    """Make new_session the active one; False if another session is running."""
+    global session
+    with _start_lock:
+        if session is not None:
+            return False
+        session = new_session
+        return True
@@ -0,0 +1,264 @@
+"""
+Day-level rollup of the transactions dataset.
+
+Built once per dataset version: for each entity level, and once over the
+whole dataset, the rows are reduced to one record per (entity, day) with the
+count, sum, sum of squares, min and max of `amount`. Time series and window
+totals re-aggregate those records, so their cost follows the number of days
+an entity was active rather than its number of transactions.
+
+Rows stamped exactly at midnight are kept in a bucket of their own (ordered
+before the rest of that day), because a range filter ends *at* midnight of
+its end date (`date <= end`): the end day contributes only its midnight
+bucket. A bound that is not a whole day cannot be answered from days, and
+DayRollup.days / totals return None for it.
+
+Rows without a date get one "undated" record per entity, placed before its
+days and carrying NaN year, month, week and day. No date filter selects it,
+but unfiltered totals include it, like the row path's totals do.
+
+Each rollup also keeps per-entity running totals (prefix sums) of count, sum
+and sum of squares, so the totals, mean and variance of any contiguous
+window are the difference of two prefix entries, found by binary search.
+
+Counts are exact, but a period's sum adds up day sums where the row path
+adds up rows, so the two can differ in the last bits of a float. Sums still
+agree once rounded to cents; a mean that lands on a half cent (a sum of odd
+cents over an even count) can round to either neighbouring cent, so rollup
+averages may differ from the row path by 0.01 there.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .partitions import date_bounds
+
+# Entity levels that get a day rollup (customers would be as large as the data)
+ROLLUP_ENTITY_COLUMNS = ["merchant_id", "agent_id", "terminal_id", "branch_admin_id"]
+
+_AGGS = {
+    "count": ("amount", "count"),
+    "sum": ("amount", "sum"),
+    "sumsq": ("amount_sq", "sum"),
+    "min": ("amount", "min"),
+    "max": ("amount", "max"),
+}
+
+
+def is_day_rollup(df: pd.DataFrame) -> bool:
+    """True for a frame returned by DayRollup.days / days_for rather than transaction rows."""
+    return "sumsq" in df.columns
+
+
+class DayRollup:
+    """Per-(entity, day) amount totals of one entity level, sorted by entity then day."""
+
+    def __init__(self, frame: pd.DataFrame, bounds: Dict, entity: np.ndarray, ids: np.ndarray):
+        self.frame = frame
+        self.bounds = bounds            # entity id -> (start, stop) positions in frame
+        self._entity = entity           # per record: position of its entity id in ids
+        self._ids = ids
+        self._day = frame["date"].to_numpy()
+        self._after_midnight = frame["after_midnight"].to_numpy()
+        # Sort key within an entity: the day in ns, +1 for the after-midnight bucket
+        # (the undated record's NaT is the smallest int64, so it sorts first)
+        self._key = self._day.view(np.int64) + self._after_midnight
+        # Running totals restart at every entity, so windows never subtract large offsets
+        running = frame[["count", "sum", "sumsq"]].groupby(entity, sort=False).cumsum()
+        self._cum_count = running["count"].to_numpy(dtype=np.int64)
+        self._cum_sum = running["sum"].to_numpy(dtype=np.float64)
+        self._cum_sumsq = running["sumsq"].to_numpy(dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __contains__(self, entity_id) -> bool:
+        return entity_id in self.bounds
+
+    @property
+    def memory_bytes(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum())
+
+    def days(self, entity_id=None, year=None, month=None, week=None, day=None,
+             range_days=None, start_date=None, end_date=None) -> Optional[pd.DataFrame]:
+        """
+        The entity's day records matching the date filters (same semantics as
+        the backends' apply_date_filters), or None if a range bound falls
+        inside a day. An unknown entity gives an empty frame.
+        """
+        lo, hi = self.bounds.get(entity_id, (0, 0))
+        mask = self._match(slice(lo, hi), year, month, week, day, range_days, start_date, end_date)
+        if mask is None:
+            return None
+        frame = self.frame.iloc[lo:hi]
+        return frame if mask.all() else frame[mask]
+
+    def days_for(self, entity_ids, entity_col: str = "entity_id", year=None, month=None, week=None,
+                 day=None, range_days=None, start_date=None, end_date=None) -> Optional[pd.DataFrame]:
+        """days() for many entities at once, with their id in entity_col; unknown ids are skipped."""
+        spans = [self.bounds[e] for e in dict.fromkeys(entity_ids) if e in self.bounds]
+        lengths = np.array([hi - lo for lo, hi in spans], dtype=np.int64)
+        starts = np.array([lo for lo, _ in spans], dtype=np.int64)
+        # Concatenated ranges [lo, hi) of every span, without a Python loop over records
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        mask = self._match(positions, year, month, week, day, range_days, start_date, end_date)
+        if mask is None:
+            return None
+        positions = positions[mask]
+        frame = self.frame.take(positions)
+        frame.insert(0, entity_col, self._ids[self._entity[positions]])
+        return frame
+
+    def _match(self, rows, year, month, week, day, range_days, start_date, end_date) -> Optional[np.ndarray]:
+        """Mask over the records `rows` (slice or positions) for the date filters; None if unanswerable."""
+        start, end = date_bounds(range_days, start_date, end_date)
+        if start is not None and (start != start.normalize() or end != end.normalize()):
+            return None
+        key = self._key[rows]
+        mask = np.ones(len(key), dtype=bool)
+        if start is not None:
+            mask &= (key >= start.value) & (key <= end.value)
+        for col, value in (("year", year), ("month", month), ("week", week), ("day", day)):
+            if value is not None:
+                mask &= self.frame[col].to_numpy()[rows] == value
+        return mask
+
+    def span(self, entity_id) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """First and last day the entity has records (NaT, NaT if none)."""
+        lo, hi = self.bounds.get(entity_id, (0, 0))
+        lo += int(np.isnat(self._day[lo:hi]).sum())     # skip the undated record
+        if hi == lo:
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(self._day[lo]), pd.Timestamp(self._day[hi - 1])
+
+    def _positions(self, entity_id, start_ns, stop_ns) -> Tuple[int, np.ndarray, np.ndarray]:
+        """The entity's first record and the record positions [i, j) of ns windows."""
+        lo, hi = self.bounds.get(entity_id, (0, 0))
+        key = self._key[lo:hi]
+        return lo, lo + np.searchsorted(key, start_ns, "left"), lo + np.searchsorted(key, stop_ns, "left")
+
+    @staticmethod
+    def _between(cum: np.ndarray, lo: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Sum of records [i, j) from an entity's running totals: two lookups."""
+        upper = np.where(j > lo, cum[np.maximum(j - 1, 0)], 0)
+        lower = np.where(i > lo, cum[np.maximum(i - 1, 0)], 0)
+        return np.where(j > i, upper - lower, 0)
+
+    def _summary(self, lo: int, i: np.ndarray, j: np.ndarray) -> pd.DataFrame:
+        count = self._between(self._cum_count, lo, i, j)
+        total = self._between(self._cum_sum, lo, i, j)
+        sumsq = self._between(self._cum_sumsq, lo, i, j)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, total / count, np.nan)
+            std = np.sqrt(np.maximum(sumsq - total * mean, 0) / (count - 1))
+        return pd.DataFrame({
+            "records": j - i,
+            "count": count,
+            "sum": total,
+            "mean": mean,
+            "std": np.where(count > 1, std, np.nan),
+        })
+
+    def windows(self, entity_id, starts, stops) -> pd.DataFrame:
+        """
+        Records, count, sum, mean and sample std of amount for many half-open
+        windows [starts, stops) of one entity in one vectorized pass, one row
+        per window in input order. Bounds are whole days; a stop one
+        nanosecond past midnight keeps that day's midnight bucket, like the
+        `date <= end` range filter.
+        """
+        starts = pd.DatetimeIndex(np.atleast_1d(starts)).asi8
+        stops = pd.DatetimeIndex(np.atleast_1d(stops)).asi8
+        return self._summary(*self._positions(entity_id, starts, stops))
+
+    def totals(self, entity_id=None, year=None, month=None, week=None, day=None,
+               range_days=None, start_date=None, end_date=None) -> Optional[Dict]:
+        """
+        Records, count, sum, mean, min, max and std of amount under the date
+        filters, or None if a range bound falls inside a day. Range and
+        year[/month] filters form one contiguous window answered from the
+        running totals; week, day or a month without a year select scattered
+        days, which are re-aggregated instead.
+        """
+        start, end = date_bounds(range_days, start_date, end_date)
+        if start is not None and (start != start.normalize() or end != end.normalize()):
+            return None
+
+        if week is None and day is None and (month is None or year is not None):
+            start_ns, stop_ns = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+            if start is not None:
+                start_ns, stop_ns = start.value, end.value + 1
+            if year is not None:
+                first = pd.Timestamp(year=year, month=month or 1, day=1)
+                after = first + (pd.DateOffset(months=1) if month else pd.DateOffset(years=1))
+                start_ns, stop_ns = max(start_ns, first.value), min(stop_ns, after.value)
+            lo, i, j = self._positions(entity_id, np.array([start_ns]), np.array([stop_ns]))
+            totals = self._summary(lo, i, j).iloc[0].to_dict()
+            records = slice(int(i[0]), max(int(j[0]), int(i[0])))
+            low, high = self.frame["min"].to_numpy()[records], self.frame["max"].to_numpy()[records]
+        else:
+            days = self.days(entity_id, year=year, month=month, week=week, day=day,
+                             range_days=range_days, start_date=start_date, end_date=end_date)
+            count, total, sumsq = days["count"].sum(), days["sum"].sum(), days["sumsq"].sum()
+            mean = total / count if count else np.nan
+            totals = {
+                "records": len(days), "count": count, "sum": total, "mean": mean,
+                "std": np.sqrt(max(sumsq - total * mean, 0) / (count - 1)) if count > 1 else np.nan,
+            }
+            low, high = days["min"].to_numpy(), days["max"].to_numpy()
+
+        totals["records"], totals["count"] = int(totals["records"]), int(totals["count"])
+        totals["min"] = float(np.nanmin(low)) if len(low) and not np.isnan(low).all() else np.nan
+        totals["max"] = float(np.nanmax(high)) if len(high) and not np.isnan(high).all() else np.nan
+        return totals
+
+
+def _reduce(df: pd.DataFrame, base: pd.DataFrame, entity_id_col: Optional[str]) -> DayRollup:
+    """Group the shared (day, after_midnight, amount) columns by entity and day."""
+    if entity_id_col is None:
+        codes, uniques = np.zeros(len(df), dtype=np.int64), np.array([None], dtype=object)
+    else:
+        codes, uniques = pd.factorize(df[entity_id_col])
+    frame = base.assign(entity=codes)
+    if (codes < 0).any():
+        frame = frame[codes >= 0]         # rows without an entity id
+    grouped = frame.groupby(["entity", "date", "after_midnight"], sort=True, dropna=False).agg(**_AGGS)
+    grouped = grouped.reset_index()
+    undated = grouped["date"].isna().to_numpy()
+    if undated.any():
+        # Each entity's undated record (sorted last by groupby) goes before its days
+        grouped = grouped.take(np.lexsort((~undated, grouped["entity"].to_numpy()))).reset_index(drop=True)
+
+    entity = grouped.pop("entity").to_numpy()
+    dates = grouped["date"].dt
+    grouped["year"] = dates.year
+    grouped["month"] = dates.month
+    grouped["day"] = dates.day
+    week = dates.isocalendar().week
+    grouped["week"] = week.to_numpy(dtype=np.float64, na_value=np.nan) if week.hasnans else week.to_numpy(dtype=np.int64)
+
+    present = np.unique(entity)
+    starts = np.searchsorted(entity, present, side="left")
+    stops = np.searchsorted(entity, present, side="right")
+    bounds = {uniques[c]: (int(s), int(e)) for c, s, e in zip(present, starts, stops)}
+    return DayRollup(grouped, bounds, entity, uniques)
+
+
+def build_rollups(df: pd.DataFrame, levels: Optional[List[Optional[str]]] = None) -> Dict[Optional[str], DayRollup]:
+    """
+    Day rollups for the given entity levels (None = the whole dataset); by
+    default every ROLLUP_ENTITY_COLUMNS level in df plus the global one.
+    """
+    date = df["date"]
+    day = date.dt.normalize()
+    amount = df["amount"].astype("float64")
+    base = pd.DataFrame({
+        "date": day,
+        "after_midnight": ((date != day) & date.notna()).to_numpy(),
+        "amount": amount,
+        "amount_sq": amount * amount,
+    })
+    if levels is None:
+        levels = [None] + [c for c in ROLLUP_ENTITY_COLUMNS if c in df.columns]
+    return {col: _reduce(df, base, col) for col in levels}
@@ -0,0 +1,122 @@
+"""
+Slow-request log.
+
+Requests slower than SLOW_REQUEST_MS (time to the response start) are
+appended as one JSON object per line to DATA_DIR/slow_requests.jsonl, which
+rotates at SLOW_LOG_MAX_BYTES keeping SLOW_LOG_BACKUPS old files
+(slow_requests.jsonl.1, ...). Each entry carries what is needed to replay the
+request (method, path, query string, JSON body) and what it cost: route
+template, entity ID, date filters, the structured filter and result size
+noted by the handler, response bytes, dataset generation and rows, and the
+per-stage timing of app.core.timing.
+
+benchmarks/replay_slow.py reads this format back.
+"""
+import json
+import logging
+import logging.handlers
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+from .config import settings
+
+LOG_NAME = "slow_requests.jsonl"
+DATE_FILTER_PARAMS = ("year", "month", "week", "day", "range_days", "start_date", "end_date")
+
+logger = logging.getLogger(__name__)
+_logger: Optional[logging.Logger] = None
+_logger_path: Optional[Path] = None
+_lock = threading.Lock()
+
+
+def log_path() -> Path:
+    return settings.DATA_DIR / LOG_NAME
+
+
+def _get_logger() -> logging.Logger:
+    """The rotating JSONL writer, reopened if DATA_DIR changes."""
+    global _logger, _logger_path
+    path = log_path()
+    with _lock:
+        if _logger is None or _logger_path != path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            logger = logging.getLogger("app.slow_requests")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=settings.SLOW_LOG_MAX_BYTES, backupCount=settings.SLOW_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger, _logger_path = logger, path
+        return _logger
+
+
+def stage_breakdown(spans) -> List[Dict]:
+    """Spans folded per stage name, in first-seen order."""
+    stages: Dict[str, Dict] = {}
+    for span in spans:
+        stage = stages.setdefault(span.name, {"stage": span.name, "count": 0, "ms": 0.0})
+        stage["count"] += 1
+        stage["ms"] += span.seconds * 1000
+        if span.rows:
+            stage["rows"] = stage.get("rows", 0) + span.rows
+    for stage in stages.values():
+        stage["ms"] = round(stage["ms"], 3)
+    return list(stages.values())
+
+
+def record(scope: Dict, status: int, seconds: float, spans, notes: Dict,
+           response_bytes: int, body: Optional[bytes], dataset) -> None:
+    """Append one slow request; never raises into the request that triggered it."""
+    try:
+        query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        route = scope.get("route")
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "route": route.path if route else None,
+            "path_params": scope.get("path_params") or {},
+            "date_filters": {k: query[k] for k in DATE_FILTER_PARAMS if k in query},
+            "body": _decode_body(body),
+            "status": status,
+            "duration_ms": round(seconds * 1000, 3),
+            "response_bytes": response_bytes,
+            "dataset": {"generation": dataset.generation, "rows": len(dataset.df)} if dataset else None,
+            **notes,
+            "stages": stage_breakdown(spans),
+        }
+        _get_logger().info(json.dumps(entry, default=str))
+    except Exception:
+        logger.warning("Could not write slow-request log entry", exc_info=True)
+
+
+def _decode_body(body: Optional[bytes]):
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def read_entries(path: Optional[Path] = None) -> List[Dict]:
+    """All entries of the log and its rotated files, oldest first."""
+    path = Path(path) if path else log_path()
+    rotated = [p for p in path.parent.glob(path.name + ".*") if p.suffix[1:].isdigit()]
+    files = sorted(rotated, key=lambda p: int(p.suffix[1:]), reverse=True) + [path]
+    entries = []
+    for file in files:
+        if file.exists():
+            with open(file, encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+    return entries
@@ -0,0 +1,294 @@
+"""
+Per-stage request timing.
+
+`with span("name") as s:` times a block (set s.rows to record how many rows
+it handled) and @timed("name") times a function. Inside a request every span
+is collected by TimingMiddleware and reported in the Server-Timing response
+header; every span also feeds stage_stats, the in-process aggregate served
+at GET /timing/stats. Spans nest (filter_entity_data runs inside endpoint),
+so stage durations overlap rather than add up to the total.
+
+TimedRoute splits each request into endpoint (the handler body), serialize
+(dependency solving, response_model validation and jsonable_encoder) and
+render (JSON encoding of the body).
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+from app.core import profiler, slow_log
+from app.core.config import settings
+from app.core.data import loaded_dataset
+from app.core.metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_REQUEST_SECONDS
+
+# The spans of the request being served; None outside a request
+_request_spans: contextvars.ContextVar[Optional[List["Span"]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+# Facts a handler notes about the request (filter structure, result size) for the slow-request log
+_request_notes: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("request_notes", default=None)
+
+# Largest JSON request body kept for the slow-request log
+_MAX_CAPTURED_BODY = 64 * 1024
+
+
+class Span:
+    __slots__ = ("name", "rows", "seconds")
+
+    def __init__(self, name: str, rows: Optional[int] = None):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+
+
+class _StageStats:
+    """Count, total / max duration and rows per stage name, across requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None) -> None:
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = [0, 0.0, 0.0, 0]
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2] = max(stage[2], seconds)
+            stage[3] += rows or 0
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: item[1][1], reverse=True)
+            snapshot = {}
+            for name, (count, total, longest, rows) in stages:
+                snapshot[name] = {
+                    "count": count,
+                    "total_ms": round(total * 1000, 3),
+                    "mean_ms": round(total / count * 1000, 3),
+                    "max_ms": round(longest * 1000, 3),
+                }
+                if rows:
+                    snapshot[name]["rows"] = rows
+            return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+
+stage_stats = _StageStats()
+route_stats = _StageStats()
+
+
+def _record(current: Span) -> None:
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append(current)
+    stage_stats.record(current.name, current.seconds, current.rows)
+
+
+@contextmanager
+def span(name: str, rows: Optional[int] = None):
+    current = Span(name, rows)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - started
+        _record(current)
+
+
+def timed(name: str, rows: Optional[Callable] = None):
+    """
+    Decorator timing each call as span name. rows(result) gives the row
+    count; by default it is the row count of a DataFrame first argument.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name) as current:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    current.rows = rows(result)
+                elif args and hasattr(args[0], "shape"):
+                    current.rows = args[0].shape[0]
+                return result
+        return wrapper
+    return decorate
+
+
+def annotate(**notes) -> None:
+    """Attach notes to the current request's slow-request log entry; no-op outside a request."""
+    current = _request_notes.get()
+    if current is not None:
+        current.update(notes)
+
+
+def server_timing(spans: List[Span], total: float) -> str:
+    """Server-Timing header value, one metric per stage name (repeats are summed)."""
+    stages: Dict[str, list] = {}
+    for current in spans:
+        stage = stages.setdefault(current.name, [0, 0.0, 0])
+        stage[0] += 1
+        stage[1] += current.seconds
+        stage[2] += current.rows or 0
+    metrics = []
+    for name, (count, seconds, rows) in stages.items():
+        desc = " ".join(part for part in (f"{count}x" if count > 1 else "",
+                                           f"{rows} rows" if rows else "") if part)
+        metrics.append(f'{name};dur={seconds * 1000:.2f}' + (f';desc="{desc}"' if desc else ""))
+    metrics.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+# ─── Middleware and route class ────────────────────────────────────────────
+class TimingMiddleware:
+    """
+    Collects the spans of each HTTP request and adds them as a Server-Timing
+    header; also feeds the request metrics served at /metrics and writes
+    requests slower than SLOW_REQUEST_MS to the slow-request log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: List[Span] = []
+        notes: Dict = {}
+        token = _request_spans.set(spans)
+        notes_token = _request_notes.set(notes)
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        profiling = profiler.session
+        if profiling is not None and profiling.matches(scope["path"]):
+            profile_token = profiler.profiled_request.set(True)
+        else:
+            profiling = None
+
+        response = {"status": None, "seconds": 0.0, "bytes": 0}
+        body = dataset = None
+        if settings.SLOW_REQUEST_MS > 0:
+            dataset = loaded_dataset()
+            if (dict(scope["headers"]).get(b"content-type") or b"").startswith(b"application/json"):
+                body = bytearray()
+                receive = self._capturing(receive, body)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                response["status"], response["seconds"] = message["status"], total
+                route = scope.get("route")
+                # Route templates, not raw paths, so IDs do not multiply the keys
+                path = route.path if route else "unmatched"
+                route_stats.record(f'{scope["method"]} {path}', total)
+                HTTP_REQUEST_SECONDS.labels(scope["method"], path).observe(total)
+                HTTP_REQUESTS.labels(scope["method"], path, message["status"]).inc()
+                if settings.SERVER_TIMING_HEADER:
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing(spans, total))
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            if profiling is not None:
+                profiler.profiled_request.reset(profile_token)
+                profiling.request_finished()
+            _request_spans.reset(token)
+            _request_notes.reset(notes_token)
+
+        # The response is already sent, so logging never delays the client
+        if 0 < settings.SLOW_REQUEST_MS <= response["seconds"] * 1000:
+            await run_in_threadpool(
+                slow_log.record, scope, response["status"], response["seconds"], spans, notes,
+                response["bytes"], bytes(body) if body is not None else None, dataset,
+            )
+
+    @staticmethod
+    def _capturing(receive, body: bytearray):
+        async def receive_capturing():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < _MAX_CAPTURED_BODY:
+                body.extend(message.get("body", b""))
+            return message
+        return receive_capturing
+
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with span("render"):
+            return super().render(content)
+
+
+def _timed_endpoint(endpoint):
+    if getattr(endpoint, "__timed__", False):
+        return endpoint  # include_router re-creates routes from already wrapped endpoints
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with span("endpoint"):
+                profiling = profiler.session
+                if profiling is None or not profiler.profiled_request.get():
+                    return await endpoint(*args, **kwargs)
+                profiling.enter_thread()
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    profiling.exit_thread()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            with span("endpoint"):
+                profiling = profiler.session
+                if profiling is None or not profiler.profiled_request.get():
+                    return endpoint(*args, **kwargs)
+                profiling.enter_thread()
+                try:
+                    return endpoint(*args, **kwargs)
+                finally:
+                    profiling.exit_thread()
+    wrapper.__timed__ = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that times the endpoint body and derives the serialize stage from the rest."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            spans = _request_spans.get()
+            first = len(spans) if spans is not None else 0
+            started = time.perf_counter()
+            response = await handler(request)
+            if spans is not None:
+                elapsed = time.perf_counter() - started
+                # Spans of concurrent requests never share a list, so these are ours
+                accounted = sum(s.seconds for s in spans[first:] if s.name in ("endpoint", "render"))
+                serialize = Span("serialize")
+                serialize.seconds = max(elapsed - accounted, 0.0)
+                _record(serialize)
+            return response
+
+        return timed_handler
@@ -6,14 +6,40 @@ from app.utils.analytics import (
     _get_filter_suffix, _apply_date_filters, _get_average_transaction_over_time,
     _get_days_between_transactions, _get_transaction_outliers, _get_segmentation,
     _get_top_entities, _get_transaction_volume_over_time, _get_transaction_count_over_time,
-    _get_transaction_metrics_per_entity
+    _get_transaction_metrics_per_entity, _get_transaction_frequency_analysis, _stats_totals
 )
 
+# Distinct counts in the agent stats: totals key -> column
+AGENT_STATS_DISTINCT = {
+    "unique_customers": "customer_id",
+    "unique_merchants": "merchant_id",
+    "unique_terminals": "terminal_id",
+}
+
+def get_agent_stats(df: pd.DataFrame, filters: dict, totals: dict = None) -> list:
+    """totals: precomputed values (entity_totals, batch stats); df only supplies the rest."""
+    suffix = _get_filter_suffix(filters)
+    totals = _stats_totals(df, totals, AGENT_STATS_DISTINCT)
+
+    return [
+        SimpleStat(metric=f"Total Transaction Value{suffix}", value=round(totals["sum"], 2)),
+        SimpleStat(metric=f"Average Transaction Value{suffix}", value=round(totals["mean"], 2)),
+        SimpleStat(metric=f"Transaction Count{suffix}", value=int(totals["count"])),
+        SimpleStat(metric=f"Unique Customers{suffix}", value=int(totals["unique_customers"])),
+        SimpleStat(metric=f"Unique Merchants{suffix}", value=int(totals["unique_merchants"])),
+        SimpleStat(metric=f"Unique Terminals{suffix}", value=int(totals["unique_terminals"])),
+    ]
+
 def get_average_transaction_over_time(df: pd.DataFrame, granularity: str, filters: dict) -> GraphData:
     return _get_average_transaction_over_time(df, granularity, filters)
     
-def get_days_between_transactions(df: pd.DataFrame, filters: dict) -> TableData:
-    return _get_days_between_transactions(df, filters, entity_id_col="agent_id")
+def get_days_between_transactions(df: pd.DataFrame, filters: dict, mode: str = "raw",
+                                  limit: int = None, after: int = None, rank=None,
+                                  histogram=None, generation: int = 0) -> TableData:
+    return _get_days_between_transactions(
+        df, filters, entity_id_col="agent_id", mode=mode, limit=limit, after=after,
+        rank=rank, histogram=histogram, generation=generation
+    )
 
 def get_transaction_outliers(df: pd.DataFrame, filters: dict) -> TableData:
     return _get_transaction_outliers(df, filters, entity_id_col="agent_id")
@@ -81,65 +107,15 @@ def get_transaction_count_over_time(df: pd.DataFrame, granularity: str, filters:
 
 def get_transaction_frequency_analysis(df: pd.DataFrame, filters: dict) -> TableData:
     """Analyze transaction frequency patterns for an agent."""
-    suffix = _get_filter_suffix(filters)
-
-    # Get transaction counts by day of week
-    df['day_of_week'] = df['date'].dt.day_name()
-    day_counts = df.groupby('day_of_week')['transaction_id'].count().reset_index()
-    day_counts.columns = ['day_of_week', 'transaction_count']
-    day_counts = day_counts.sort_values(by='transaction_count', ascending=False)
-
-    # Get transaction counts by hour of day
-    df['hour_of_day'] = df['date'].dt.hour
-    hour_counts = df.groupby('hour_of_day')['transaction_id'].count().reset_index()
-    hour_counts.columns = ['hour_of_day', 'transaction_count']
-    hour_counts = hour_counts.sort_values(by='transaction_count', ascending=False)
-
-    # Get transaction counts by month of year
-    df['month_of_year'] = df['date'].dt.month_name()
-    month_counts = df.groupby('month_of_year')['transaction_id'].count().reset_index()
-    month_counts.columns = ['month_of_year', 'transaction_count']
-    month_counts = month_counts.sort_values(by='transaction_count', ascending=False)
-
-    # Get transaction counts by quarter of year
-    df['quarter_of_year'] = 'Q' + df['date'].dt.quarter.astype(str)
-    quarter_counts = df.groupby('quarter_of_year')['transaction_id'].count().reset_index()
-    quarter_counts.columns = ['quarter_of_year', 'transaction_count']
-    quarter_counts = quarter_counts.sort_values(by='transaction_count', ascending=False)
-
-    # Calculate average transactions per day
-    avg_daily = df.groupby(df['date'].dt.date)['transaction_id'].count().mean()
-
-    # Calculate days with transactions vs total days in period
-    total_days = (df['date'].max() - df['date'].min()).days + 1
-    days_with_transactions = df['date'].dt.date.nunique()
-    activity_rate = round((days_with_transactions / total_days) * 100, 2) if total_days > 0 else 0
-
-    # Agent-specific metrics
-    unique_merchants = df['merchant_id'].nunique()
-    unique_customers = df['customer_id'].nunique()
-    unique_terminals = df['terminal_id'].nunique()
-
-    # Prepare result
-    result = {
-        "summary": [
-            {"metric": f"Average Daily Transactions{suffix}", "value": round(avg_daily, 2)},
-            {"metric": f"Days with Activity{suffix}", "value": days_with_transactions},
-            {"metric": f"Total Days in Period{suffix}", "value": total_days},
-            {"metric": f"Activity Rate (%){suffix}", "value": activity_rate},
-            {"metric": f"Unique Merchants{suffix}", "value": unique_merchants},
-            {"metric": f"Unique Customers{suffix}", "value": unique_customers},
-            {"metric": f"Unique Terminals{suffix}", "value": unique_terminals}
-        ],
-        "day_of_week": day_counts.to_dict(orient="records"),
-        "hour_of_day": hour_counts.to_dict(orient="records"),
-        "month_of_year": month_counts.to_dict(orient="records"),
-        "quarter_of_year": quarter_counts.to_dict(orient="records")
-    }
-
-    return TableData(
-        metric=f"Agent Transaction Frequency Analysis{suffix}",
-        data=result
+    return _get_transaction_frequency_analysis(
+        df,
+        filters,
+        metric_name="Agent Transaction Frequency Analysis",
+        unique_cols={
+            "Unique Merchants": "merchant_id",
+            "Unique Customers": "customer_id",
+            "Unique Terminals": "terminal_id"
+        }
     )
 
 def get_transaction_count_per_merchant(df: pd.DataFrame, granularity: str, filters: dict = None) -> dict:
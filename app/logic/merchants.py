@@ -5,20 +5,26 @@ from app.models.stats import SimpleStat, GraphData, GraphPoints, TableData
 from app.utils.analytics import (
     _get_filter_suffix, _apply_date_filters, _get_average_transaction_over_time,
     _get_days_between_transactions, _get_transaction_outliers, _get_segmentation,
-    _get_top_entities, _get_transaction_volume_over_time, _get_transaction_count_over_time
+    _get_top_entities, _get_transaction_volume_over_time, _get_transaction_count_over_time,
+    _get_transaction_frequency_analysis, _stats_totals
 )
 
-def get_merchant_stats(df: pd.DataFrame, filters: dict) -> List[SimpleStat]:
+# Distinct counts in the merchant stats: totals key -> column
+MERCHANT_STATS_DISTINCT = {"unique_terminals": "terminal_id", "unique_branches": "branch_admin_id"}
+
+def get_merchant_stats(df: pd.DataFrame, filters: dict, totals: dict = None) -> List[SimpleStat]:
+    """totals: precomputed values (entity_totals, batch stats); df only supplies the rest."""
     suffix = _get_filter_suffix(filters)
+    totals = _stats_totals(df, totals, MERCHANT_STATS_DISTINCT)
 
     stats = [
-        SimpleStat(metric=f"Total Transaction Value{suffix}", value=round(df["amount"].sum(), 2)),
-        SimpleStat(metric=f"Average Transaction Value{suffix}", value=round(df["amount"].mean(), 2)),
-        SimpleStat(metric=f"Min Transaction Value{suffix}", value=round(df["amount"].min(), 2)),
-        SimpleStat(metric=f"Max Transaction Value{suffix}", value=round(df["amount"].max(), 2)),
-        SimpleStat(metric=f"Transaction Count{suffix}", value=int(df["amount"].count())),
-        SimpleStat(metric=f"Unique Terminals{suffix}", value=int(df["terminal_id"].nunique())),
-        SimpleStat(metric=f"Total Branches{suffix}", value=int(df["branch_admin_id"].nunique()))
+        SimpleStat(metric=f"Total Transaction Value{suffix}", value=round(totals["sum"], 2)),
+        SimpleStat(metric=f"Average Transaction Value{suffix}", value=round(totals["mean"], 2)),
+        SimpleStat(metric=f"Min Transaction Value{suffix}", value=round(totals["min"], 2)),
+        SimpleStat(metric=f"Max Transaction Value{suffix}", value=round(totals["max"], 2)),
+        SimpleStat(metric=f"Transaction Count{suffix}", value=int(totals["count"])),
+        SimpleStat(metric=f"Unique Terminals{suffix}", value=int(totals["unique_terminals"])),
+        SimpleStat(metric=f"Total Branches{suffix}", value=int(totals["unique_branches"]))
     ]
 
     return stats
@@ -26,8 +32,13 @@ def get_merchant_stats(df: pd.DataFrame, filters: dict) -> List[SimpleStat]:
 def get_average_transaction_over_time(df: pd.DataFrame, granularity: str, filters: dict) -> GraphData:
     return _get_average_transaction_over_time(df, granularity, filters)
     
-def get_days_between_transactions(df: pd.DataFrame, filters: dict) -> TableData:
-    return _get_days_between_transactions(df, filters, entity_id_col="merchant_id")
+def get_days_between_transactions(df: pd.DataFrame, filters: dict, mode: str = "raw",
+                                  limit: int = None, after: int = None, rank=None,
+                                  histogram=None, generation: int = 0) -> TableData:
+    return _get_days_between_transactions(
+        df, filters, entity_id_col="merchant_id", mode=mode, limit=limit, after=after,
+        rank=rank, histogram=histogram, generation=generation
+    )
 
 def get_transaction_outliers(df: pd.DataFrame, filters: dict) -> TableData:
     return _get_transaction_outliers(df, filters, entity_id_col="merchant_id")
@@ -71,55 +82,4 @@ def apply_merchant_date_filters(df, year=None, month=None, week=None, day=None,
 
 def get_transaction_frequency_analysis(df: pd.DataFrame, filters: dict) -> TableData:
     """Analyze transaction frequency patterns for a merchant."""
-    suffix = _get_filter_suffix(filters)
-    
-    # Get transaction counts by day of week
-    df['day_of_week'] = df['date'].dt.day_name()
-    day_counts = df.groupby('day_of_week')['transaction_id'].count().reset_index()
-    day_counts.columns = ['day_of_week', 'transaction_count']
-    day_counts = day_counts.sort_values(by='transaction_count', ascending=False)
-    
-    # Get transaction counts by hour of day
-    df['hour_of_day'] = df['date'].dt.hour
-    hour_counts = df.groupby('hour_of_day')['transaction_id'].count().reset_index()
-    hour_counts.columns = ['hour_of_day', 'transaction_count']
-    hour_counts = hour_counts.sort_values(by='transaction_count', ascending=False)
-    
-    # Get transaction counts by month of year
-    df['month_of_year'] = df['date'].dt.month_name()
-    month_counts = df.groupby('month_of_year')['transaction_id'].count().reset_index()
-    month_counts.columns = ['month_of_year', 'transaction_count']
-    month_counts = month_counts.sort_values(by='transaction_count', ascending=False)
-    
-    # Get transaction counts by quarter of year
-    df['quarter_of_year'] = 'Q' + df['date'].dt.quarter.astype(str)
-    quarter_counts = df.groupby('quarter_of_year')['transaction_id'].count().reset_index()
-    quarter_counts.columns = ['quarter_of_year', 'transaction_count']
-    quarter_counts = quarter_counts.sort_values(by='transaction_count', ascending=False)
-    
-    # Calculate average transactions per day
-    avg_daily = df.groupby(df['date'].dt.date)['transaction_id'].count().mean()
-    
-    # Calculate days with transactions vs total days in period
-    total_days = (df['date'].max() - df['date'].min()).days + 1
-    days_with_transactions = df['date'].dt.date.nunique()
-    activity_rate = round((days_with_transactions / total_days) * 100, 2) if total_days > 0 else 0
-    
-    # Prepare result
-    result = {
-        "summary": [
-            {"metric": f"Average Daily Transactions{suffix}", "value": round(avg_daily, 2)},
-            {"metric": f"Days with Activity{suffix}", "value": days_with_transactions},
-            {"metric": f"Total Days in Period{suffix}", "value": total_days},
-            {"metric": f"Activity Rate (%){suffix}", "value": activity_rate}
-        ],
-        "day_of_week": day_counts.to_dict(orient="records"),
-        "hour_of_day": hour_counts.to_dict(orient="records"),
-        "month_of_year": month_counts.to_dict(orient="records"),
-        "quarter_of_year": quarter_counts.to_dict(orient="records")
-    }
-    
-    return TableData(
-        metric=f"Transaction Frequency Analysis{suffix}",
-        data=result
-    )
+    return _get_transaction_frequency_analysis(df, filters, metric_name="Transaction Frequency Analysis")
@@ -10,8 +10,13 @@ from app.utils.analytics import (
 def get_average_transaction_over_time(df: pd.DataFrame, granularity: str, filters: dict) -> GraphData:
     return _get_average_transaction_over_time(df, granularity, filters)
     
-def get_days_between_transactions(df: pd.DataFrame, filters: dict) -> TableData:
-    return _get_days_between_transactions(df, filters, entity_id_col="terminal_id")
+def get_days_between_transactions(df: pd.DataFrame, filters: dict, mode: str = "raw",
+                                  limit: int = None, after: int = None, rank=None,
+                                  histogram=None, generation: int = 0) -> TableData:
+    return _get_days_between_transactions(
+        df, filters, entity_id_col="terminal_id", mode=mode, limit=limit, after=after,
+        rank=rank, histogram=histogram, generation=generation
+    )
 
 def get_transaction_outliers(df: pd.DataFrame, filters: dict) -> TableData:
     return _get_transaction_outliers(df, filters, entity_id_col="terminal_id")
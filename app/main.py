@@ -4,15 +4,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from .core.config import settings
 from .core.data import load_data
-from .routers import agents, customers, merchants, terminals, branch_admins, upload
+from .core.timing import TimedJSONResponse, TimingMiddleware
+from .utils.nl_cache import flush_translation_cache
+from .routers import agents, customers, merchants, terminals, branch_admins, upload, nl_cache, timing, metrics, profiler
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if settings.AUTO_RELOAD and settings.csv_path.exists():
         load_data()
     yield
+    flush_translation_cache()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,8 +23,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Outermost, so the total covers CORS handling too
+app.add_middleware(TimingMiddleware)
+
 
 app.include_router(upload.router)
 app.include_router(agents.router)
@@ -29,3 +36,7 @@ app.include_router(customers.router)
 app.include_router(terminals.router)
 app.include_router(branch_admins.router)
 app.include_router(merchants.router)
+app.include_router(nl_cache.router)
+app.include_router(timing.router)
+app.include_router(metrics.router)
+app.include_router(profiler.router)
@@ -1,27 +1,29 @@
 from io import StringIO
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
 from math import ceil
 
 from app.utils.helpers import add_computed_attributes
-from ..core.data import get_df
+from ..core.config import settings
+from ..core.data import get_df, get_source
+from ..core.timing import TimedRoute
 from ..models.stats import SimpleStat, GraphData, TableData
-from app.utils.router_helpers import filter_entity_data
+from app.utils.router_helpers import filter_entity_data, entity_days, entity_totals, entity_window_stats, entity_batch, entity_pairs, gap_histogram, customer_rank, page_cursor, EntitySlice, overview_sections
 from app.logic.agents import (
         get_transaction_volume_over_time, get_customer_segmentation, get_transaction_outliers,
         get_top_customers, get_transaction_count_over_time, get_average_transaction_over_time, get_days_between_transactions,
         get_merchant_segmentation, get_top_merchants, get_transaction_outliers_merchants, get_merchant_activity_heatmap,
-        get_transaction_frequency_analysis
+        get_transaction_frequency_analysis, get_agent_stats, AGENT_STATS_DISTINCT
     )
-from app.utils.filter_helpers import apply_structured_filter, apply_nl_filter
+from app.utils.filter_helpers import (
+    apply_structured_filter, apply_nl_filter, apply_nl_filter_grouped, apply_nl_filter_batch
+)
 from typing import List, Dict, Any
-from app.chains.subject_column_indentifier import group_by_extraction_chain
-from app.chains.intent import intent_classification_chain
-import asyncio
 from functools import partial
 
-router = APIRouter(prefix="/agents", tags=["Agents"])
+router = APIRouter(prefix="/agents", tags=["Agents"], route_class=TimedRoute)
 
 @router.get("/count", response_model=SimpleStat)
 def total_agents(df = Depends(get_df)):
@@ -47,6 +49,34 @@ def list_agents(df = Depends(get_df)):
     ]
 
 
+@router.post("/batch", response_model=Dict[str, Any])
+def agents_batch(
+    agent_ids: List[str] = Body(..., embed=True, min_length=1),
+    metrics: List[str] = Body(["stats", "transaction_volume"], embed=True),
+    granularity: str = Query("monthly", pattern="^(daily|weekly|monthly|yearly)$"),
+    year: int = None,
+    month: int = None,
+    week: int = None,
+    day: int = Query(None, ge=1, le=31),
+    range_days: int = Query(None, ge=1),
+    start_date: str = None,
+    end_date: str = None,
+    df=Depends(get_df)
+):
+    """
+    Stats and time series for many agents in one request.
+
+    Body: {"agent_ids": [...], "metrics": ["stats", "transaction_volume",
+    "transaction_count", "average_transactions"]}. The date filters are
+    shared; each entry of "results" is shaped like the matching
+    /{agent_id}/... response, and ids without data are listed in "missing".
+    """
+    return entity_batch(
+        df, "agent_id", agent_ids, metrics, granularity, get_agent_stats, AGENT_STATS_DISTINCT,
+        year, month, week, day, range_days, start_date, end_date
+    )
+
+
 @router.get("/{agent_id}/stats", response_model=list[SimpleStat])
 def agent_stats(
     agent_id: str,
@@ -59,25 +89,18 @@ def agent_stats(
     end_date: str = None,
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    # Amount totals come from the day rollup; only the distinct counts read rows
+    totals = entity_totals(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
+    df, filters = filter_entity_data(
+        df, "agent_id", agent_id,
+        year, month, week, day, range_days, start_date, end_date,
+        columns=None if totals is None else list(AGENT_STATS_DISTINCT.values())
+    )
 
-    from app.utils.analytics import _get_filter_suffix
-    suffix = _get_filter_suffix(filters)
-
-    stats = [
-        SimpleStat(metric=f"Total Transaction Value{suffix}", value=round(df["amount"].sum(), 2)),
-        SimpleStat(metric=f"Average Transaction Value{suffix}", value=round(df["amount"].mean(), 2)),
-        SimpleStat(metric=f"Transaction Count{suffix}", value=int(df["amount"].count())),
-        SimpleStat(metric=f"Unique Customers{suffix}", value=int(df["customer_id"].nunique())),
-        SimpleStat(metric=f"Unique Merchants{suffix}", value=int(df["merchant_id"].nunique())),
-        SimpleStat(metric=f"Unique Terminals{suffix}", value=int(df["terminal_id"].nunique())),
-    ]
-
-    return stats
+    return get_agent_stats(df, filters, totals)
 
 
 
@@ -96,24 +119,29 @@ def agent_overview(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
+    days_between_mode: str = Query("raw", pattern="^(raw|summary)$"),
+    fields: str = Query(None, description="Comma-separated sections to compute (default: all), e.g. transaction_volume,top_customers"),
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    # Sections filter their data on first use, so unrequested ones cost nothing
+    data = EntitySlice(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return {
-        "transaction_volume": get_transaction_volume_over_time(df, granularity),
-        "transaction_count": get_transaction_count_over_time(df, granularity, filters),
-        "average_transactions": get_average_transaction_over_time(df, granularity, filters),
-        "segmentation": get_customer_segmentation(df, filters),
-        "top_customers": get_top_customers(df, top_mode, top_limit, filters),
-        "transaction_outliers": get_transaction_outliers(df, filters),
-        "days_between_transactions": get_days_between_transactions(df, filters),
-        "transaction_frequency": get_transaction_frequency_analysis(df, filters)
-    }
+    return overview_sections(fields, {
+        "transaction_volume": lambda: get_transaction_volume_over_time(data.days, granularity),
+        "transaction_count": lambda: get_transaction_count_over_time(data.days, granularity, data.filters),
+        "average_transactions": lambda: get_average_transaction_over_time(data.days, granularity, data.filters),
+        "segmentation": lambda: get_customer_segmentation(data.rows, data.filters),
+        "top_customers": lambda: get_top_customers(data.pairs, top_mode, top_limit, data.filters),
+        "transaction_outliers": lambda: get_transaction_outliers(data.pairs, data.filters),
+        "days_between_transactions": lambda: get_days_between_transactions(
+            data.pairs if days_between_mode == "summary" else data.rows, data.filters,
+            days_between_mode, rank=data.customer_rank, histogram=data.gap_histogram
+        ),
+        "transaction_frequency": lambda: get_transaction_frequency_analysis(data.rows, data.filters)
+    })
 
 
 @router.get("/{agent_id}/average-transactions", response_model=GraphData)
@@ -127,15 +155,15 @@ def agent_average_transactions(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return get_average_transaction_over_time(df, granularity, filters)
+    return get_average_transaction_over_time(days, granularity, filters)
 
 
 @router.get("/{agent_id}/customer-segmentation", response_model=TableData)
@@ -148,7 +176,7 @@ def agent_customer_segmentation(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
     df, filters = filter_entity_data(
@@ -169,7 +197,7 @@ def agent_merchant_segmentation(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
     df, filters = filter_entity_data(
@@ -192,7 +220,7 @@ def top_merchants_per_agent(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
     df, filters = filter_entity_data(
@@ -215,10 +243,10 @@ def top_customers_per_agent(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    df, filters = entity_pairs(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
@@ -400,15 +428,15 @@ def agent_transaction_volume(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, _ = filter_entity_data(
+    days, _ = entity_days(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return get_transaction_volume_over_time(df, granularity)
+    return get_transaction_volume_over_time(days, granularity)
 
 
 @router.get("/{agent_id}/transaction-count", response_model=GraphData)
@@ -422,15 +450,31 @@ def agent_transaction_count(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return get_transaction_count_over_time(df, granularity, filters)
+    return get_transaction_count_over_time(days, granularity, filters)
+
+
+@router.get("/{agent_id}/window-stats", response_model=TableData)
+def agent_window_stats(
+    agent_id: str,
+    window_days: int = Query(30, ge=1, le=3660, description="Length of each window in days"),
+    step_days: int = Query(None, ge=1, le=3660, description="Days between window ends (default: window_days)"),
+    windows: int = Query(12, ge=1, le=3660, description="Number of windows"),
+    end_date: str = Query(None, description="Last day of the latest window (default: last active day)"),
+    df=Depends(get_df)
+):
+    """
+    Totals, average and std of consecutive (or, with step_days < window_days,
+    sliding) windows, each compared with the window before it.
+    """
+    return entity_window_stats(df, "agent_id", agent_id, window_days, step_days, windows, end_date)
 
 
 @router.get("/{agent_id}/transaction-outliers", response_model=TableData)
@@ -443,10 +487,10 @@ def agent_transaction_outliers(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    df, filters = entity_pairs(
         df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
@@ -464,15 +508,23 @@ def agent_days_between_transactions(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
+    mode: str = Query("raw", pattern="^(raw|summary)$", description="raw: one record per transaction; summary: per-customer gap stats and histogram"),
+    limit: int = Query(None, ge=1, le=10000, description="Page size for raw records (keyset-paginated)"),
+    after: str = Query(None, description="Cursor: next_after of the previous page"),
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    generation, after = page_cursor(df, after)
+    rank = customer_rank(df)
+    histogram = gap_histogram(df, "agent_id", agent_id)
+    # Unfiltered summaries are read from the pair table
+    source = entity_pairs if mode == "summary" else filter_entity_data
+    df, filters = source(
         df, "agent_id", agent_id,
-        year, month, week, day, range_days, start_date, end_date
+        year, month, week, day, range_days, start_date, end_date,
+        columns=["agent_id", "customer_id"]
     )
 
-    return get_days_between_transactions(df, filters)
+    return get_days_between_transactions(df, filters, mode, limit, after, rank, histogram, generation)
 
 
 @router.get("/{agent_id}/transaction-frequency-analysis", response_model=TableData)
@@ -715,43 +767,54 @@ async def nl_filter_agent_data(
     - "Find customers who made purchases last week"
     - "List merchants with more than 5 transactions"
     """
-    df, _ = filter_entity_data(
-        df, "agent_id", agent_id,
+    df, _ = await run_in_threadpool(
+        filter_entity_data, df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
-    
-    available_entity_id_columns = """
-    - merchant_id
-    - branch_admin_id
-    - terminal_id
-    - customer_id
+
+    group_by_columns = ["merchant_id", "branch_admin_id", "terminal_id", "customer_id"]
+    return await apply_nl_filter_grouped(df, query, group_by_columns, attribute_cols_base)
+
+
+@router.post("/{agent_id}/nl-filter-batch", response_model=Dict[str, Any])
+async def nl_filter_agent_data_batch(
+    agent_id: str,
+    queries: List[str] = Body(..., embed=True, min_length=1),
+    year: int = None,
+    month: int = None,
+    week: int = None,
+    day: int = Query(None, ge=1, le=31),
+    range_days: int = Query(None, ge=1),
+    start_date: str = None,
+    end_date: str = None,
+    df=Depends(get_df)
+):
     """
-    
-    # Run intent classification and group by extraction in parallel
-    intent_task = asyncio.create_task(
-        intent_classification_chain.ainvoke({"query": query})
-    )
-    group_by_task = asyncio.create_task(
-        group_by_extraction_chain.ainvoke({"query": query, "available_entity_id_columns": available_entity_id_columns})
+    Answer several natural language filters for one agent in a single request.
+
+    The agent's slice is filtered once, computed attributes are built once per
+    group-by column the queries need, and the LLM extractions run concurrently.
+    Each entry of "results" matches the query at the same position; a query
+    that cannot be answered carries its own status_code and error.
+    """
+    if len(queries) > settings.NL_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.NL_BATCH_MAX_QUERIES} queries per batch"
+        )
+
+    df, _ = await run_in_threadpool(
+        filter_entity_data, df, "agent_id", agent_id,
+        year, month, week, day, range_days, start_date, end_date
     )
-    
-    # Wait for both tasks to complete
-    intent_result, group_by_result = await asyncio.gather(intent_task, group_by_task)
-    print(intent_result)
-    print(group_by_result)
-    
-    group_by_column = group_by_result["group_by_column"]
-    
-    df = add_computed_attributes(df, group_by_column)
-    # print("Computed:")
-    # print(df)
-    
-    attribute_cols = [group_by_column] + attribute_cols_base
-    
-    if not intent_result["filter_intent"]:
-        raise HTTPException(status_code=400, detail="Could not determine filtering criteria from query")
 
-    return apply_nl_filter(df, query, group_by_column, attribute_cols)
+    group_by_columns = ["merchant_id", "branch_admin_id", "terminal_id", "customer_id"]
+    results = await apply_nl_filter_batch(df, queries, group_by_columns, attribute_cols_base)
+    return {
+        "agent_id": agent_id,
+        "query_count": len(queries),
+        "results": results,
+    }
 
 
 @router.post("/{agent_id}/nl-filter-customers", response_model=Dict[str, Any])
@@ -777,17 +840,17 @@ async def nl_filter_agent_customers(
     - "Show customers who spend more than $500 on average"
     - "List customers with total spending over $1000"
     """
-    df, _ = filter_entity_data(
-        df, "agent_id", agent_id,
+    df, _ = await run_in_threadpool(
+        filter_entity_data, df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
     # Add computed attributes for customers
-    df = add_computed_attributes(df, 'customer_id')
+    df = await run_in_threadpool(add_computed_attributes, df, 'customer_id')
     attribute_cols = ['customer_id'] + attribute_cols_base
 
     # Apply natural language filter
-    filtered_customers = apply_nl_filter(df, query, 'customer_id', attribute_cols)
+    filtered_customers = await apply_nl_filter(df, query, 'customer_id', attribute_cols)
 
     # Apply pagination
     total_count = len(filtered_customers)
@@ -829,17 +892,17 @@ async def nl_filter_agent_merchants(
     - "Show merchants with average transaction value over $200"
     - "List merchants serving more than 20 unique customers"
     """
-    df, _ = filter_entity_data(
-        df, "agent_id", agent_id,
+    df, _ = await run_in_threadpool(
+        filter_entity_data, df, "agent_id", agent_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
     # Add computed attributes for merchants
-    df = add_computed_attributes(df, 'merchant_id')
+    df = await run_in_threadpool(add_computed_attributes, df, 'merchant_id')
     attribute_cols = ['merchant_id'] + attribute_cols_base
 
     # Apply natural language filter
-    filtered_merchants = apply_nl_filter(df, query, 'merchant_id', attribute_cols)
+    filtered_merchants = await apply_nl_filter(df, query, 'merchant_id', attribute_cols)
 
     # Apply pagination
     total_count = len(filtered_merchants)
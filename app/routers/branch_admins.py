@@ -1,10 +1,11 @@
 from io import StringIO
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from fastapi.responses import StreamingResponse
-from ..core.data import get_df
+from ..core.data import get_df, get_source
+from ..core.timing import TimedRoute
 from ..models.stats import SimpleStat, GraphData, TableData
 import pandas as pd
-from app.utils.router_helpers import filter_entity_data
+from app.utils.router_helpers import filter_entity_data, entity_days, entity_window_stats, entity_pairs, gap_histogram, customer_rank, page_cursor, EntitySlice, overview_sections
 from app.logic.branch_admins import (
         get_transaction_volume_over_time, get_customer_segmentation, get_transaction_outliers,
         get_top_customers, get_transaction_count_over_time, get_average_transaction_over_time, get_days_between_transactions
@@ -12,7 +13,7 @@ from app.logic.branch_admins import (
 from typing import List, Dict, Any
 from app.utils.helpers import filter_transactions
 
-router = APIRouter(prefix="/branch-admins", tags=["Branch Admins"])
+router = APIRouter(prefix="/branch-admins", tags=["Branch Admins"], route_class=TimedRoute)
 
 @router.get("/count", response_model=SimpleStat)
 def total_branch_admins(df = Depends(get_df)):
@@ -50,23 +51,28 @@ def branch_admin_overview(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
+    days_between_mode: str = Query("raw", pattern="^(raw|summary)$"),
+    fields: str = Query(None, description="Comma-separated sections to compute (default: all), e.g. transaction_volume,top_customers"),
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    # Sections filter their data on first use, so unrequested ones cost nothing
+    data = EntitySlice(
         df, "branch_admin_id", branch_admin_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return {
-        "transaction_volume": get_transaction_volume_over_time(df, granularity),
-        "transaction_count": get_transaction_count_over_time(df, granularity, filters),
-        "average_transactions": get_average_transaction_over_time(df, granularity, filters),
-        "segmentation": get_customer_segmentation(df, filters),
-        "top_customers": get_top_customers(df, top_mode, top_limit, filters),
-        "transaction_outliers": get_transaction_outliers(df, filters),
-        "days_between_transactions": get_days_between_transactions(df, filters)
-    }
+    return overview_sections(fields, {
+        "transaction_volume": lambda: get_transaction_volume_over_time(data.days, granularity),
+        "transaction_count": lambda: get_transaction_count_over_time(data.days, granularity, data.filters),
+        "average_transactions": lambda: get_average_transaction_over_time(data.days, granularity, data.filters),
+        "segmentation": lambda: get_customer_segmentation(data.rows, data.filters),
+        "top_customers": lambda: get_top_customers(data.pairs, top_mode, top_limit, data.filters),
+        "transaction_outliers": lambda: get_transaction_outliers(data.pairs, data.filters),
+        "days_between_transactions": lambda: get_days_between_transactions(
+            data.pairs if days_between_mode == "summary" else data.rows, data.filters,
+            days_between_mode, rank=data.customer_rank, histogram=data.gap_histogram
+        )
+    })
 
 
 @router.get("/{branch_admin_id}/average-transactions", response_model=GraphData)
@@ -80,15 +86,15 @@ def branch_admin_average_transactions(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "branch_admin_id", branch_admin_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return get_average_transaction_over_time(df, granularity, filters)
+    return get_average_transaction_over_time(days, granularity, filters)
 
 
 @router.get("/{branch_admin_id}/segmentation", response_model=TableData)
@@ -101,7 +107,7 @@ def branch_admin_customer_segmentation(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
     df, filters = filter_entity_data(
@@ -124,10 +130,10 @@ def top_customers_per_branch_admin(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    df, filters = entity_pairs(
         df, "branch_admin_id", branch_admin_id,
         year, month, week, day, range_days, start_date, end_date
     )
@@ -146,15 +152,15 @@ def branch_admin_transaction_volume(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, _ = filter_entity_data(
+    days, _ = entity_days(
         df, "branch_admin_id", branch_admin_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return get_transaction_volume_over_time(df, granularity)
+    return get_transaction_volume_over_time(days, granularity)
 
 
 @router.get("/{branch_admin_id}/transaction-count", response_model=GraphData)
@@ -168,15 +174,31 @@ def branch_admin_transaction_count(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "branch_admin_id", branch_admin_id,
         year, month, week, day, range_days, start_date, end_date
     )
 
-    return get_transaction_count_over_time(df, granularity, filters)
+    return get_transaction_count_over_time(days, granularity, filters)
+
+
+@router.get("/{branch_admin_id}/window-stats", response_model=TableData)
+def branch_admin_window_stats(
+    branch_admin_id: str,
+    window_days: int = Query(30, ge=1, le=3660, description="Length of each window in days"),
+    step_days: int = Query(None, ge=1, le=3660, description="Days between window ends (default: window_days)"),
+    windows: int = Query(12, ge=1, le=3660, description="Number of windows"),
+    end_date: str = Query(None, description="Last day of the latest window (default: last active day)"),
+    df=Depends(get_df)
+):
+    """
+    Totals, average and std of consecutive (or, with step_days < window_days,
+    sliding) windows, each compared with the window before it.
+    """
+    return entity_window_stats(df, "branch_admin_id", branch_admin_id, window_days, step_days, windows, end_date)
 
 
 @router.get("/{branch_admin_id}/transaction-outliers", response_model=TableData)
@@ -189,10 +211,10 @@ def branch_admin_transaction_outliers(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    df, filters = entity_pairs(
         df, "branch_admin_id", branch_admin_id,
         year, month, week, day, range_days, start_date, end_date
     )
@@ -210,15 +232,23 @@ def branch_admin_days_between_transactions(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
+    mode: str = Query("raw", pattern="^(raw|summary)$", description="raw: one record per transaction; summary: per-customer gap stats and histogram"),
+    limit: int = Query(None, ge=1, le=10000, description="Page size for raw records (keyset-paginated)"),
+    after: str = Query(None, description="Cursor: next_after of the previous page"),
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    generation, after = page_cursor(df, after)
+    rank = customer_rank(df)
+    histogram = gap_histogram(df, "branch_admin_id", branch_admin_id)
+    # Unfiltered summaries are read from the pair table
+    source = entity_pairs if mode == "summary" else filter_entity_data
+    df, filters = source(
         df, "branch_admin_id", branch_admin_id,
-        year, month, week, day, range_days, start_date, end_date
+        year, month, week, day, range_days, start_date, end_date,
+        columns=["branch_admin_id", "customer_id"]
     )
 
-    return get_days_between_transactions(df, filters)
+    return get_days_between_transactions(df, filters, mode, limit, after, rank, histogram, generation)
 
 
 @router.get("/{branch_admin_id}/export")
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from ..core.data import get_df
+from ..core.timing import TimedRoute
 from ..models.stats import SimpleStat, GraphData, TableData
 import pandas as pd
 from app.utils.router_helpers import filter_entity_data
@@ -7,7 +8,7 @@ from app.utils.helpers import filter_transactions, add_computed_attributes
 from typing import List, Dict, Any
 from math import ceil
 
-router = APIRouter(prefix="/customers", tags=["Customers"])
+router = APIRouter(prefix="/customers", tags=["Customers"], route_class=TimedRoute)
 
 @router.get("/count", response_model=SimpleStat)
 def total_customers(df = Depends(get_df)):
@@ -1,21 +1,23 @@
 from io import StringIO
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from fastapi.responses import StreamingResponse
-from ..core.data import get_df
+from ..core.data import get_df, get_source
+from ..core.timing import TimedRoute
 from ..models.stats import SimpleStat, GraphData, GraphPoints, TableData
 import pandas as pd
-from app.utils.router_helpers import filter_entity_data
+from app.utils.router_helpers import filter_entity_data, entity_days, entity_totals, entity_window_stats, entity_batch, entity_pairs, gap_histogram, customer_rank, page_cursor, EntitySlice, overview_sections
 from app.logic.merchants import (
     get_transaction_volume_over_time, get_customer_segmentation, get_transaction_outliers,
     get_top_customers, get_transaction_count_over_time, get_average_transaction_over_time,
-    get_days_between_transactions, get_merchant_stats, get_transaction_frequency_analysis
+    get_days_between_transactions, get_merchant_stats, get_transaction_frequency_analysis,
+    MERCHANT_STATS_DISTINCT
 )
 from typing import List, Dict, Any
 from app.utils.filter_helpers import apply_structured_filter, apply_nl_filter
 from app.utils.helpers import add_computed_attributes
 from math import ceil
 
-router = APIRouter(prefix="/merchants", tags=["Merchants"])
+router = APIRouter(prefix="/merchants", tags=["Merchants"], route_class=TimedRoute)
 
 @router.get("/count", response_model=SimpleStat)
 def total_merchants(df = Depends(get_df)):
@@ -101,6 +103,33 @@ def get_all_merchants_paginated(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching merchants: {str(e)}")
 
+@router.post("/batch", response_model=Dict[str, Any])
+def merchants_batch(
+    merchant_ids: List[str] = Body(..., embed=True, min_length=1),
+    metrics: List[str] = Body(["stats", "transaction_volume"], embed=True),
+    granularity: str = Query("monthly", pattern="^(daily|weekly|monthly|yearly)$"),
+    year: int = None,
+    month: int = None,
+    week: int = None,
+    day: int = Query(None, ge=1, le=31),
+    range_days: int = Query(None, ge=1),
+    start_date: str = None,
+    end_date: str = None,
+    df=Depends(get_df)
+):
+    """
+    Stats and time series for many merchants in one request.
+
+    Body: {"merchant_ids": [...], "metrics": ["stats", "transaction_volume",
+    "transaction_count", "average_transactions"]}. The date filters are
+    shared; each entry of "results" is shaped like the matching
+    /{merchant_id}/... response, and ids without data are listed in "missing".
+    """
+    return entity_batch(
+        df, "merchant_id", merchant_ids, metrics, granularity, get_merchant_stats, MERCHANT_STATS_DISTINCT,
+        year, month, week, day, range_days, start_date, end_date
+    )
+
 @router.get("/{merchant_id}/overview")
 def merchant_overview(
     merchant_id: str,
@@ -114,25 +143,30 @@ def merchant_overview(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
+    days_between_mode: str = Query("raw", pattern="^(raw|summary)$"),
+    fields: str = Query(None, description="Comma-separated sections to compute (default: all), e.g. transaction_volume,top_customers"),
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    # Sections filter their data on first use, so unrequested ones cost nothing
+    data = EntitySlice(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
-    
-    return {
-        "transaction_volume": get_transaction_volume_over_time(df, granularity, filters),
-        "transaction_count": get_transaction_count_over_time(df, granularity, filters),
-        "average_transactions": get_average_transaction_over_time(df, granularity, filters),
-        "segmentation": get_customer_segmentation(df, filters),
-        "top_customers": get_top_customers(df, top_mode, top_limit, filters),
-        "transaction_outliers": get_transaction_outliers(df, filters),
-        "days_between_transactions": get_days_between_transactions(df, filters),
-        "transaction_frequency": get_transaction_frequency_analysis(df, filters),
-        "stats": get_merchant_stats(df, filters)
-    }
+
+    return overview_sections(fields, {
+        "transaction_volume": lambda: get_transaction_volume_over_time(data.days, granularity, data.filters),
+        "transaction_count": lambda: get_transaction_count_over_time(data.days, granularity, data.filters),
+        "average_transactions": lambda: get_average_transaction_over_time(data.days, granularity, data.filters),
+        "segmentation": lambda: get_customer_segmentation(data.rows, data.filters),
+        "top_customers": lambda: get_top_customers(data.pairs, top_mode, top_limit, data.filters),
+        "transaction_outliers": lambda: get_transaction_outliers(data.pairs, data.filters),
+        "days_between_transactions": lambda: get_days_between_transactions(
+            data.pairs if days_between_mode == "summary" else data.rows, data.filters,
+            days_between_mode, rank=data.customer_rank, histogram=data.gap_histogram
+        ),
+        "transaction_frequency": lambda: get_transaction_frequency_analysis(data.rows, data.filters),
+        "stats": lambda: get_merchant_stats(data.rows, data.filters)
+    })
 
 @router.get("/{merchant_id}/stats", response_model=List[SimpleStat])
 def merchant_stats(
@@ -146,13 +180,18 @@ def merchant_stats(
     end_date: str = None,
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    # Amount totals come from the day rollup; only the distinct counts read rows
+    totals = entity_totals(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
+    df, filters = filter_entity_data(
+        df, "merchant_id", merchant_id,
+        year, month, week, day, range_days, start_date, end_date,
+        columns=None if totals is None else list(MERCHANT_STATS_DISTINCT.values())
+    )
     
-    return get_merchant_stats(df, filters)
+    return get_merchant_stats(df, filters, totals)
 
 @router.get("/{merchant_id}/transaction-volume", response_model=GraphData)
 def merchant_transaction_volume(
@@ -165,15 +204,15 @@ def merchant_transaction_volume(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
     
-    return get_transaction_volume_over_time(df, granularity, filters)
+    return get_transaction_volume_over_time(days, granularity, filters)
 
 @router.get("/{merchant_id}/transaction-count", response_model=GraphData)
 def merchant_transaction_count(
@@ -186,15 +225,15 @@ def merchant_transaction_count(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
     
-    return get_transaction_count_over_time(df, granularity, filters)
+    return get_transaction_count_over_time(days, granularity, filters)
 
 @router.get("/{merchant_id}/average-transactions", response_model=GraphData)
 def merchant_average_transactions(
@@ -207,15 +246,30 @@ def merchant_average_transactions(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    days, filters = entity_days(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
     
-    return get_average_transaction_over_time(df, granularity, filters)
+    return get_average_transaction_over_time(days, granularity, filters)
+
+@router.get("/{merchant_id}/window-stats", response_model=TableData)
+def merchant_window_stats(
+    merchant_id: str,
+    window_days: int = Query(30, ge=1, le=3660, description="Length of each window in days"),
+    step_days: int = Query(None, ge=1, le=3660, description="Days between window ends (default: window_days)"),
+    windows: int = Query(12, ge=1, le=3660, description="Number of windows"),
+    end_date: str = Query(None, description="Last day of the latest window (default: last active day)"),
+    df=Depends(get_df)
+):
+    """
+    Totals, average and std of consecutive (or, with step_days < window_days,
+    sliding) windows, each compared with the window before it.
+    """
+    return entity_window_stats(df, "merchant_id", merchant_id, window_days, step_days, windows, end_date)
 
 @router.get("/{merchant_id}/segmentation", response_model=TableData)
 def merchant_customer_segmentation(
@@ -227,7 +281,7 @@ def merchant_customer_segmentation(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
     df, filters = filter_entity_data(
@@ -249,10 +303,10 @@ def top_customers_per_merchant(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    df, filters = entity_pairs(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
@@ -269,10 +323,10 @@ def merchant_transaction_outliers(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
-    df=Depends(get_df)
+    df=Depends(get_source)
 ):
     # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    df, filters = entity_pairs(
         df, "merchant_id", merchant_id,
         year, month, week, day, range_days, start_date, end_date
     )
@@ -289,15 +343,23 @@ def merchant_days_between_transactions(
     range_days: int = Query(None, ge=1),
     start_date: str = None,
     end_date: str = None,
+    mode: str = Query("raw", pattern="^(raw|summary)$", description="raw: one record per transaction; summary: per-customer gap stats and histogram"),
+    limit: int = Query(None, ge=1, le=10000, description="Page size for raw records (keyset-paginated)"),
+    after: str = Query(None, description="Cursor: next_after of the previous page"),
     df=Depends(get_df)
 ):
-    # Use the helper function to filter data
-    df, filters = filter_entity_data(
+    generation, after = page_cursor(df, after)
+    rank = customer_rank(df)
+    histogram = gap_histogram(df, "merchant_id", merchant_id)
+    # Unfiltered summaries are read from the pair table
+    source = entity_pairs if mode == "summary" else filter_entity_data
+    df, filters = source(
         df, "merchant_id", merchant_id,
-        year, month, week, day, range_days, start_date, end_date
+        year, month, week, day, range_days, start_date, end_date,
+        columns=["merchant_id", "customer_id"]
     )
     
-    return get_days_between_transactions(df, filters)
+    return get_days_between_transactions(df, filters, mode, limit, after, rank, histogram, generation)
 
 @router.get("/{merchant_id}/transaction-frequency-analysis", response_model=TableData)
 def merchant_transaction_frequency_analysis(
@@ -375,7 +437,7 @@ def filter_merchants(
     return apply_structured_filter(df, filter_structure, 'merchant_id', merchant_cols)
 
 @router.post("/nl-filter", response_model=List[Dict[str, Any]])
-def nl_filter_merchants(
+async def nl_filter_merchants(
     query: str = Body(..., embed=True),
     df=Depends(get_df)
 ):
@@ -388,6 +450,6 @@ def nl_filter_merchants(
     - "List merchants with more than 5 unique customers"
     """
     merchant_cols = ['merchant_id', 'avg_transaction_amount', 'total_transactions', 'unique_customers']
-    return apply_nl_filter(df, query, 'merchant_id', merchant_cols)
+    return await apply_nl_filter(df, query, 'merchant_id', merchant_cols)
 
 
@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..core.data import loaded_dataset
+from ..core.metrics import register_collector, render
+from ..core.timing import TimedRoute
+from ..utils.nl_cache import get_translation_cache
+from ..utils.nl_parser import parser_stats
+
+router = APIRouter(tags=["Metrics"], route_class=TimedRoute)
+
+def _dataset_metrics():
+    version = loaded_dataset()
+    if version is None:
+        return
+    yield "dataset_rows", "gauge", "Rows in the live dataset.", [({}, len(version.df))]
+    yield "dataset_memory_bytes", "gauge", "Deep memory footprint of the live dataset.", [({}, version.memory_bytes)]
+    yield "dataset_generation", "gauge", "Generation of the live dataset; increases on every reload.", \
+        [({}, version.generation)]
+    yield "dataset_loaded_timestamp_seconds", "gauge", "When the live dataset was published.", \
+        [({}, version.loaded_at.timestamp())]
+
+def _nl_metrics():
+    cache = get_translation_cache().stats()
+    yield "nl_translation_cache_lookups_total", "counter", "NL filter translation cache lookups, by result.", \
+        [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]
+    yield "nl_translation_cache_evictions_total", "counter", "Translations evicted from the NL cache.", \
+        [({}, cache["evictions"])]
+    yield "nl_translation_cache_entries", "gauge", "Translations held in the NL cache.", [({}, cache["entries"])]
+    parser = parser_stats.snapshot()
+    yield "nl_translations_total", "counter", "NL filter translations, by who answered them.", \
+        [({"source": "rule_parser"}, parser["served_locally"]), ({"source": "llm"}, parser["served_by_llm"])]
+
+register_collector(_dataset_metrics)
+register_collector(_nl_metrics)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
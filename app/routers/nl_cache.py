@@ -0,0 +1,18 @@
+from typing import Dict, Any
+from fastapi import APIRouter
+from ..core.timing import TimedRoute
+
+from ..utils.nl_cache import get_translation_cache
+from ..utils.nl_parser import parser_stats
+
+router = APIRouter(prefix="/nl-cache", tags=["NL Cache"], route_class=TimedRoute)
+
+@router.get("/stats", response_model=Dict[str, Any])
+def nl_cache_stats():
+    """Size and hit rate of the natural-language filter translation cache."""
+    return get_translation_cache().stats()
+
+@router.get("/parser-stats", response_model=Dict[str, Any])
+def nl_parser_stats():
+    """Share of NL filter translations answered by the local rule parser, and the latency it saved."""
+    return parser_stats.snapshot()
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..core import profiler
+from ..core.admin import require_admin
+from ..core.timing import TimedRoute
+
+router = APIRouter(
+    prefix="/profiler", tags=["Profiler"], route_class=TimedRoute, dependencies=[Depends(require_admin)]
+)
+
+@router.post("/run", response_class=PlainTextResponse)
+async def run_profiler(
+    seconds: float = Query(10, gt=0, le=600, description="Sampling time, or the time limit with requests"),
+    requests: int = Query(None, ge=1, le=10_000, description="Stop after this many matching requests"),
+    path_pattern: str = Query(None, description="Regex searched in request paths, e.g. ^/agents/A17/overview$"),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    include_idle: bool = Query(False, description="Keep samples of threads waiting for work"),
+):
+    """
+    Sample stacks for `seconds`, or until `requests` requests matching
+    `path_pattern` have finished, and return them as collapsed stacks
+    (`frame;frame;frame count` lines) for flamegraph.pl or speedscope.
+    """
+    if path_pattern and requests is None:
+        raise HTTPException(status_code=400, detail="path_pattern needs requests")
+    try:
+        session = profiler.ProfileSession(seconds, requests, path_pattern, interval_ms, include_idle)
+    except Exception as e:  # a bad regex
+        raise HTTPException(status_code=400, detail=f"Invalid path_pattern: {e}")
+    if not profiler.start(session):
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    # The sampler gets its own thread; waiting for it ties up neither the loop nor a worker
+    threading.Thread(target=session.run, name="profiler", daemon=True).start()
+    while not session.done.is_set():
+        await asyncio.sleep(0.1)
+
+    return PlainTextResponse(session.collapsed(), headers={
+        "X-Profile-Samples": str(session.samples),
+        "X-Profile-Seconds": f"{session.elapsed:.3f}",
+        "X-Profile-Requests": str(session.finished_requests),
+    })
+
+@router.get("/status", response_model=Dict[str, Any])
+def profiler_status():
+    """Whether a session is running, and its progress."""
+    session = profiler.session
+    if session is None:
+        return {"active": False}
+    return {
+        "active": True,
+        "requests": session.requests,
+        "finished_requests": session.finished_requests,
+        "samples": session.samples,
+    }
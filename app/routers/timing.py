@@ -0,0 +1,22 @@
+from typing import Dict, Any
+from fastapi import APIRouter, Depends
+
+from ..core.admin import require_admin
+from ..core.timing import TimedRoute, route_stats, stage_stats
+
+router = APIRouter(prefix="/timing", tags=["Timing"], route_class=TimedRoute)
+
+@router.get("/stats", response_model=Dict[str, Any])
+def timing_stats():
+    """Request durations per route and span durations per stage, since start-up or the last reset."""
+    return {
+        "routes": route_stats.snapshot(),
+        "stages": stage_stats.snapshot(),
+    }
+
+@router.delete("/stats", response_model=Dict[str, Any], dependencies=[Depends(require_admin)])
+def reset_timing_stats():
+    """Start the per-route and per-stage aggregates afresh (needs X-Admin-Token)."""
+    route_stats.clear()
+    stage_stats.clear()
+    return {"status": "cleared"}
@@ -1,21 +1,31 @@
 from pathlib import Path
 from fastapi import APIRouter, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 
 from ..core.validate import validate_and_stage
 from ..core.data import replace_dataset
+from ..core.timing import TimedRoute
 
-router = APIRouter(prefix="/upload", tags=["Upload"])
+router = APIRouter(prefix="/upload", tags=["Upload"], route_class=TimedRoute)
 
 @router.post("/", response_class=JSONResponse, status_code=201)
 async def upload_transactions(file: UploadFile = File(...)):
     """
     Upload a CSV to become the new data source.
-    Overwrites the existing dataset and reloads it into memory instantly.
+    The new dataset is parsed and prepared in a worker thread while the current
+    one keeps serving, then swapped in atomically.
     """
-    staged_path: Path = Path(validate_and_stage(file))
-    row_count = replace_dataset(staged_path)
+    staged_path: Path = Path(await run_in_threadpool(validate_and_stage, file))
+    version = await run_in_threadpool(replace_dataset, staged_path)
+    if version is None:
+        return {
+            "message": "Dataset replaced; it is over OUT_OF_CORE_THRESHOLD_MB and served out of core",
+            "rows_loaded": None,
+            "generation": None
+        }
     return {
         "message": "Dataset replaced successfully",
-        "rows_loaded": row_count
+        "rows_loaded": len(version.df),
+        "generation": version.generation
     }
@@ -1,9 +1,16 @@
+import numpy as np
 import pandas as pd
 from typing import List
 from ..models.stats import SimpleStat, GraphData, GraphPoints, TableData
+from ..backends import get_backend
+from ..core.data import is_streamed
+from ..core.ordering import customer_gaps, rank_cursor
+from ..core.pairs import is_pair_table
+from ..core.rollup import DayRollup, is_day_rollup
+from ..core.timing import timed
 from ..core.analytics_config import (
     CUSTOMER_SEGMENTATION, MERCHANT_SEGMENTATION, 
-    OUTLIER_DETECTION, TIME_FORMATS
+    OUTLIER_DETECTION, TIME_FORMATS, DAYS_BETWEEN_HISTOGRAM
 )
 
 def _get_filter_suffix(filters: dict) -> str:
@@ -46,6 +53,8 @@ def _get_grouping_and_label_fn(granularity: str):
 
 def _prepare_date_columns(df):
     """Prepare date-related columns for analysis."""
+    if "week" in df.columns and pd.api.types.is_datetime64_any_dtype(df["date"]):
+        return df  # already prepared when the dataset was loaded
     df = df.copy()
     df["date"] = pd.to_datetime(df["date"])
     df["year"] = df["date"].dt.year
@@ -58,67 +67,195 @@ def _apply_date_filters(df, year=None, month=None, week=None, day=None,
                       range_days=None, start_date=None, end_date=None):
     """Apply date filters to a dataframe."""
     df = _prepare_date_columns(df)
-    
-    # Date range filters
-    if start_date and end_date:
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-        df = df[(df["date"] >= start) & (df["date"] <= end)]
-    elif range_days:
-        end = pd.Timestamp.today().normalize()
-        start = end - pd.Timedelta(days=range_days)
-        df = df[(df["date"] >= start) & (df["date"] <= end)]
-    
-    # Individual date component filters
-    if year is not None:
-        df = df[df["year"] == year]
-    if month is not None:
-        df = df[df["month"] == month]
-    if week is not None:
-        df = df[df["week"] == week]
-    if day is not None:
-        df = df[df["day"] == day]
-        
-    return df
+    return get_backend().apply_date_filters(
+        df, year=year, month=month, week=week, day=day,
+        range_days=range_days, start_date=start_date, end_date=end_date
+    )
 
-def _get_average_transaction_over_time(df: pd.DataFrame, granularity: str, 
-                                     filters: dict, entity_type: str = None) -> GraphData:
-    """Calculate average transaction amount over time."""
+def _time_series_graph(grouped: pd.DataFrame, granularity: str, metric_name: str,
+                       filters: dict = None, decimals: int = 2) -> GraphData:
+    """Label and order a per-period aggregate (one `amount` value per period) as a graph."""
     group_cols, label_fmt = _get_grouping_and_label_fn(granularity)
-
-    grouped = df.groupby(group_cols)["amount"].mean().reset_index()
-    grouped["label"] = grouped.apply(label_fmt, axis=1)
+    grouped["label"] = [label_fmt(r) for r in grouped[group_cols].to_dict(orient="records")]
     grouped = grouped.sort_values(group_cols)
-
-    metric_label = f"{granularity.capitalize()} Average Transaction Value{_get_filter_suffix(filters)}"
+    values = grouped["amount"].round(decimals) if decimals is not None else grouped["amount"]
 
     return GraphData(
-        metric=metric_label,
+        metric=f"{granularity.capitalize()} {metric_name}{_get_filter_suffix(filters or {})}",
         data=GraphPoints(
             labels=grouped["label"].tolist(),
-            values=grouped["amount"].round(2).tolist()
+            values=values.tolist()
         )
     )
 
+def _out_of_core():
+    # Imported on use: app.utils.out_of_core builds on this module
+    from . import out_of_core
+    return out_of_core
+
+def _rollup_periods(days: pd.DataFrame, group_cols: List[str], how: str) -> pd.DataFrame:
+    """
+    Re-aggregate day rollup records into one `amount` (sum, count or mean) per
+    period; a mean on a half cent may round a cent away from the row path's
+    (see app.core.rollup).
+    """
+    grouped = days.groupby(group_cols)[["count", "sum"]].sum().reset_index()
+    if how == "sum":
+        grouped["amount"] = grouped["sum"]
+    elif how == "count":
+        grouped["amount"] = grouped["count"]
+    else:
+        grouped["amount"] = grouped["sum"] / grouped["count"]
+    return grouped[group_cols + ["amount"]]
+
+def _stats_totals(df: pd.DataFrame, totals: dict, distinct: dict) -> dict:
+    """
+    Amount totals plus {key: column} distinct counts for a stats endpoint,
+    computing from df only what precomputed totals do not already hold.
+    """
+    totals = dict(totals or {})
+    if "sum" not in totals:
+        amount = df["amount"]
+        totals.update(sum=amount.sum(), mean=amount.mean(), min=amount.min(),
+                      max=amount.max(), count=amount.count())
+    for key, col in distinct.items():
+        if key not in totals:
+            totals[key] = df[col].nunique()
+    return totals
+
+@timed("analytics.average_transaction_over_time")
+def _get_average_transaction_over_time(df: pd.DataFrame, granularity: str, 
+                                     filters: dict, entity_type: str = None) -> GraphData:
+    """Calculate average transaction amount over time."""
+    if is_streamed(df):
+        return _out_of_core().get_average_transaction_over_time(
+            granularity, filters, df.entity_id_col, df.entity_id, date_filters=df.filters
+        )
+    group_cols, _ = _get_grouping_and_label_fn(granularity)
+    if is_day_rollup(df):
+        grouped = _rollup_periods(df, group_cols, "mean")
+    else:
+        grouped = get_backend().aggregate(df, group_cols, {"amount": ("amount", "mean")})
+    return _time_series_graph(grouped, granularity, "Average Transaction Value", filters)
+
+@timed("analytics.days_between_transactions")
 def _get_days_between_transactions(df: pd.DataFrame, filters: dict, 
-                                 entity_id_col: str, customer_id_col: str = "customer_id") -> TableData:
-    """Calculate days between transactions for each customer."""
-    df = df.sort_values(by=[entity_id_col, customer_id_col, "date"])
-    df["days_since"] = df.groupby([entity_id_col, customer_id_col])["date"].diff().dt.days
+                                 entity_id_col: str, customer_id_col: str = "customer_id",
+                                 mode: str = "raw", limit: int = None, after: int = None,
+                                 rank: np.ndarray = None, histogram: np.ndarray = None,
+                                 generation: int = 0) -> TableData:
+    """
+    Calculate days between transactions for each customer.
+
+    mode "raw" gives one record per transaction; with limit or after it is
+    keyset-paginated on the rows' (customer, date) rank, returning
+    {"records", "limit", "after", "next_after"}; after is a rank key and
+    the returned cursors are rank_cursor strings of `generation`. mode
+    "summary" gives each customer's mean, median and max gap plus a
+    histogram of all gaps.
+    rank is the dataset's cached customer_rank (see app.core.ordering).
+    For summaries df may be the entity's pair table records, with its
+    gap histogram (see app.core.pairs).
+    """
+    suffix = _get_filter_suffix(filters)
+    if is_pair_table(df):
+        return TableData(
+            metric=f"Days Between Transactions Summary per Customer{suffix}",
+            data=_days_between_pair_summary(df, histogram, entity_id_col, customer_id_col)
+        )
+
+    order, keys, groups, gaps = customer_gaps(df, entity_id_col, customer_id_col, rank)
+
+    if mode == "summary":
+        return TableData(
+            metric=f"Days Between Transactions Summary per Customer{suffix}",
+            data=_days_between_summary(df, order, groups, gaps, entity_id_col, customer_id_col)
+        )
+
+    columns = [entity_id_col, customer_id_col, "date"]
+    if limit is None and after is None:
+        return TableData(
+            metric=f"Days Between Transactions per Customer{suffix}",
+            data=_gap_records(df, columns, order, gaps)
+        )
 
+    # Keys only increase within an entity: callers pass one entity's rows
+    page = np.flatnonzero(keys > after) if after is not None else np.arange(len(order))
+    more = limit is not None and len(page) > limit
+    page = page[:limit]
     return TableData(
-        metric=f"Days Between Transactions per Customer{_get_filter_suffix(filters)}",
-        data=df[[entity_id_col, customer_id_col, "date", "days_since"]].to_dict(orient="records")
+        metric=f"Days Between Transactions per Customer{suffix}",
+        data={
+            "records": _gap_records(df, columns, order[page], gaps[page]),
+            "limit": limit,
+            "after": rank_cursor(generation, after) if after is not None else None,
+            "next_after": rank_cursor(generation, int(keys[page[-1]])) if more else None,
+        }
     )
 
+def _gap_records(df: pd.DataFrame, columns: List[str], rows: np.ndarray, gaps: np.ndarray) -> list:
+    """The rows' columns plus days_since as records; a missing date becomes None."""
+    records = df[columns].take(rows).assign(days_since=gaps)
+    if records["date"].hasnans:
+        records["date"] = records["date"].astype(object).where(records["date"].notna(), None)
+    return records.to_dict(orient="records")
+
+def _days_between_summary(df: pd.DataFrame, order: np.ndarray, groups: np.ndarray, gaps: np.ndarray,
+                          entity_id_col: str, customer_id_col: str) -> dict:
+    """Per-(entity, customer) gap statistics and a histogram of every gap."""
+    firsts = order[np.flatnonzero(np.diff(groups, prepend=-1))]
+    stats = pd.Series(gaps).groupby(groups, sort=False).agg(["size", "mean", "median", "max"])
+    customers = df[[entity_id_col, customer_id_col]].take(firsts).reset_index(drop=True)
+    customers["transactions"] = stats["size"].to_numpy()
+    customers["mean_days"] = stats["mean"].round(2).to_numpy()
+    customers["median_days"] = stats["median"].to_numpy()
+    customers["max_days"] = stats["max"].to_numpy()
+
+    edges = DAYS_BETWEEN_HISTOGRAM["bin_edges"]
+    known = gaps[~np.isnan(gaps)]
+    counts = np.bincount(np.searchsorted(edges, known, side="right") - 1, minlength=len(edges))
+    return {
+        "customers": customers.to_dict(orient="records"),
+        "histogram": _days_between_histogram(counts),
+    }
+
+def _days_between_pair_summary(pairs: pd.DataFrame, histogram: np.ndarray,
+                               entity_id_col: str, customer_id_col: str) -> dict:
+    """_days_between_summary read from precomputed (entity, customer) pair records."""
+    customers = pairs[[entity_id_col, customer_id_col]].reset_index(drop=True)
+    customers["transactions"] = pairs["transaction_count"].to_numpy()
+    customers["mean_days"] = pairs["gap_mean"].round(2).to_numpy()
+    customers["median_days"] = pairs["gap_median"].to_numpy()
+    customers["max_days"] = pairs["gap_max"].to_numpy()
+    return {
+        "customers": customers.to_dict(orient="records"),
+        "histogram": _days_between_histogram(histogram),
+    }
+
+def _days_between_histogram(counts: np.ndarray) -> dict:
+    """Label gap counts per DAYS_BETWEEN_HISTOGRAM bin."""
+    edges = DAYS_BETWEEN_HISTOGRAM["bin_edges"]
+    labels = [
+        f"{lo}+" if hi is None else (str(lo) if hi - lo == 1 else f"{lo}-{hi - 1}")
+        for lo, hi in zip(edges, edges[1:] + [None])
+    ]
+    return {"labels": labels, "values": counts.tolist()}
+
+@timed("analytics.transaction_outliers")
 def _get_transaction_outliers(df: pd.DataFrame, filters: dict, 
                             entity_id_col: str, target_id_col: str = "customer_id") -> TableData:
     """Identify transaction outliers based on standard deviation."""
-    grouped = (
-        df.groupby([entity_id_col, target_id_col])["amount"].sum()
-        .reset_index()
-        .sort_values(by="amount", ascending=False)
-    )
+    if is_streamed(df):
+        return _out_of_core().get_transaction_outliers(df.filters, entity_id_col, target_id_col, df.entity_id)
+    if is_pair_table(df):
+        grouped = df[[entity_id_col, target_id_col, "total_amount"]].rename(columns={"total_amount": "amount"})
+        return _outliers_table(grouped, filters, target_id_col)
+    grouped = get_backend().aggregate(df, [entity_id_col, target_id_col], {"amount": ("amount", "sum")})
+    return _outliers_table(grouped, filters, target_id_col)
+
+def _outliers_table(grouped: pd.DataFrame, filters: dict, target_id_col: str) -> TableData:
+    """Flag (entity, target) totals further than N standard deviations from the mean."""
+    grouped = grouped.sort_values(by="amount", ascending=False)
 
     mean_amount = grouped["amount"].mean()
     std_amount = grouped["amount"].std()
@@ -138,14 +275,20 @@ def _get_transaction_outliers(df: pd.DataFrame, filters: dict,
         data=outliers.to_dict(orient="records")
     )
 
+@timed("analytics.segmentation")
 def _get_segmentation(df: pd.DataFrame, filters: dict, 
                     id_col: str = "customer_id", 
                     metric_prefix: str = "Customer Segmentation") -> TableData:
     """Segment entities based on total amount."""
-    entity_total = (
-        df.groupby(id_col)["amount"].sum().reset_index()
-        .sort_values(by="amount", ascending=False)
-    )
+    if is_streamed(df):
+        return _out_of_core().get_segmentation(df.filters, id_col, metric_prefix, df.entity_id_col, df.entity_id)
+    entity_total = get_backend().aggregate(df, [id_col], {"amount": ("amount", "sum")})
+    return _segmentation_table(entity_total, filters, id_col, metric_prefix)
+
+def _segmentation_table(entity_total: pd.DataFrame, filters: dict, id_col: str,
+                        metric_prefix: str) -> TableData:
+    """Split per-entity totals into high/mid/low value bands."""
+    entity_total = entity_total.sort_values(by="amount", ascending=False)
 
     # Use appropriate thresholds based on entity type
     if id_col == "customer_id":
@@ -175,28 +318,43 @@ def _get_segmentation(df: pd.DataFrame, filters: dict,
         }
     )
 
+@timed("analytics.top_entities")
 def _get_top_entities(df: pd.DataFrame, mode: str, limit: int, filters: dict,
                     entity_id_col: str, target_id_col: str,
                     metric_prefix: str = "Top") -> TableData:
     """Get top entities by amount or count, but always include both metrics."""
+    if is_streamed(df):
+        return _out_of_core().get_top_entities(mode, limit, df.filters, entity_id_col, target_id_col,
+                                               metric_prefix, df.entity_id)
+    name_col = target_id_col.replace('_id', '_name')
+    if is_pair_table(df):
+        # Precomputed (entity, customer) totals, first-seen names included
+        columns = [entity_id_col, target_id_col, "total_amount", "transaction_count"]
+        grouped_stats = df[columns + ([name_col] if name_col in df.columns else [])]
+        return _top_entities_table(grouped_stats, None, mode, limit, filters,
+                                   entity_id_col, target_id_col, metric_prefix)
 
-    # Calculate both amount and count for each entity
-    grouped_stats = (
-        df.groupby([entity_id_col, target_id_col])
-        .agg({
-            'amount': ['sum', 'count']
-        })
-        .reset_index()
-    )
+    backend = get_backend()
 
-    # Flatten column names
-    grouped_stats.columns = [entity_id_col, target_id_col, 'total_amount', 'transaction_count']
+    # Calculate both amount and count for each entity
+    grouped_stats = backend.aggregate(df, [entity_id_col, target_id_col], {
+        'total_amount': ('amount', 'sum'),
+        'transaction_count': ('amount', 'count'),
+    })
 
-    # Add entity name if available
-    name_col = target_id_col.replace('_id', '_name')
+    # Get the name for each entity if available (take first occurrence)
+    entity_names = None
     if name_col in df.columns:
-        # Get the name for each entity (take first occurrence)
-        entity_names = df.groupby(target_id_col)[name_col].first().reset_index()
+        entity_names = backend.aggregate(df, [target_id_col], {name_col: (name_col, 'first')})
+
+    return _top_entities_table(grouped_stats, entity_names, mode, limit, filters,
+                               entity_id_col, target_id_col, metric_prefix)
+
+def _top_entities_table(grouped_stats: pd.DataFrame, entity_names, mode: str, limit: int,
+                        filters: dict, entity_id_col: str, target_id_col: str,
+                        metric_prefix: str = "Top") -> TableData:
+    """Rank per-(entity, target) totals and keep the top N targets per entity."""
+    if entity_names is not None:
         grouped_stats = grouped_stats.merge(entity_names, on=target_id_col, how='left')
 
     # Sort by the specified mode and take top N
@@ -224,57 +382,60 @@ def _get_top_entities(df: pd.DataFrame, mode: str, limit: int, filters: dict,
         data=sorted_data.to_dict(orient="records")
     )
 
+@timed("analytics.transaction_volume_over_time")
 def _get_transaction_volume_over_time(df: pd.DataFrame, granularity: str, 
                                     filters: dict = None) -> GraphData:
     """Calculate transaction volume over time."""
-    group_cols, label_fmt = _get_grouping_and_label_fn(granularity)
-    grouped = df.groupby(group_cols)["amount"].sum().reset_index()
-    grouped["label"] = grouped.apply(label_fmt, axis=1)
-    grouped = grouped.sort_values(group_cols)
-    
-    suffix = _get_filter_suffix(filters or {})
-
-    return GraphData(
-        metric=f"{granularity.capitalize()} Transaction Volume{suffix}",
-        data=GraphPoints(
-            labels=grouped["label"].tolist(),
-            values=grouped["amount"].round(2).tolist()
+    if is_streamed(df):
+        return _out_of_core().get_transaction_volume_over_time(
+            granularity, filters, df.entity_id_col, df.entity_id, date_filters=df.filters
         )
-    )
+    group_cols, _ = _get_grouping_and_label_fn(granularity)
+    if is_day_rollup(df):
+        grouped = _rollup_periods(df, group_cols, "sum")
+    else:
+        grouped = get_backend().aggregate(df, group_cols, {"amount": ("amount", "sum")})
+    return _time_series_graph(grouped, granularity, "Transaction Volume", filters)
 
+@timed("analytics.transaction_count_over_time")
 def _get_transaction_count_over_time(df: pd.DataFrame, granularity: str, 
                                    filters: dict = None) -> GraphData:
     """Calculate transaction count over time."""
-    group_cols, label_fmt = _get_grouping_and_label_fn(granularity)
-    grouped = df.groupby(group_cols)["amount"].count().reset_index()
-    grouped["label"] = grouped.apply(label_fmt, axis=1)
-    grouped = grouped.sort_values(group_cols)
-    suffix = _get_filter_suffix(filters or {})
-
-    return GraphData(
-        metric=f"{granularity.capitalize()} Transaction Count{suffix}",
-        data=GraphPoints(
-            labels=grouped["label"].tolist(),
-            values=grouped["amount"].tolist()
+    if is_streamed(df):
+        return _out_of_core().get_transaction_count_over_time(
+            granularity, filters, df.entity_id_col, df.entity_id, date_filters=df.filters
         )
-    )
+    group_cols, _ = _get_grouping_and_label_fn(granularity)
+    if is_day_rollup(df):
+        grouped = _rollup_periods(df, group_cols, "count")
+    else:
+        grouped = get_backend().aggregate(df, group_cols, {"amount": ("amount", "count")})
+    return _time_series_graph(grouped, granularity, "Transaction Count", filters, decimals=None)
 
+@timed("analytics.transaction_metrics_per_entity")
 def _get_transaction_metrics_per_entity(df: pd.DataFrame, granularity: str, 
                                       filters: dict = None, 
                                       entity_id_col: str = "merchant_id",
                                       metric_type: str = "volume") -> dict:
-    """Calculate transaction metrics per entity over time."""
+    """
+    Calculate transaction metrics (volume, count or average) per entity over
+    time, from transaction rows or day rollup records carrying entity_id_col.
+    """
     group_cols, label_fmt = _get_grouping_and_label_fn(granularity)
+    period_cols = group_cols
     group_cols = [entity_id_col] + group_cols
-
-    if metric_type == "volume":
-        grouped = df.groupby(group_cols)["amount"].sum().reset_index()
-        metric_name = "Transaction Volume"
-    else:  # count
-        grouped = df.groupby(group_cols)["amount"].count().reset_index()
-        metric_name = "Transaction Count"
+    how, metric_name = {
+        "volume": ("sum", "Transaction Volume"),
+        "count": ("count", "Transaction Count"),
+        "average": ("mean", "Average Transaction Value"),
+    }[metric_type]
+
+    if is_day_rollup(df):
+        grouped = _rollup_periods(df, group_cols, how)
+    else:
+        grouped = get_backend().aggregate(df, group_cols, {"amount": ("amount", how)})
         
-    grouped["label"] = grouped.apply(label_fmt, axis=1)
+    grouped["label"] = [label_fmt(r) for r in grouped[period_cols].to_dict(orient="records")]
     grouped = grouped.sort_values(group_cols)
 
     suffix = _get_filter_suffix(filters or {})
@@ -291,6 +452,81 @@ def _get_transaction_metrics_per_entity(df: pd.DataFrame, granularity: str,
 
     return result
 
+@timed("analytics.window_stats")
+def _get_window_stats(rollup: DayRollup, entity_id, window_days: int, step_days: int,
+                      windows: int, end_date: str = None) -> TableData:
+    """
+    Totals of `windows` windows of window_days whole days, ending every
+    step_days back from end_date (default: the entity's last active day),
+    each compared with the window_days just before it. All windows come from
+    the rollup's running totals in one vectorized call.
+    """
+    last = pd.Timestamp(end_date).normalize() if end_date else rollup.span(entity_id)[1]
+    day = pd.Timedelta(days=1)
+    stops = last + day - pd.to_timedelta(np.arange(windows)[::-1] * step_days, unit="D")
+    starts = stops - pd.Timedelta(days=window_days)
+
+    both = rollup.windows(entity_id, starts.append(starts - pd.Timedelta(days=window_days)), stops.append(starts))
+    current, previous = both.iloc[:windows].reset_index(drop=True), both.iloc[windows:].reset_index(drop=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total_change = (current["sum"] - previous["sum"]) / previous["sum"] * 100
+        count_change = (current["count"] - previous["count"]) / previous["count"] * 100
+
+    table = pd.DataFrame({
+        "start_date": starts.strftime("%Y-%m-%d"),
+        "end_date": (stops - day).strftime("%Y-%m-%d"),
+        "transaction_count": current["count"],
+        "total_amount": current["sum"].round(2),
+        "avg_amount": current["mean"].round(2),
+        "std_amount": current["std"].round(2),
+        "previous_transaction_count": previous["count"],
+        "previous_total_amount": previous["sum"].round(2),
+        "total_change_pct": total_change.replace([np.inf, -np.inf], np.nan).round(2),
+        "count_change_pct": count_change.replace([np.inf, -np.inf], np.nan).round(2),
+    })
+    return TableData(
+        metric=f"{window_days}-Day Window Stats every {step_days} Days",
+        data=table.astype(object).where(table.notna(), None).to_dict(orient="records")
+    )
+
+@timed("analytics.transaction_frequency_analysis")
+def _get_transaction_frequency_analysis(df: pd.DataFrame, filters: dict, metric_name: str,
+                                        unique_cols: dict = None) -> TableData:
+    """
+    Analyze transaction frequency patterns (day of week, hour, month, quarter)
+    plus daily activity; unique_cols adds {label: column} distinct counts to the summary.
+    """
+    suffix = _get_filter_suffix(filters)
+    parts = ["day_of_week", "hour_of_day", "month_of_year", "quarter_of_year", "date"]
+    counts = get_backend().date_part_counts(df, parts)
+
+    # Calculate average transactions per day
+    daily = counts.pop("date")["transaction_count"]
+    avg_daily = daily.mean()
+
+    # Calculate days with transactions vs total days in period
+    total_days = (df['date'].max() - df['date'].min()).days + 1
+    days_with_transactions = len(daily)
+    activity_rate = round((days_with_transactions / total_days) * 100, 2) if total_days > 0 else 0
+
+    summary = [
+        {"metric": f"Average Daily Transactions{suffix}", "value": round(avg_daily, 2)},
+        {"metric": f"Days with Activity{suffix}", "value": days_with_transactions},
+        {"metric": f"Total Days in Period{suffix}", "value": total_days},
+        {"metric": f"Activity Rate (%){suffix}", "value": activity_rate}
+    ]
+    for label, col in (unique_cols or {}).items():
+        summary.append({"metric": f"{label}{suffix}", "value": df[col].nunique()})
+
+    result = {"summary": summary}
+    for part, part_counts in counts.items():
+        result[part] = part_counts.sort_values(by='transaction_count', ascending=False).to_dict(orient="records")
+
+    return TableData(
+        metric=f"{metric_name}{suffix}",
+        data=result
+    )
+
 def _safe_process_dataframe(df: pd.DataFrame, process_fn, default_result=None):
     """
     Safely process a DataFrame, handling empty DataFrames gracefully.
@@ -1,10 +1,26 @@
+import asyncio
+import logging
+import time
 from fastapi import HTTPException
-from typing import List, Dict, Any, Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import Awaitable, Callable, List, Dict, Any, Optional
 import pandas as pd
-from app.utils.helpers import apply_filter, build_schema_prompt, filter_transactions
+from app.core.config import settings
+from app.core.timing import annotate
+from app.utils.helpers import (
+    apply_filter, build_schema_prompt, build_grouped_schema_prompt,
+    filter_transactions, add_computed_attributes
+)
 from app.utils.router_helpers import filter_entity_data
+from app.utils.nl_cache import get_translation_cache
+from app.utils.nl_parser import local_translation, parser_stats
 from app.chains.intent import intent_classification_chain
 from app.chains.filter_extraction import filter_extraction_chain
+from app.chains.subject_column_indentifier import group_by_extraction_chain
+from app.chains.combined_extraction import combined_extraction_chain
+from app.chains.runner import ainvoke_chain
+
+logger = logging.getLogger(__name__)
 
 def apply_structured_filter(
     df: pd.DataFrame, 
@@ -35,6 +51,7 @@ def apply_structured_filter(
         filtered_df = df[mask]
         
         if filtered_df.empty:
+            annotate(filter=filter_structure, group_by_column=id_col, result_rows=0)
             return []
         
         # Get available columns
@@ -42,12 +59,13 @@ def apply_structured_filter(
         
         # Get unique entities with their attributes
         entities = filtered_df[available_cols].drop_duplicates(id_col).to_dict(orient='records')
+        annotate(filter=filter_structure, group_by_column=id_col, result_rows=len(entities))
         return entities
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-def apply_nl_filter(
+async def apply_nl_filter(
     df: pd.DataFrame, 
     query: str, 
     id_col: str, 
@@ -55,6 +73,8 @@ def apply_nl_filter(
 ) -> List[Dict[str, Any]]:
     """
     Apply a natural language filter to a dataframe and return filtered entities.
+    The LLM call is awaited under the shared concurrency limit and timeout, and
+    the pandas filtering runs in a worker thread, so the event loop stays free.
     
     Args:
         df: DataFrame containing the data
@@ -69,20 +89,190 @@ def apply_nl_filter(
         HTTPException: If filter cannot be extracted or applied
     """
 
+    # Simple phrasings are parsed locally, without an LLM round-trip
+    if settings.NL_RULE_PARSER:
+        _, filter_structure = local_translation(query, df.columns)
+        if filter_structure is not None:
+            return await run_in_threadpool(apply_structured_filter, df, filter_structure, id_col, attribute_cols)
+
     schema_prompt = build_schema_prompt(df)
-    
+
+    # Same phrasing against the same schema: skip the LLM round-trip
+    cache = get_translation_cache()
+    filter_structure = cache.get(query, schema_prompt)
+    if filter_structure is not None:
+        return await run_in_threadpool(apply_structured_filter, df, filter_structure, id_col, attribute_cols)
+
     try:
-        filter_result = filter_extraction_chain.invoke({"query": query, "schema_prompt": schema_prompt})
-        print("Raw LLM output:", filter_result)
+        started = time.perf_counter()
+        filter_result = await ainvoke_chain(filter_extraction_chain, {"query": query, "schema_prompt": schema_prompt})
+        parser_stats.record(False, time.perf_counter() - started)
+        logger.debug("Raw LLM output: %s", filter_result)
         filter_structure = filter_result["filter_object"]
                 
         if not filter_structure:
             raise HTTPException(status_code=400, detail="Could not extract filtering criteria from query")
             
         # Step 3: Apply the filter
-        return apply_structured_filter(df, filter_structure, id_col, attribute_cols)
+        entities = await run_in_threadpool(apply_structured_filter, df, filter_structure, id_col, attribute_cols)
+        cache.put(query, schema_prompt, filter_structure)
+        return entities
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+
+def grouped_frames(df: pd.DataFrame) -> Callable[[str], Awaitable[pd.DataFrame]]:
+    """
+    An async getter for add_computed_attributes(df, column), computed in a
+    worker thread at most once per column however many queries await it.
+    """
+    frames: Dict[str, asyncio.Future] = {}
+
+    def get(group_by_column: str) -> Awaitable[pd.DataFrame]:
+        if group_by_column not in frames:
+            frames[group_by_column] = asyncio.ensure_future(
+                run_in_threadpool(add_computed_attributes, df, group_by_column)
+            )
+        return frames[group_by_column]
+
+    return get
+
+async def apply_nl_filter_grouped(
+    df: pd.DataFrame,
+    query: str,
+    group_by_columns: List[str],
+    attribute_cols_base: List[str],
+    grouped_frame: Optional[Callable[[str], Awaitable[pd.DataFrame]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Apply a natural language filter whose group-by column is part of the query.
+
+    Intent, group-by column and filter object come from one combined LLM call
+    (NL_COMBINED_EXTRACTION); if that call fails or its answer does not apply to
+    the data, falls back to the intent + group-by + filter extraction chains.
+
+    Args:
+        df: DataFrame containing the data
+        query: Natural language query string
+        group_by_columns: Entity ID columns the query may group by
+        attribute_cols_base: Computed columns to include in the result
+        grouped_frame: Shared grouped_frames(df) getter, so a batch of queries
+            aggregates each group-by column once
+
+    Returns:
+        List of dictionaries containing filtered entities
+
+    Raises:
+        HTTPException: If the query is not a filter request or cannot be applied
+    """
+    available_entity_id_columns = "\n".join(f"- {col}" for col in group_by_columns)
+    grouped_frame = grouped_frame or grouped_frames(df)
+
+    # "merchants with more than 50 transactions": subject and filter parsed locally
+    if settings.NL_RULE_PARSER:
+        group_by_column, filter_structure = local_translation(query, df.columns, group_by_columns)
+        if filter_structure is not None:
+            grouped_df = await grouped_frame(group_by_column)
+            return await run_in_threadpool(
+                apply_structured_filter, grouped_df, filter_structure, group_by_column,
+                [group_by_column] + attribute_cols_base
+            )
+
+    if settings.NL_COMBINED_EXTRACTION:
+        try:
+            started = time.perf_counter()
+            result = await ainvoke_chain(combined_extraction_chain, {
+                "query": query,
+                "available_entity_id_columns": available_entity_id_columns,
+                "schema_prompt": build_grouped_schema_prompt(df, group_by_columns),
+            })
+            parser_stats.record(False, time.perf_counter() - started)
+        except HTTPException:
+            raise  # timed out: the separate chains would only take longer
+        except Exception as e:
+            logger.warning("Combined extraction failed, falling back to separate chains: %s", e)
+            result = None
+
+        if result and not result["filter_intent"]:
+            raise HTTPException(status_code=400, detail="Could not determine filtering criteria from query")
+
+        if result and result["group_by_column"] in group_by_columns and result["filter_object"]:
+            group_by_column = result["group_by_column"]
+            grouped_df = await grouped_frame(group_by_column)
+            try:
+                entities = await run_in_threadpool(
+                    apply_structured_filter, grouped_df, result["filter_object"], group_by_column,
+                    [group_by_column] + attribute_cols_base
+                )
+            except HTTPException as e:
+                logger.debug("Combined filter did not apply, falling back to separate chains: %s", e.detail)
+            else:
+                # Later requests for the same query on the separate-chain path reuse it
+                get_translation_cache().put(query, build_schema_prompt(grouped_df), result["filter_object"])
+                return entities
+
+    # Run intent classification and group by extraction in parallel
+    intent_result, group_by_result = await asyncio.gather(
+        ainvoke_chain(intent_classification_chain, {"query": query}),
+        ainvoke_chain(group_by_extraction_chain, {"query": query, "available_entity_id_columns": available_entity_id_columns})
+    )
+    logger.debug("Intent classification output: %s", intent_result)
+    logger.debug("Group-by extraction output: %s", group_by_result)
+
+    if not intent_result["filter_intent"]:
+        raise HTTPException(status_code=400, detail="Could not determine filtering criteria from query")
+
+    group_by_column = group_by_result["group_by_column"]
+    if group_by_column not in group_by_columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Could not group by '{group_by_column}'; expected one of {group_by_columns}"
+        )
+    df = await grouped_frame(group_by_column)
+    attribute_cols = [group_by_column] + attribute_cols_base
+
+    return await apply_nl_filter(df, query, group_by_column, attribute_cols)
+
+async def apply_nl_filter_batch(
+    df: pd.DataFrame,
+    queries: List[str],
+    group_by_columns: List[str],
+    attribute_cols_base: List[str],
+) -> List[Dict[str, Any]]:
+    """
+    Resolve many natural language filters against the same data.
+
+    Each distinct query goes through apply_nl_filter_grouped, at most
+    NL_BATCH_CONCURRENCY at a time (LLM calls are further bounded by
+    LLM_MAX_CONCURRENCY), and all of them share one add_computed_attributes
+    table per group-by column. A failing query reports its error in place
+    instead of failing the batch.
+
+    Returns:
+        One {"query", "count", "results"} or {"query", "status_code", "error"}
+        dictionary per query, in request order
+    """
+    grouped_frame = grouped_frames(df)
+    semaphore = asyncio.Semaphore(settings.NL_BATCH_CONCURRENCY)
+
+    async def resolve(query: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                entities = await apply_nl_filter_grouped(
+                    df, query, group_by_columns, attribute_cols_base, grouped_frame
+                )
+            except HTTPException as e:
+                return {"query": query, "status_code": e.status_code, "error": e.detail}
+            except Exception as e:
+                logger.warning("NL filter failed for query %r", query, exc_info=True)
+                return {"query": query, "status_code": 500, "error": str(e)}
+        return {"query": query, "count": len(entities), "results": entities}
+
+    # Repeated questions in one batch are answered once
+    distinct = list(dict.fromkeys(queries))
+    answers = dict(zip(distinct, await asyncio.gather(*(resolve(q) for q in distinct))))
+    return [answers[q] for q in queries]
@@ -1,6 +1,7 @@
 
 import pandas as pd
 from ..models.stats import SimpleStat, GraphData, GraphPoints, TableData
+from ..core.timing import timed
 
 def get_average_transaction_over_time(df: pd.DataFrame, granularity: str, filters: dict) -> GraphData:
     group_cols, label_fmt = get_grouping_and_label_fn(granularity)
@@ -214,40 +215,35 @@ def get_filter_suffix(filters: dict) -> str:
 
     return " for " + ", ".join(parts) if parts else ""
 
-def add_computed_attributes(df, id_col):
+def computed_aggregations(id_col):
+    """The computed attributes add_computed_attributes derives per id_col, as {name: (column, func)}."""
     # Core numeric aggregates for amount
-    agg_df = df.groupby(id_col)['amount'].agg([
-        ('avg_transaction_amount', 'mean'),
-        ('total_transactions', 'count'),
-        ('sum_transaction_amount', 'sum'),
-        ('min_transaction_amount', 'min'),
-        ('max_transaction_amount', 'max'),
-        ('std_transaction_amount', 'std')
-    ]).reset_index()
+    aggs = {
+        'avg_transaction_amount': ('amount', 'mean'),
+        'total_transactions': ('amount', 'count'),
+        'sum_transaction_amount': ('amount', 'sum'),
+        'min_transaction_amount': ('amount', 'min'),
+        'max_transaction_amount': ('amount', 'max'),
+        'std_transaction_amount': ('amount', 'std'),
+    }
 
     # Always compute unique customers
     if id_col != 'customer_id':
-        unique_customers = df.groupby(id_col)['customer_id'].nunique().reset_index()
-        unique_customers.rename(columns={'customer_id': 'unique_customers'}, inplace=True)
-        agg_df = agg_df.merge(unique_customers, on=id_col, how='left')
+        aggs['unique_customers'] = ('customer_id', 'nunique')
 
     # Dynamically compute other unique counts
     if id_col == 'merchant_id':
-        # Unique branch admins
-        unique_branch_admins = df.groupby(id_col)['branch_admin_id'].nunique().reset_index()
-        unique_branch_admins.rename(columns={'branch_admin_id': 'unique_branch_admins'}, inplace=True)
-        agg_df = agg_df.merge(unique_branch_admins, on=id_col, how='left')
-
-        # Unique terminals
-        unique_terminals = df.groupby(id_col)['terminal_id'].nunique().reset_index()
-        unique_terminals.rename(columns={'terminal_id': 'unique_terminals'}, inplace=True)
-        agg_df = agg_df.merge(unique_terminals, on=id_col, how='left')
+        aggs['unique_branch_admins'] = ('branch_admin_id', 'nunique')
+        aggs['unique_terminals'] = ('terminal_id', 'nunique')
 
     elif id_col == 'branch_admin_id':
-        # Unique terminals
-        unique_terminals = df.groupby(id_col)['terminal_id'].nunique().reset_index()
-        unique_terminals.rename(columns={'terminal_id': 'unique_terminals'}, inplace=True)
-        agg_df = agg_df.merge(unique_terminals, on=id_col, how='left')
+        aggs['unique_terminals'] = ('terminal_id', 'nunique')
+
+    return aggs
+
+@timed("computed_attributes")
+def add_computed_attributes(df, id_col):
+    agg_df = get_backend().aggregate(df, [id_col], computed_aggregations(id_col))
 
     # Merge computed attributes back to the main DataFrame
     df = df.merge(agg_df, on=id_col, how='left')
@@ -312,49 +308,12 @@ def add_computed_attributes(df, id_col):
 
 
 import pandas as pd
+from app.backends import get_backend
 
+@timed("filter")
 def apply_filter(df, filter_obj):
-    if 'and' in filter_obj:
-        masks = [apply_filter(df, f) for f in filter_obj['and']]
-        return pd.concat(masks, axis=1).all(axis=1)
-
-    elif 'or' in filter_obj:
-        masks = [apply_filter(df, f) for f in filter_obj['or']]
-        return pd.concat(masks, axis=1).any(axis=1)
-
-    elif 'not' in filter_obj:
-        mask = apply_filter(df, filter_obj['not'])
-        return ~mask
-
-    else:
-        col = filter_obj['column']
-        op = filter_obj['operator']
-        val = filter_obj['value']
-
-        if col not in df.columns:
-            raise ValueError(f"Unsupported column: '{col}'")
-
-        s = df[col]
-        if op == 'equals':
-            return s == val
-        elif op == 'not_equals':
-            return s != val
-        elif op == 'greater_than':
-            return s > val
-        elif op == 'greater_than_equals':
-            return s >= val
-        elif op == 'less_than':
-            return s < val
-        elif op == 'less_than_equals':
-            return s <= val
-        elif op == 'between':
-            return s.between(val[0], val[1])
-        elif op == 'in':
-            return s.isin(val)
-        elif op == 'not_in':
-            return ~s.isin(val)
-        else:
-            raise ValueError(f"Unsupported operator: '{op}' for column '{col}'")
+    """Evaluate a structured filter to a boolean mask using the configured query backend."""
+    return get_backend().filter_mask(df, filter_obj)
 
 
 def filter_transactions(df, filter_structure, id_col='merchant_id'):
@@ -376,4 +335,21 @@ def build_schema_prompt(df: pd.DataFrame) -> str:
     for col, dtype in df.dtypes.items():
         schema_lines.append(f"- {col} ({dtype})")
 
-    return "\n".join(schema_lines)
\ No newline at end of file
+    return "\n".join(schema_lines)
+
+def build_grouped_schema_prompt(df: pd.DataFrame, group_by_columns) -> str:
+    """
+    Schema string for a query whose group-by column is not known yet: the raw
+    columns plus every computed attribute, noting which group-by columns have it.
+    """
+    schema_lines = [build_schema_prompt(df), "", "Computed per group-by column (see which columns have each):"]
+    available = {}
+    for id_col in group_by_columns:
+        for name, (col, func) in computed_aggregations(id_col).items():
+            dtype = "int64" if func in ("count", "nunique") else df[col].dtype
+            available.setdefault((name, str(dtype)), []).append(id_col)
+    for (name, dtype), id_cols in available.items():
+        scope = "all" if len(id_cols) == len(group_by_columns) else ", ".join(id_cols)
+        schema_lines.append(f"- {name} ({dtype}) [group by: {scope}]")
+
+    return "\n".join(schema_lines)
@@ -0,0 +1,150 @@
+"""
+Disk-persisted LRU cache of natural-language -> structured filter translations.
+
+apply_nl_filter asks the LLM to turn a query into a filter object; the answer
+only depends on the query and on the schema shown to the model, so it is
+cached under (hash of build_schema_prompt output, normalized query). Entries
+live in memory in LRU order and are written to DATA_DIR/nl_filter_cache.json
+so they survive restarts: atomically, by a background timer that batches
+the inserts of SAVE_DELAY_SECONDS into one write, so a cache miss never
+serialises the whole file on the request path.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+CACHE_NAME = "nl_filter_cache.json"
+SAVE_DELAY_SECONDS = 1.0    # inserts within this window share one write
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and drop trailing punctuation; case is kept, values are case-sensitive."""
+    return " ".join(query.split()).rstrip("?.!; ")
+
+
+def schema_hash(schema_prompt: str) -> str:
+    return hashlib.sha256(schema_prompt.encode()).hexdigest()[:16]
+
+
+class TranslationCache:
+    """LRU map of (schema hash, normalized query) -> filter object, persisted as JSON."""
+
+    def __init__(self, path: Path, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()    # one writer at a time, newest snapshot last
+        self._timer: Optional[threading.Timer] = None
+        self._load()
+
+    @staticmethod
+    def key(query: str, schema_prompt: str) -> str:
+        return f"{schema_hash(schema_prompt)}:{normalize_query(query)}"
+
+    def get(self, query: str, schema_prompt: str) -> Optional[Dict]:
+        """The cached filter object for this query and schema, or None."""
+        key = self.key(query, schema_prompt)
+        with self._lock:
+            filter_object = self._entries.get(key)
+            if filter_object is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return filter_object
+
+    def put(self, query: str, schema_prompt: str, filter_object: Dict) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self.key(query, schema_prompt)
+        with self._lock:
+            self._entries[key] = filter_object
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._schedule_save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+            self._schedule_save()
+
+    def flush(self) -> None:
+        """Write the entries to disk now if a save is pending."""
+        with self._save_lock:
+            with self._lock:
+                if self._timer is None:
+                    return
+                self._timer.cancel()
+                self._timer = None
+                # Least recently used first, so a reload keeps the LRU order
+                entries = list(self._entries.items())
+            self._save(entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _load(self) -> None:
+        try:
+            entries = json.loads(self.path.read_text())["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # no cache yet, or unreadable: start empty
+        for key, filter_object in entries[-self.max_entries:] if self.max_entries > 0 else []:
+            self._entries[key] = filter_object
+
+    def _schedule_save(self) -> None:
+        # Called with self._lock held
+        if self._timer is None:
+            self._timer = threading.Timer(SAVE_DELAY_SECONDS, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _save(self, entries) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.incoming")
+        tmp.write_text(json.dumps({"entries": entries}))
+        os.replace(tmp, self.path)
+
+
+_cache: Optional[TranslationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """The process-wide translation cache for the current DATA_DIR."""
+    global _cache
+    path = settings.DATA_DIR / CACHE_NAME
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            if _cache is not None:
+                _cache.flush()
+            _cache = TranslationCache(path, settings.NL_CACHE_SIZE)
+        return _cache
+
+
+def flush_translation_cache() -> None:
+    """Write any pending inserts to disk; called at shutdown."""
+    with _cache_lock:
+        if _cache is not None:
+            _cache.flush()
@@ -0,0 +1,280 @@
+"""
+Deterministic fast path for simple natural-language filter queries.
+
+Phrasings like "merchants with more than 50 transactions" or "customers
+spending over 500 on average and at least 3 terminals" map directly onto the
+filter JSON used by apply_filter, over the raw columns and the computed
+attributes of helpers.add_computed_attributes. The parser only answers when
+it understands the whole query and every column it picked exists; anything
+else (negations, "or", dates, unknown words) returns None and the query goes
+to the LLM as before.
+"""
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.helpers import computed_aggregations
+
+# Phrase -> operator; matched longest phrase first
+COMPARATORS = {
+    "more than": "greater_than", "greater than": "greater_than", "higher than": "greater_than",
+    "over": "greater_than", "above": "greater_than", "exceeding": "greater_than",
+    "in excess of": "greater_than", ">": "greater_than",
+    "at least": "greater_than_equals", "no less than": "greater_than_equals",
+    "a minimum of": "greater_than_equals", ">=": "greater_than_equals",
+    "less than": "less_than", "fewer than": "less_than", "lower than": "less_than",
+    "under": "less_than", "below": "less_than", "<": "less_than",
+    "at most": "less_than_equals", "no more than": "less_than_equals",
+    "up to": "less_than_equals", "a maximum of": "less_than_equals", "<=": "less_than_equals",
+    "exactly": "equals", "equal to": "equals", "equals": "equals", "=": "equals",
+}
+
+# Nouns counted after a number: "more than 50 transactions", "at least 3 terminals"
+COUNT_NOUNS = {
+    "total_transactions": ["transactions", "transaction", "txns", "purchases", "payments", "sales"],
+    "unique_customers": ["customers", "unique customers", "distinct customers", "different customers"],
+    "unique_terminals": ["terminals", "unique terminals", "distinct terminals", "different terminals"],
+    "unique_branch_admins": ["branch admins", "branches", "unique branch admins", "distinct branch admins"],
+    "unique_merchants": ["merchants", "unique merchants", "distinct merchants", "different merchants"],
+}
+
+# Metrics named before the comparison: "average transaction amount over 200"
+METRIC_PHRASES = {
+    "total_transactions": ["number of transactions", "transaction count", "total transactions",
+                           "count of transactions"],
+    "avg_transaction_amount": ["average transaction amount", "average transaction value", "average transaction",
+                               "average amount", "average spend", "average spending", "average ticket",
+                               "avg transaction amount", "avg amount", "mean transaction amount"],
+    "sum_transaction_amount": ["total spend", "total spending", "total amount", "total transaction amount",
+                               "total transaction value", "total sales", "total volume", "transaction volume",
+                               "sales volume", "revenue", "turnover"],
+    "min_transaction_amount": ["minimum transaction amount", "minimum transaction", "min transaction amount",
+                               "smallest transaction", "lowest transaction"],
+    "max_transaction_amount": ["maximum transaction amount", "maximum transaction", "max transaction amount",
+                               "largest transaction", "biggest transaction", "highest transaction"],
+    "std_transaction_amount": ["standard deviation of transaction amounts", "transaction amount standard deviation",
+                               "standard deviation"],
+    "unique_customers": ["number of customers", "unique customers", "customer count"],
+    "unique_terminals": ["number of terminals", "unique terminals", "terminal count"],
+    "unique_branch_admins": ["number of branch admins", "unique branch admins", "branch admin count"],
+    "unique_merchants": ["number of merchants", "unique merchants", "merchant count"],
+    # A single transaction's amount: "transactions over 500"
+    "amount": ["transactions", "transaction", "transaction amount", "transaction amounts", "amount",
+               "amounts", "purchases", "payments"],
+}
+
+# Spending verbs: "customers spending over 500 (on average)"
+SPEND_VERBS = ["spend", "spends", "spent", "spending", "sell", "sells", "sold", "selling", "process",
+               "processes", "processed", "processing", "earn", "earns", "earned", "earning"]
+AVERAGE_SUFFIXES = ["on average", "per transaction", "per purchase", "per payment", "average"]
+TOTAL_SUFFIXES = ["in total", "total", "overall", "altogether", "in sales", "in transactions"]
+
+# Subjects at the start of a query, as the entity they group by
+SUBJECTS = {
+    "merchants": "merchant_id", "merchant": "merchant_id",
+    "customers": "customer_id", "customer": "customer_id",
+    "terminals": "terminal_id", "terminal": "terminal_id",
+    "branch admins": "branch_admin_id", "branch admin": "branch_admin_id",
+    "branches": "branch_admin_id", "branch": "branch_admin_id",
+    "agents": "agent_id", "agent": "agent_id",
+}
+
+_LEADING_WORDS = ["show me", "show", "find", "list", "get", "give me", "return", "display", "which", "what",
+                  "all", "the", "any", "only", "me"]
+_JOINING_WORDS = ["with", "who", "that", "which", "having", "have", "has", "had", "are", "is", "were", "was",
+                  "where", "whose", "do", "does", "did", "a", "an", "their", "its"]
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    return "|".join(re.escape(p) for p in sorted(set(phrases), key=len, reverse=True))
+
+
+_NUMBER = r"\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m)?"
+_CMP = _alternation(COMPARATORS)
+_COUNT_NOUN = {noun: col for col, nouns in COUNT_NOUNS.items() for noun in nouns}
+_METRIC = {phrase: col for col, phrases in METRIC_PHRASES.items() for phrase in phrases}
+_AVG_SUFFIX = _alternation(AVERAGE_SUFFIXES)
+_TOTAL_SUFFIX = _alternation(TOTAL_SUFFIXES)
+
+# "more than 50 transactions", "between 10 and 20 customers"
+_COUNT_CLAUSE = re.compile(
+    rf"(?:(?P<cmp>{_CMP})\s*{_NUMBER}|between\s+{_NUMBER}\s+and\s+{_NUMBER})"
+    rf"\s+(?P<noun>{_alternation(_COUNT_NOUN)})"
+)
+# "average transaction amount over 200", "transactions between 10 and 20"
+_METRIC_CLAUSE = re.compile(
+    rf"(?P<metric>{_alternation(_METRIC)})(?:\s+(?:of|is|are|was|were))?\s+"
+    rf"(?:(?P<cmp>{_CMP})\s*{_NUMBER}|between\s+{_NUMBER}\s+and\s+{_NUMBER})"
+    rf"(?:\s+(?P<suffix>{_AVG_SUFFIX}|{_TOTAL_SUFFIX}))?"
+)
+# "spending over 500 on average", "spent between 100 and 200"
+_SPEND_CLAUSE = re.compile(
+    rf"(?P<verb>{_alternation(SPEND_VERBS)})\s+"
+    rf"(?:(?P<cmp>{_CMP})\s*{_NUMBER}|between\s+{_NUMBER}\s+and\s+{_NUMBER})"
+    rf"(?:\s+(?P<suffix>{_AVG_SUFFIX}|{_TOTAL_SUFFIX}))?"
+)
+# Anything the parser should not guess at
+_UNSUPPORTED = re.compile(
+    r"\b(?:not|never|none|except|excluding|without|or|either|neither|nor|last|this|past|since|before|after|"
+    r"during|today|yesterday|days?|weeks?|months?|years?|top|bottom|fewest)\b"
+    r"|\bno\b(?!\s+(?:less|more)\s+than)|(?<!\bat )\bmost\b|(?<!\bat )\bleast\b"
+)
+
+
+def _number(digits: str, unit: Optional[str]) -> float:
+    value = float(digits.replace(",", ""))
+    value *= {"k": 1_000, "m": 1_000_000}.get(unit or "", 1)
+    return int(value) if value.is_integer() else value
+
+
+def _strip_words(text: str, words: List[str]) -> str:
+    pattern = re.compile(rf"^(?:{_alternation(words)})\b\s*")
+    while True:
+        stripped = pattern.sub("", text)
+        if stripped == text:
+            return text
+        text = stripped
+
+
+def _range_leaf(column: str, match, offset: int) -> Dict:
+    """A leaf from the comparison or `between` groups starting at group index offset."""
+    if match.group("cmp"):
+        value = _number(match.group(offset), match.group(offset + 1))
+        return {"column": column, "operator": COMPARATORS[match.group("cmp")], "value": value}
+    low = _number(match.group(offset + 2), match.group(offset + 3))
+    high = _number(match.group(offset + 4), match.group(offset + 5))
+    return {"column": column, "operator": "between", "value": [low, high]}
+
+
+def _parse_clause(clause: str) -> Optional[Dict]:
+    clause = _strip_words(clause, _JOINING_WORDS)
+
+    match = _COUNT_CLAUSE.fullmatch(clause)
+    if match:
+        return _range_leaf(_COUNT_NOUN[match.group("noun")], match, 2)
+
+    match = _METRIC_CLAUSE.fullmatch(clause)
+    if match:
+        column = _METRIC[match.group("metric")]
+        suffix = match.group("suffix")
+        if suffix in AVERAGE_SUFFIXES and column in ("amount", "sum_transaction_amount"):
+            column = "avg_transaction_amount"
+        elif suffix in TOTAL_SUFFIXES and column == "amount":
+            column = "sum_transaction_amount"
+        elif suffix and column not in ("amount", "sum_transaction_amount", "avg_transaction_amount"):
+            return None
+        return _range_leaf(column, match, 3)
+
+    match = _SPEND_CLAUSE.fullmatch(clause)
+    if match:
+        column = "avg_transaction_amount" if match.group("suffix") in AVERAGE_SUFFIXES else "sum_transaction_amount"
+        return _range_leaf(column, match, 3)
+
+    return None
+
+
+def _split_clauses(text: str) -> List[str]:
+    """Split on `and` / commas (not thousands separators), keeping `between X and Y` together."""
+    protected = re.sub(rf"between\s+({_NUMBER})\s+and\s+", lambda m: m.group(0).replace(" and ", " \0 "), text)
+    parts = re.split(r"\s*,\s+(?:and\s+)?|\s+and\s+", protected)
+    return [p.replace(" \0 ", " and ").strip() for p in parts if p.strip()]
+
+
+def parse_query(query: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    Parse a simple query into (subject entity column or None, filter object).
+
+    The filter object is None when the query is not fully understood.
+    """
+    text = " ".join(query.lower().replace("’", "'").split()).rstrip("?.!")
+    if not text or _UNSUPPORTED.search(text):
+        return None, None
+
+    text = _strip_words(text, _LEADING_WORDS)
+    subject = None
+    match = re.match(rf"({_alternation(SUBJECTS)})\b\s*", text)
+    if match:
+        subject = SUBJECTS[match.group(1)]
+        text = text[match.end():]
+
+    leaves = []
+    for clause in _split_clauses(text):
+        leaf = _parse_clause(clause)
+        if leaf is None:
+            return subject, None
+        leaves.append(leaf)
+
+    if not leaves:
+        return subject, None
+    return subject, leaves[0] if len(leaves) == 1 else {"and": leaves}
+
+
+def filter_columns(filter_object: Dict) -> List[str]:
+    if "and" in filter_object:
+        return [c for leaf in filter_object["and"] for c in filter_columns(leaf)]
+    return [filter_object["column"]]
+
+
+# ─── Fast-path statistics ──────────────────────────────────────────────────
+class _Stats:
+    """How many NL translations were answered locally versus by the LLM, and how long each took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+        self.local_seconds = 0.0
+        self.llm_seconds = 0.0
+
+    def record(self, local: bool, seconds: float) -> None:
+        with self._lock:
+            if local:
+                self.local += 1
+                self.local_seconds += seconds
+            else:
+                self.llm += 1
+                self.llm_seconds += seconds
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            total = self.local + self.llm
+            avg_llm = self.llm_seconds / self.llm if self.llm else None
+            avg_local = self.local_seconds / self.local if self.local else None
+            return {
+                "translations": total,
+                "served_locally": self.local,
+                "served_by_llm": self.llm,
+                "local_share": round(self.local / total, 4) if total else 0.0,
+                "avg_local_ms": round(avg_local * 1000, 3) if avg_local is not None else None,
+                "avg_llm_ms": round(avg_llm * 1000, 1) if avg_llm is not None else None,
+                # Each local answer saved roughly one average LLM round-trip
+                "estimated_seconds_saved": round(self.local * (avg_llm - avg_local), 3)
+                if avg_llm is not None and avg_local is not None else None,
+            }
+
+
+parser_stats = _Stats()
+
+
+def local_translation(query: str, columns: Iterable[str],
+                      group_by_columns: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    (group-by column, filter object) when the fast path can answer query, else (None, None).
+
+    With group_by_columns the query must name one of them as its subject, and
+    the columns it may filter on include that entity's computed attributes.
+    Answers are counted in parser_stats.
+    """
+    started = time.perf_counter()
+    subject, filter_object = parse_query(query)
+    if filter_object is None:
+        return None, None
+    if group_by_columns is not None:
+        if subject not in group_by_columns:
+            return None, None
+        columns = list(columns) + list(computed_aggregations(subject))
+    if not set(filter_columns(filter_object)) <= set(columns):
+        return None, None
+    parser_stats.record(True, time.perf_counter() - started)
+    return subject, filter_object
@@ -0,0 +1,304 @@
+"""
+Out-of-core execution of the analytics in app/utils/analytics.py.
+
+Instead of slicing the in-memory frame, these functions stream the dataset
+from disk in chunks sized to a memory budget, reduce every chunk to a small
+partial aggregate and merge the partials. Peak memory is bounded by the
+chunk size plus the size of the aggregates (periods, entities, entity pairs),
+never by the number of transactions. The final step reuses the in-memory
+engine's table/graph builders, so both engines shape results identically.
+
+Chunks come from the Parquet month partitions when PARTITIONED_STORAGE has
+written them (pruned by the date filters first), otherwise from the CSV;
+either way rows arrive in dataset order, which is what makes the sums match
+the in-memory engine bit for bit (see _Accumulator).
+
+The app serves datasets larger than OUT_OF_CORE_THRESHOLD_MB through this
+module: such a CSV is never loaded, and routes whose analytics are covered
+here receive a StreamedSlice (app.core.data) that the analytics functions
+hand over to the functions below.
+"""
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from pandas.tseries.api import guess_datetime_format
+
+from app.core.config import settings
+from app.core.partitions import ROW_COLUMN, load_manifest, prune_partitions, is_current, _require_pyarrow
+from app.models.stats import GraphData, TableData
+from app.utils.analytics import (
+    _apply_date_filters, _get_grouping_and_label_fn, _time_series_graph,
+    _outliers_table, _segmentation_table, _top_entities_table
+)
+
+# Working-set multiplier over a chunk's raw size (date parsing, masks, groupby buffers)
+_CHUNK_OVERHEAD = 4
+_SAMPLE_ROWS = 1000
+
+
+def rows_per_chunk(path, memory_budget_mb: Optional[int] = None, columns: Optional[List[str]] = None) -> int:
+    """Estimate how many rows fit in the memory budget from a small sample."""
+    budget = (memory_budget_mb or settings.OUT_OF_CORE_MEMORY_MB) * 1024 * 1024
+    sample = pd.read_csv(path, nrows=_SAMPLE_ROWS, usecols=columns)
+    if sample.empty:
+        return _SAMPLE_ROWS
+    bytes_per_row = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+    return max(_SAMPLE_ROWS, int(budget / (bytes_per_row * _CHUNK_OVERHEAD)))
+
+
+def iter_chunks(columns: List[str], entity_id_col: str = None, entity_id=None,
+                memory_budget_mb: Optional[int] = None, **date_filters) -> Iterator[pd.DataFrame]:
+    """
+    Yield prepared, filtered chunks of the dataset holding only `columns`, in
+    dataset row order.
+
+    Each chunk is restricted to the entity (if given) and the date filters, and
+    carries the same date-part columns as the in-memory frame. Raises the same
+    404s as filter_entity_data once the stream ends without a matching row.
+    """
+    columns = list(dict.fromkeys(columns + ["date", "amount"] + ([entity_id_col] if entity_id_col else [])))
+    chunk_rows = rows_per_chunk(settings.csv_path, memory_budget_mb, columns)
+    # Infer the date format once, from the first date, as the in-memory load does for the whole column
+    dates = pd.read_csv(settings.csv_path, nrows=_SAMPLE_ROWS, usecols=["date"])["date"].dropna()
+    date_format = guess_datetime_format(str(dates.iloc[0])) if len(dates) else None
+
+    entity_found = found = False
+    for chunk in _raw_chunks(columns, chunk_rows, date_filters):
+        if entity_id_col:
+            chunk = chunk[chunk[entity_id_col] == entity_id]
+            entity_found = entity_found or not chunk.empty
+        if not pd.api.types.is_datetime64_any_dtype(chunk["date"]):
+            chunk = chunk.assign(date=pd.to_datetime(chunk["date"], format=date_format))
+        chunk = _apply_date_filters(chunk, **date_filters)
+        if not chunk.empty:
+            found = True
+            yield chunk
+
+    if entity_id_col and not entity_found and not _pruned(date_filters):
+        raise HTTPException(status_code=404, detail=f"No data found for this {entity_id_col.replace('_id', '')}")
+    if not found:
+        raise HTTPException(status_code=404, detail="No data after filtering")
+
+
+def _pruned(date_filters: dict) -> bool:
+    """True if the stream skips partitions, so a missing entity may only be outside the filters."""
+    return settings.PARTITIONED_STORAGE and prune_partitions([], **date_filters) is not None
+
+
+def _raw_chunks(columns: List[str], chunk_rows: int, date_filters: dict) -> Iterator[pd.DataFrame]:
+    root = settings.partitions_dir
+    if settings.PARTITIONED_STORAGE and is_current(root, settings.csv_path):
+        partitions = load_manifest(root)["partitions"]
+        kept = prune_partitions(partitions, **date_filters)
+        yield from _partition_chunks(root, partitions if kept is None else kept, columns, chunk_rows)
+    else:
+        yield from pd.read_csv(settings.csv_path, usecols=columns, chunksize=chunk_rows)
+
+
+def _partition_chunks(root, partitions: List[dict], columns: List[str],
+                      chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Merge the partitions' batches back into dataset row order.
+
+    Every partition holds its rows in ascending ROW_COLUMN order, so once each
+    open partition has a batch buffered, all buffered rows up to the smallest
+    last position are final: later batches only hold higher positions.
+    """
+    pq = _require_pyarrow()
+    batch_rows = max(_SAMPLE_ROWS, chunk_rows // (2 * max(len(partitions), 1)))
+    readers = [
+        pq.ParquetFile(root / p["path"], memory_map=True).iter_batches(
+            batch_size=batch_rows, columns=columns + [ROW_COLUMN])
+        for p in partitions
+    ]
+    buffered = [_next_batch(reader) for reader in readers]
+    ready, ready_rows = [], 0
+    while any(b is not None for b in buffered):
+        frontier = min(b[ROW_COLUMN].iloc[-1] for b in buffered if b is not None)
+        for i, batch in enumerate(buffered):
+            if batch is None:
+                continue
+            final = batch[ROW_COLUMN].to_numpy() <= frontier
+            ready.append(batch[final])
+            ready_rows += int(final.sum())
+            buffered[i] = batch[~final] if not final.all() else _next_batch(readers[i])
+        if ready_rows >= chunk_rows // 2 or all(b is None for b in buffered):
+            merged = pd.concat(ready, ignore_index=True).sort_values(ROW_COLUMN, kind="stable")
+            yield merged.drop(columns=ROW_COLUMN).reset_index(drop=True)
+            ready, ready_rows = [], 0
+
+
+def _next_batch(reader) -> Optional[pd.DataFrame]:
+    """The reader's next non-empty batch as a frame, or None once it is exhausted."""
+    for batch in reader:
+        if batch.num_rows:
+            return batch.to_pandas()
+    return None
+
+
+class _Accumulator:
+    """
+    Running per-key totals of `amount`, merged chunk by chunk.
+
+    Sums follow pandas' groupby sum step for step: compensated (Kahan)
+    summation per key over the rows in dataset order, with the running sum and
+    compensation carried from chunk to chunk. Every total is therefore
+    bit-identical to the in-memory groupby over the same rows. Rows with a
+    missing key are dropped, as groupby does. Memory is proportional to the
+    number of keys.
+    """
+
+    def __init__(self, keys: List[str], extra: dict = None):
+        self.keys = keys
+        self.extra = extra or {}     # other columns to carry: {column: "first"}
+        self.positions = {}          # key tuple -> slot in the lists below
+        self.sums, self.comps, self.counts = [], [], []
+        self.firsts = {col: [] for col in self.extra}
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk[chunk[self.keys].notna().all(axis=1)]
+        if chunk.empty:
+            return
+        local, uniques = pd.MultiIndex.from_frame(chunk[self.keys]).factorize()
+        slots = np.array([self._slot(key) for key in uniques], dtype=np.int64)[local]
+
+        amounts = chunk["amount"].to_numpy(dtype=np.float64)
+        present = ~np.isnan(amounts)
+        counts = np.bincount(slots[present], minlength=len(self.counts))
+        self.counts = (np.asarray(self.counts) + counts).tolist()
+
+        sums, comps = self.sums, self.comps
+        for slot, value in zip(slots[present].tolist(), amounts[present].tolist()):
+            y = value - comps[slot]
+            t = sums[slot] + y
+            comp = t - sums[slot] - y
+            comps[slot] = comp if comp == comp else 0.0     # inf - inf: reset, like pandas
+            sums[slot] = t
+
+        for col in self.extra:
+            known = chunk[col].notna().to_numpy()
+            seen, first = np.unique(slots[known], return_index=True)
+            values = chunk[col].to_numpy()[known][first]
+            firsts = self.firsts[col]
+            for slot, value in zip(seen.tolist(), values):
+                if firsts[slot] is None:
+                    firsts[slot] = value
+
+    def _slot(self, key) -> int:
+        slot = self.positions.get(key)
+        if slot is None:
+            slot = self.positions[key] = len(self.sums)
+            self.sums.append(0.0)
+            self.comps.append(0.0)
+            self.counts.append(0)
+            for firsts in self.firsts.values():
+                firsts.append(None)
+        return slot
+
+    def result(self) -> pd.DataFrame:
+        """Key columns plus `sum` (the amount total), `count` and any extra columns, sorted by key."""
+        keys = pd.DataFrame(list(self.positions), columns=self.keys)
+        totals = keys.assign(
+            sum=np.asarray(self.sums, dtype=np.float64),
+            count=np.asarray(self.counts, dtype=np.int64),
+            **{col: pd.Series(values, dtype=object) for col, values in self.firsts.items()},
+        )
+        return totals.sort_values(self.keys, kind="stable").reset_index(drop=True)
+
+
+# ─── Time series ───────────────────────────────────────────────────────────
+def _period_totals(granularity: str, date_filters: dict, entity_id_col: str, entity_id,
+                   memory_budget_mb: Optional[int]) -> pd.DataFrame:
+    group_cols, _ = _get_grouping_and_label_fn(granularity)
+    totals = _Accumulator(group_cols)
+    for chunk in iter_chunks([], entity_id_col, entity_id, memory_budget_mb, **date_filters):
+        totals.add(chunk)
+    return totals.result()
+
+
+def get_transaction_volume_over_time(granularity: str, filters: dict = None, entity_id_col: str = None,
+                                     entity_id=None, memory_budget_mb: Optional[int] = None,
+                                     date_filters: dict = None) -> GraphData:
+    """
+    Out-of-core counterpart of analytics._get_transaction_volume_over_time.
+    Rows are filtered by date_filters, filters only label the metric (both
+    default to the other).
+    """
+    date_filters = date_filters if date_filters is not None else filters or {}
+    totals = _period_totals(granularity, date_filters, entity_id_col, entity_id, memory_budget_mb)
+    grouped = totals.drop(columns="count").rename(columns={"sum": "amount"})
+    return _time_series_graph(grouped, granularity, "Transaction Volume", filters)
+
+
+def get_transaction_count_over_time(granularity: str, filters: dict = None, entity_id_col: str = None,
+                                    entity_id=None, memory_budget_mb: Optional[int] = None,
+                                    date_filters: dict = None) -> GraphData:
+    """Out-of-core counterpart of analytics._get_transaction_count_over_time; see volume for the filters."""
+    date_filters = date_filters if date_filters is not None else filters or {}
+    totals = _period_totals(granularity, date_filters, entity_id_col, entity_id, memory_budget_mb)
+    grouped = totals.drop(columns="sum").rename(columns={"count": "amount"})
+    return _time_series_graph(grouped, granularity, "Transaction Count", filters, decimals=None)
+
+
+def get_average_transaction_over_time(granularity: str, filters: dict = None, entity_id_col: str = None,
+                                      entity_id=None, memory_budget_mb: Optional[int] = None,
+                                      date_filters: dict = None) -> GraphData:
+    """Out-of-core counterpart of analytics._get_average_transaction_over_time; see volume for the filters."""
+    date_filters = date_filters if date_filters is not None else filters or {}
+    totals = _period_totals(granularity, date_filters, entity_id_col, entity_id, memory_budget_mb)
+    totals["amount"] = totals["sum"] / totals["count"]
+    grouped = totals.drop(columns=["sum", "count"])
+    return _time_series_graph(grouped, granularity, "Average Transaction Value", filters)
+
+
+# ─── Entity aggregates ─────────────────────────────────────────────────────
+def get_segmentation(filters: dict, id_col: str = "customer_id",
+                     metric_prefix: str = "Customer Segmentation", entity_id_col: str = None,
+                     entity_id=None, memory_budget_mb: Optional[int] = None) -> TableData:
+    """Out-of-core counterpart of analytics._get_segmentation."""
+    totals = _Accumulator([id_col])
+    for chunk in iter_chunks([id_col], entity_id_col, entity_id, memory_budget_mb, **filters):
+        totals.add(chunk)
+    entity_total = totals.result()[[id_col, "sum"]].rename(columns={"sum": "amount"})
+    return _segmentation_table(entity_total, filters, id_col, metric_prefix)
+
+
+def _pair_totals(entity_id_col: str, target_id_col: str, filters: dict, entity_id,
+                 memory_budget_mb: Optional[int], with_names: bool = False):
+    """Merged (entity, target) sum and count, plus first-seen target names if asked."""
+    name_col = target_id_col.replace('_id', '_name')
+    header = pd.read_csv(settings.csv_path, nrows=0).columns
+    with_names = with_names and name_col in header
+    columns = [entity_id_col, target_id_col] + ([name_col] if with_names else [])
+
+    pairs = _Accumulator([entity_id_col, target_id_col])
+    names = _Accumulator([target_id_col], {name_col: "first"}) if with_names else None
+    for chunk in iter_chunks(columns, entity_id_col, entity_id, memory_budget_mb, **filters):
+        pairs.add(chunk)
+        if names is not None:
+            names.add(chunk)
+
+    if names is not None:
+        names = names.result()[[target_id_col, name_col]]
+    return pairs.result(), names
+
+
+def get_top_entities(mode: str, limit: int, filters: dict, entity_id_col: str, target_id_col: str,
+                     metric_prefix: str = "Top", entity_id=None,
+                     memory_budget_mb: Optional[int] = None) -> TableData:
+    """Out-of-core counterpart of analytics._get_top_entities."""
+    pairs, names = _pair_totals(entity_id_col, target_id_col, filters, entity_id,
+                                memory_budget_mb, with_names=True)
+    pairs.columns = [entity_id_col, target_id_col, 'total_amount', 'transaction_count']
+    return _top_entities_table(pairs, names, mode, limit, filters,
+                               entity_id_col, target_id_col, metric_prefix)
+
+
+def get_transaction_outliers(filters: dict, entity_id_col: str, target_id_col: str = "customer_id",
+                             entity_id=None, memory_budget_mb: Optional[int] = None) -> TableData:
+    """Out-of-core counterpart of analytics._get_transaction_outliers."""
+    pairs, _ = _pair_totals(entity_id_col, target_id_col, filters, entity_id, memory_budget_mb)
+    grouped = pairs.drop(columns="count").rename(columns={"sum": "amount"})
+    return _outliers_table(grouped, filters, target_id_col)
@@ -1,10 +1,21 @@
 from fastapi import HTTPException
+import numpy as np
 import pandas as pd
-from app.utils.analytics import _apply_date_filters
+from app.core.config import settings
+from app.core.data import StreamedSlice, dataset_for, is_streamed
+from app.core.ordering import parse_rank_cursor
+from app.core.timing import span, timed
+from app.core.pairs import is_pair_table
+from app.core.rollup import build_rollups, is_day_rollup
+from app.utils.analytics import _apply_date_filters, _get_window_stats, _get_transaction_metrics_per_entity
 
+# Columns the date filters read; always kept when filter_entity_data narrows columns
+DATE_FILTER_COLUMNS = ["date", "year", "month", "week", "day"]
+
+@timed("filter_entity_data", rows=lambda result: len(result[0]))
 def filter_entity_data(df, entity_id_col, entity_id, 
                       year=None, month=None, week=None, day=None, 
-                      range_days=None, start_date=None, end_date=None):
+                      range_days=None, start_date=None, end_date=None, columns=None):
     """
     Common function to filter dataframe by entity ID and date parameters.
     
@@ -13,6 +24,7 @@ def filter_entity_data(df, entity_id_col, entity_id,
         entity_id_col: Column name for the entity ID
         entity_id: The entity ID value to filter by
         year, month, week, day, range_days, start_date, end_date: Date filter parameters
+        columns: Only materialise these columns (plus the date columns)
         
     Returns:
         Filtered DataFrame and filters dictionary
@@ -20,13 +32,31 @@ def filter_entity_data(df, entity_id_col, entity_id,
     Raises:
         HTTPException: If no data is found or after filtering
     """
-    # Ensure date column is datetime
-    df["date"] = pd.to_datetime(df["date"])
-    
-    # Filter by entity ID
-    df = df[df[entity_id_col] == entity_id]
+    if is_streamed(df):
+        # Served out of core: the analytics stream the slice and raise these 404s themselves
+        filters = _filters_dict(year, month, week, day, range_days, start_date, end_date)
+        return StreamedSlice(entity_id_col, entity_id, filters), filters
+
+    # Filter by entity ID, using the dataset's row index when we have one
+    version = dataset_for(df)
+    rows = version.entity_rows(entity_id_col, entity_id) if version is not None else None
+    if rows is None:
+        df = df[df[entity_id_col] == entity_id]
+        entity_found = not df.empty
+    else:
+        entity_found = len(rows) > 0
+        # Prune whole month partitions before materialising any rows
+        rows = version.prune_rows(
+            rows, year=year, month=month, week=week, day=day,
+            range_days=range_days, start_date=start_date, end_date=end_date
+        )
+        if columns is None:
+            df = df.take(rows)
+        else:
+            keep = list(dict.fromkeys(list(columns) + [c for c in DATE_FILTER_COLUMNS if c in df.columns]))
+            df = pd.DataFrame({c: df[c].take(rows) for c in keep})
     
-    if df.empty:
+    if not entity_found:
         raise HTTPException(status_code=404, detail=f"No data found for this {entity_id_col.replace('_id', '')}")
     
     # Apply date filters
@@ -44,8 +74,11 @@ def filter_entity_data(df, entity_id_col, entity_id,
     if df.empty:
         raise HTTPException(status_code=404, detail="No data after filtering")
     
-    # Create filters dictionary for metric labels
-    filters = {
+    return df, _filters_dict(year, month, week, day, range_days, start_date, end_date)
+
+def _filters_dict(year, month, week, day, range_days, start_date, end_date):
+    """The filters dictionary used for metric labels."""
+    return {
         "year": year,
         "month": month,
         "week": week,
@@ -54,5 +87,359 @@ def filter_entity_data(df, entity_id_col, entity_id,
         "start_date": start_date,
         "end_date": end_date
     }
-    
-    return df, filters
\ No newline at end of file
+
+@timed("filter_entities_data", rows=len)
+def filter_entities_data(df, entity_ids_col, entity_ids, columns,
+                         year=None, month=None, week=None, day=None,
+                         range_days=None, start_date=None, end_date=None):
+    """
+    The rows of several entities under one set of date filters, read in a
+    single pass and narrowed to columns (plus the entity and date columns).
+    Entities without data are simply absent; no 404s.
+    """
+    keep = list(dict.fromkeys([entity_ids_col] + list(columns) + [c for c in DATE_FILTER_COLUMNS if c in df.columns]))
+    version = dataset_for(df)
+    if version is not None and entity_ids_col in version.entity_index:
+        rows = np.concatenate([version.entity_rows(entity_ids_col, e) for e in entity_ids] + [np.empty(0, np.int32)])
+        rows = version.prune_rows(
+            np.sort(rows), year=year, month=month, week=week, day=day,
+            range_days=range_days, start_date=start_date, end_date=end_date
+        )
+        df = pd.DataFrame({c: df[c].take(rows) for c in keep})
+    else:
+        df = df.loc[df[entity_ids_col].isin(entity_ids), keep]
+
+    return _apply_date_filters(
+        df, year=year, month=month, week=week, day=day,
+        range_days=range_days, start_date=start_date, end_date=end_date
+    )
+
+@timed("entity_totals")
+def entity_totals(df, entity_id_col, entity_id,
+                  year=None, month=None, week=None, day=None,
+                  range_days=None, start_date=None, end_date=None):
+    """
+    Amount totals (count, sum, mean, min, max, std) of one entity under the
+    date filters, from the day rollup's running totals; None when the dataset
+    has no rollup for this level or it cannot apply the filters. Raises no
+    404s: callers still go through filter_entity_data for anything else.
+    """
+    version = dataset_for(df)
+    rollup = version.day_rollup(entity_id_col) if version is not None else None
+    if rollup is None:
+        return None
+    return rollup.totals(
+        entity_id, year=year, month=month, week=week, day=day,
+        range_days=range_days, start_date=start_date, end_date=end_date
+    )
+
+def customer_rank(df):
+    """
+    The dataset's cached (customer, date) row ranking for the days-between
+    analytics, or None when df is not a loaded dataset version.
+    """
+    version = dataset_for(df)
+    return version.customer_rank if version is not None else None
+
+def page_cursor(df, after):
+    """
+    The dataset generation and the rank key a days-between page resumes
+    after, from the previous page's next_after (None for the first page).
+
+    Raises:
+        HTTPException: 400 for a malformed cursor, 409 for one issued
+            before the dataset was reloaded
+    """
+    version = dataset_for(df)
+    generation = version.generation if version is not None else 0
+    if after is None:
+        return generation, None
+    try:
+        cursor_generation, key = parse_rank_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor '{after}'; pass next_after of the previous page")
+    if cursor_generation != generation:
+        raise HTTPException(
+            status_code=409,
+            detail="The dataset was reloaded since this cursor was issued; start again from the first page"
+        )
+    return generation, key
+
+def _pair_table(df, entity_id_col):
+    version = dataset_for(df)
+    return version.pair_table(entity_id_col) if version is not None else None
+
+@timed("entity_pairs", rows=lambda result: len(result[0]))
+def entity_pairs(df, entity_id_col, entity_id,
+                 year=None, month=None, week=None, day=None,
+                 range_days=None, start_date=None, end_date=None, columns=None, rows=None):
+    """
+    Like filter_entity_data, but answered from the dataset's (entity,
+    customer) pair table when it has one for this entity level and no date
+    filter is set; top customers, outliers and the days-between summary
+    accept either kind of frame.
+
+    Args:
+        columns: Passed to filter_entity_data when the pair table cannot be used
+        rows: The entity's rows, already filtered by the caller; returned
+            instead of filtering again when the pair table cannot be used
+
+    Returns:
+        Pair records (or filtered rows) and filters dictionary
+
+    Raises:
+        HTTPException: If no data is found or after filtering
+    """
+    filters = _filters_dict(year, month, week, day, range_days, start_date, end_date)
+    table = _pair_table(df, entity_id_col)
+    if table is not None and entity_id in table and all(v is None for v in filters.values()):
+        return table.pairs(entity_id), filters
+    if rows is not None:
+        return rows, filters
+    return filter_entity_data(
+        df, entity_id_col, entity_id,
+        year, month, week, day, range_days, start_date, end_date, columns=columns
+    )
+
+def gap_histogram(df, entity_id_col, entity_id):
+    """The entity's all-time days-between histogram from its pair table, or None."""
+    table = _pair_table(df, entity_id_col)
+    return table.histogram(entity_id) if table is not None else None
+
+@timed("entity_days", rows=lambda result: len(result[0]))
+def entity_days(df, entity_id_col, entity_id,
+                year=None, month=None, week=None, day=None,
+                range_days=None, start_date=None, end_date=None, rows=None):
+    """
+    Like filter_entity_data, but answered from the dataset's day rollup when
+    it has one for this entity level that can apply the date filters; the
+    time-series analytics accept either kind of frame.
+
+    Args:
+        rows: The entity's rows, already filtered by the caller; returned
+            instead of filtering again when the rollup cannot be used
+
+    Returns:
+        Day rollup records (or filtered rows) and filters dictionary
+
+    Raises:
+        HTTPException: If no data is found or after filtering
+    """
+    version = dataset_for(df)
+    rollup = version.day_rollup(entity_id_col) if version is not None else None
+    days = rollup.days(
+        entity_id, year=year, month=month, week=week, day=day,
+        range_days=range_days, start_date=start_date, end_date=end_date
+    ) if rollup is not None else None
+
+    if days is None:
+        if rows is not None:
+            return rows, _filters_dict(year, month, week, day, range_days, start_date, end_date)
+        return filter_entity_data(
+            df, entity_id_col, entity_id,
+            year, month, week, day, range_days, start_date, end_date
+        )
+
+    if entity_id not in rollup:
+        raise HTTPException(status_code=404, detail=f"No data found for this {entity_id_col.replace('_id', '')}")
+    if days.empty:
+        raise HTTPException(status_code=404, detail="No data after filtering")
+
+    return days, _filters_dict(year, month, week, day, range_days, start_date, end_date)
+
+# Furthest back window stats may reach: (windows - 1) * step_days + 2 * window_days
+WINDOW_STATS_MAX_DAYS = 36_600
+
+def entity_window_stats(df, entity_id_col, entity_id, window_days, step_days=None,
+                        windows=12, end_date=None):
+    """
+    Sliding or consecutive window totals for one entity with period-over-period
+    changes (see _get_window_stats). Uses the dataset's day rollup, or one built
+    from the entity's rows when the dataset has none for this level.
+
+    Raises:
+        HTTPException: If the entity has no dated data, end_date is not a
+            date, or the windows reach past WINDOW_STATS_MAX_DAYS
+    """
+    step_days = step_days or window_days
+    reach = (windows - 1) * step_days + 2 * window_days
+    if reach > WINDOW_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"windows, step_days and window_days reach back {reach} days; at most {WINDOW_STATS_MAX_DAYS}"
+        )
+    if end_date:
+        try:
+            pd.Timestamp(end_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid end_date: {e}")
+
+    version = dataset_for(df)
+    rollup = version.day_rollup(entity_id_col) if version is not None else None
+    if rollup is None:
+        rows, _ = filter_entity_data(df, entity_id_col, entity_id)
+        rollup = build_rollups(rows, [entity_id_col])[entity_id_col]
+    elif entity_id not in rollup:
+        raise HTTPException(status_code=404, detail=f"No data found for this {entity_id_col.replace('_id', '')}")
+    if not end_date and pd.isna(rollup.span(entity_id)[1]):
+        raise HTTPException(status_code=404, detail="No data after filtering")
+
+    try:
+        return _get_window_stats(rollup, entity_id, window_days, step_days, windows, end_date)
+    except (ValueError, OverflowError):
+        raise HTTPException(
+            status_code=400,
+            detail="end_date, window_days, step_days and windows reach outside the supported date range"
+        )
+
+
+# Batch metric name -> _get_transaction_metrics_per_entity metric_type
+BATCH_TIME_SERIES = {"transaction_volume": "volume", "transaction_count": "count", "average_transactions": "average"}
+
+def entity_batch(df, entity_id_col, entity_ids, metrics, granularity, stats_fn, stats_distinct,
+                 year=None, month=None, week=None, day=None,
+                 range_days=None, start_date=None, end_date=None):
+    """
+    Stats and time series for many entities of one level under shared date
+    filters, each entry shaped like the single-entity endpoint's response.
+
+    Everything is computed in grouped passes over the combined slice: day
+    rollup records when the dataset has them (amount totals and series), and
+    the entities' rows narrowed to the stats' distinct-count columns.
+
+    Args:
+        metrics: "stats" and/or keys of BATCH_TIME_SERIES
+        stats_fn: The level's stats builder, called as stats_fn(None, filters, totals)
+        stats_distinct: Its {totals key: column} distinct counts
+
+    Returns:
+        {"count", "filters", "results": {id: {metric: ...}}, "missing": [ids without data]}
+
+    Raises:
+        HTTPException: On too many ids or an unknown metric
+    """
+    ids = list(dict.fromkeys(entity_ids))
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_IDS} ids per batch")
+    unknown = [m for m in metrics if m != "stats" and m not in BATCH_TIME_SERIES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown metrics {unknown}; use stats, {', '.join(BATCH_TIME_SERIES)}"
+        )
+
+    date_filters = dict(year=year, month=month, week=week, day=day,
+                        range_days=range_days, start_date=start_date, end_date=end_date)
+    filters = _filters_dict(year, month, week, day, range_days, start_date, end_date)
+    version = dataset_for(df)
+    rollup = version.day_rollup(entity_id_col) if version is not None else None
+    records = rollup.days_for(ids, entity_id_col, **date_filters) if rollup is not None else None
+
+    columns = list(stats_distinct.values()) if "stats" in metrics else []
+    if records is None:
+        columns.append("amount")
+    rows = filter_entities_data(df, entity_id_col, ids, columns, **date_filters) if columns else None
+    source = records if records is not None else rows
+
+    results = {str(e): {} for e in source[entity_id_col].unique()}
+    if "stats" in metrics:
+        if records is not None:
+            totals = records.groupby(entity_id_col).agg(
+                count=("count", "sum"), sum=("sum", "sum"), min=("min", "min"), max=("max", "max")
+            )
+            totals["mean"] = totals["sum"] / totals["count"]
+        else:
+            totals = rows.groupby(entity_id_col)["amount"].agg(["count", "sum", "mean", "min", "max"])
+        distinct = rows.groupby(entity_id_col).agg(**{k: (c, "nunique") for k, c in stats_distinct.items()})
+        for entity_id, values in totals.join(distinct).to_dict(orient="index").items():
+            results[str(entity_id)]["stats"] = stats_fn(None, filters, values)
+
+    for metric in metrics:
+        if metric in BATCH_TIME_SERIES:
+            series = _get_transaction_metrics_per_entity(
+                source, granularity, filters, entity_id_col, BATCH_TIME_SERIES[metric]
+            )
+            for entity_id, graph in series.items():
+                results[entity_id][metric] = graph
+
+    return {
+        "count": len(results),
+        "filters": filters,
+        "results": {str(e): results[str(e)] for e in ids if str(e) in results},
+        "missing": [e for e in ids if str(e) not in results],
+    }
+
+class EntitySlice:
+    """
+    One entity's data under the date filters, each form filtered on first use
+    so an overview only pays for what its requested sections read.
+
+    rows: filter_entity_data's rows; days: entity_days' records (the day
+    rollup, or the same rows when the rollup cannot apply the filters);
+    pairs: entity_pairs' records (the pair table, or the same rows). All
+    raise the usual 404s when first read.
+    """
+
+    def __init__(self, df, entity_id_col, entity_id,
+                 year=None, month=None, week=None, day=None,
+                 range_days=None, start_date=None, end_date=None):
+        self._args = (df, entity_id_col, entity_id, year, month, week, day, range_days, start_date, end_date)
+        self.filters = _filters_dict(year, month, week, day, range_days, start_date, end_date)
+        self._rows = None
+        self._days = None
+        self._pairs = None
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows, _ = filter_entity_data(*self._args)
+        return self._rows
+
+    @property
+    def customer_rank(self):
+        return customer_rank(self._args[0])
+
+    @property
+    def gap_histogram(self):
+        return gap_histogram(*self._args[:3])
+
+    @property
+    def days(self):
+        if self._days is None:
+            self._days, _ = entity_days(*self._args, rows=self._rows)
+            if not is_day_rollup(self._days):
+                self._rows = self._days
+        return self._days
+
+    @property
+    def pairs(self):
+        if self._pairs is None:
+            self._pairs, _ = entity_pairs(*self._args, rows=self._rows)
+            if not is_pair_table(self._pairs):
+                self._rows = self._pairs
+        return self._pairs
+
+def overview_sections(fields, sections):
+    """
+    Compute the overview sections named in `fields` (comma-separated; all
+    when empty), in the sections' order. Each is a zero-argument callable,
+    so unrequested sections are never computed, and each is timed as its
+    own overview.<name> span.
+
+    Raises:
+        HTTPException: On an unknown section name
+    """
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(sections)
+    unknown = [f for f in wanted if f not in sections]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {unknown}; use {', '.join(sections)}"
+        )
+
+    result = {}
+    for name, compute in sections.items():
+        if name in wanted:
+            with span(f"overview.{name}"):
+                result[name] = compute()
+    return result
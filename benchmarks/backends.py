@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Parity checks and timings for the query backends (QUERY_BACKEND).
+
+For each dataset size it loads a synthetic dataset once, runs the analytics,
+structured filters (including nested and/or/not, between, in/not_in and a
+missing-value column) and date filters on every backend, checks that each
+backend returns what the pandas backend returns, and reports the time per
+backend. Record lists are compared as multisets and floats to within a cent:
+the engines add in different orders, so a value that lands on a half cent
+may round either way once the graphs round to two decimals.
+
+    python -m benchmarks.backends --rows 100000 1000000 --backends pandas duckdb
+    python -m benchmarks.backends --rows 1000000 10000000 50000000 --backends pandas polars --repeat 1
+
+The 10M and 50M runs need a machine with tens of GiB of RAM: the synthetic
+frame is built, written and loaded in memory.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.backends import get_backend
+from app.core.config import settings
+from app.core import data
+from app.utils import analytics
+from app.utils.helpers import apply_filter, add_computed_attributes
+from app.utils.router_helpers import filter_entity_data
+from benchmarks.out_of_core import FILTERS
+from benchmarks.synthetic import synthetic_frame
+
+FILTER_CASES = {
+    "equals": {"column": "channel", "operator": "equals", "value": "POS"},
+    "not_equals_nulls": {"column": "note", "operator": "not_equals", "value": "refund"},
+    "between": {"column": "amount", "operator": "between", "value": [50, 150]},
+    "not_in": {"column": "merchant_id", "operator": "not_in", "value": ["M1", "M2", "M3"]},
+    "nested": {
+        "and": [
+            {"column": "amount", "operator": "greater_than_equals", "value": 100},
+            {"or": [
+                {"column": "channel", "operator": "in", "value": ["Online", "Mobile"]},
+                {"not": {"column": "agent_id", "operator": "equals", "value": "A1"}},
+            ]},
+        ]
+    },
+}
+
+DATE_CASES = {
+    "year_month": dict(FILTERS, year=2023, month=6),
+    "week": dict(FILTERS, week=10),
+    "window": dict(FILTERS, start_date="2022-03-01", end_date="2022-09-30"),
+}
+
+
+def analytics_suite(entity_col="agent_id", entity_id="A1"):
+    df, filters = filter_entity_data(data.get_df(), entity_col, entity_id, **FILTERS)
+    return {
+        "volume": analytics._get_transaction_volume_over_time(df, "monthly", filters),
+        "count": analytics._get_transaction_count_over_time(df, "daily", filters),
+        "average": analytics._get_average_transaction_over_time(df, "weekly", filters),
+        "segmentation": analytics._get_segmentation(df, filters, "customer_id", "Customer Segmentation"),
+        "top": analytics._get_top_entities(df, "count", 10, filters, entity_col, "merchant_id"),
+        "outliers": analytics._get_transaction_outliers(df, filters, entity_col),
+        "per_merchant": analytics._get_transaction_metrics_per_entity(df, "monthly", filters, "merchant_id"),
+        "frequency": analytics._get_transaction_frequency_analysis(
+            df, filters, "Agent Transaction Frequency Analysis", {"Unique Merchants": "merchant_id"}),
+    }
+
+
+def filter_suite():
+    df = data.get_df()
+    results = {name: int(apply_filter(df, f).sum()) for name, f in FILTER_CASES.items()}
+    results.update({name: len(analytics._apply_date_filters(df, **f)) for name, f in DATE_CASES.items()})
+    computed = add_computed_attributes(df[df["agent_id"] == "A1"], "merchant_id")
+    results["computed"] = computed.drop_duplicates("merchant_id").sort_values("merchant_id").to_dict(orient="records")
+    return results
+
+
+def normalized(value):
+    """Model dump with floats rounded below cent precision and record lists as multisets."""
+    if isinstance(value, dict):
+        return {k: normalized(v) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [normalized(v) for v in value]
+        if items and all(isinstance(v, dict) for v in items):
+            return sorted(items, key=repr)
+        return items
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+def dumped(results: dict) -> dict:
+    out = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            value = {k: v.model_dump() for k, v in value.items()}
+        elif hasattr(value, "model_dump"):
+            value = value.model_dump()
+        out[name] = normalized(value)
+    return out
+
+
+def matches(expected, actual) -> bool:
+    """Structural equality with floats within a cent and NaN equal to NaN."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(matches(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, list) and isinstance(actual, list):
+        return len(expected) == len(actual) and all(matches(e, a) for e, a in zip(expected, actual))
+    if isinstance(expected, float) and isinstance(actual, float):
+        return (np.isnan(expected) and np.isnan(actual)) or abs(expected - actual) <= 0.01 + 1e-9
+    return expected == actual
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["pandas", "duckdb", "polars"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'backend':>8} {'analytics s':>12} {'filters s':>10}  parity")
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATA_DIR = Path(tmp)
+        for rows in args.rows:
+            frame = synthetic_frame(rows)
+            frame["note"] = np.where(np.arange(rows) % 7 == 0, "refund", None)
+            frame.to_csv(settings.csv_path, index=False)
+            data.load_data()
+
+            expected = None
+            for name in args.backends:
+                settings.QUERY_BACKEND = name
+                get_backend()  # connect outside the timings
+                runs = [(timed(analytics_suite), timed(filter_suite)) for _ in range(args.repeat)]
+                (a_res, _), (f_res, _) = runs[0]
+                a_s = min(a for (_, a), _ in runs)
+                f_s = min(f for _, (_, f) in runs)
+
+                actual = dumped({**a_res, **f_res})
+                if expected is None:
+                    expected, parity = actual, "reference"
+                else:
+                    mismatched = [k for k in expected if not matches(expected[k], actual[k])]
+                    parity = "matches" if not mismatched else f"MISMATCH: {', '.join(mismatched)}"
+                print(f"{rows:>10} {name:>8} {a_s:>12.3f} {f_s:>10.3f}  {parity}")
+    settings.QUERY_BACKEND = "pandas"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite.
+
+For each dataset size it writes a synthetic dataset (benchmarks.synthetic),
+loads it, and drives every route of the agents, merchants, terminals,
+branch-admins, customers and upload routers in-process through the ASGI
+TestClient. Entity routes run for a huge, a medium and a small entity
+(the busiest one, the median one and the one at the 90th percentile of the
+ranking by rows), and routes taking date filters run both wide (whole
+history) and narrow (the entity's last 30 days of activity).
+
+Per case it reports p50/p95/p99 latency over --repeat runs (after one
+warm-up run), the peak RSS of the process while the case ran, the peak
+traced allocation of one run under tracemalloc and the pymalloc blocks that
+run left allocated (non-zero means something retains per-request objects).
+NL routes use the stub LLM and queries the rule parser answers locally, so
+they measure everything but the model; benchmarks/nl_*.py cover the model.
+
+Results can be saved as JSON and compared against a saved baseline: a case
+regresses when its p50 or p95 latency or its peak allocation grows by more
+than --threshold (and latency by more than --min-delta-ms), or its status
+changes. The exit status is 1 when anything regressed.
+
+    python -m benchmarks.endpoints --rows 100000 1000000 --save baseline.json
+    python -m benchmarks.endpoints --rows 100000 1000000 --baseline baseline.json --threshold 0.15
+    python -m benchmarks.endpoints --rows 100000 --routes "overview|stats" --repeat 20
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Before the app is imported: no model calls, no slow-request log entries
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ["SLOW_REQUEST_MS"] = "0"
+
+from fastapi.routing import APIRoute  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core import data  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.synthetic import Options, write  # noqa: E402
+
+ROUTER_PREFIXES = ("/agents", "/merchants", "/terminals", "/branch-admins", "/customers", "/upload")
+DATE_PARAMS = {"start_date", "end_date"}
+NARROW_DAYS = 30
+
+# Values for required query parameters (the most expensive choice where it matters)
+REQUIRED_PARAMS = {"granularity": "daily", "mode": "amount"}
+
+# Entity filter routes match computed attributes, the global /filter routes raw rows
+ATTRIBUTE_FILTER = {"and": [
+    {"column": "total_transactions", "operator": "greater_than", "value": 5},
+    {"column": "avg_transaction_amount", "operator": "between", "value": [20, 400]},
+]}
+ROW_FILTER = {"and": [
+    {"column": "amount", "operator": "greater_than", "value": 100},
+    {"column": "channel", "operator": "equals", "value": "POS"},
+]}
+# Answered by the rule parser, so no LLM call is timed
+NL_QUERIES = {
+    "/agents/{agent_id}/nl-filter": "customers with more than 5 transactions",
+    "/agents/{agent_id}/nl-filter-customers": "customers with more than 5 transactions",
+    "/agents/{agent_id}/nl-filter-merchants": "merchants with more than 20 transactions",
+    "/merchants/nl-filter": "merchants with amount greater than 100",
+}
+
+
+@dataclass
+class Case:
+    method: str
+    route: str
+    url: str
+    entity: str = "-"
+    window: str = "-"
+    params: Optional[Dict] = None
+    body: Optional[Dict] = None
+    upload: Optional[Path] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.method} {self.route} [{self.entity}, {self.window}]"
+
+    def send(self, client: TestClient):
+        if self.upload is not None:
+            with open(self.upload, "rb") as f:
+                return client.post(self.url, files={"file": ("transactions.csv", f, "text/csv")})
+        return client.request(self.method, self.url, params=self.params, json=self.body)
+
+
+# ─── Case generation ───────────────────────────────────────────────────────
+def pick_entities(df, column: str) -> Dict[str, str]:
+    """huge / medium / small entity IDs by row count (duplicates dropped for tiny columns)."""
+    ranked = df[column].value_counts().index
+    picks = {"huge": ranked[0], "medium": ranked[len(ranked) // 2], "small": ranked[int(len(ranked) * 0.9)]}
+    seen, unique = set(), {}
+    for label, entity_id in picks.items():
+        if entity_id not in seen:
+            seen.add(entity_id)
+            unique[label] = entity_id
+    return unique
+
+
+def narrow_window(dates) -> Dict[str, str]:
+    last = dates.max()
+    return {"start_date": (last - timedelta(days=NARROW_DAYS - 1)).strftime("%Y-%m-%d"),
+            "end_date": last.strftime("%Y-%m-%d")}
+
+
+def body_for(route: APIRoute):
+    if route.path.endswith("/nl-filter-batch"):
+        return {"queries": list(dict.fromkeys(NL_QUERIES.values()))}
+    if route.path in NL_QUERIES:
+        return {"query": NL_QUERIES[route.path]}
+    return ATTRIBUTE_FILTER if route.dependant.path_params else ROW_FILTER
+
+
+def build_cases(df, csv_path: Path, route_filter: Optional[str]) -> List[Case]:
+    pattern = re.compile(route_filter) if route_filter else None
+    entities: Dict[str, Dict[str, str]] = {}
+    cases = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.path.startswith(ROUTER_PREFIXES):
+            continue
+        if pattern is not None and not pattern.search(route.path):
+            continue
+        method = sorted(route.methods)[0]
+        if route.path.startswith("/upload"):
+            cases.append(Case(method, route.path, route.path, upload=csv_path))
+            continue
+        body = body_for(route) if method == "POST" else None
+        query_params = {p.name for p in route.dependant.query_params}
+        required = {p.name: REQUIRED_PARAMS[p.name] for p in route.dependant.query_params
+                    if p.required and p.name in REQUIRED_PARAMS}
+        dated = DATE_PARAMS <= query_params
+        path_params = [p.name for p in route.dependant.path_params]
+
+        targets = [("-", {}, df["date"])]
+        if path_params:
+            column = path_params[0]
+            if column not in entities:
+                entities[column] = pick_entities(df, column)
+            targets = [
+                (label, {column: entity_id}, df["date"][df[column] == entity_id])
+                for label, entity_id in entities[column].items()
+            ]
+        for label, values, dates in targets:
+            url = route.path.format(**values)
+            cases.append(Case(method, route.path, url, label, "wide" if dated else "-", required, body))
+            if dated:
+                cases.append(Case(method, route.path, url, label, "narrow",
+                                  {**required, **narrow_window(dates)}, body))
+    return cases
+
+
+# ─── Measurement ───────────────────────────────────────────────────────────
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux: the lifetime peak is the best available
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler:
+    """Peak RSS while the block runs, sampled from a background thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def measure(client: TestClient, case: Case, repeat: int) -> Dict:
+    response = case.send(client)  # warm-up
+    status = response.status_code
+    latencies = []
+    with RSSSampler() as rss:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = case.send(client)
+            latencies.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+    del response
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    case.send(client)
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    retained = sys.getallocatedblocks() - blocks
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "status": status,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "peak_rss_mib": round(rss.peak / 2**20, 1),
+        "alloc_peak_mib": round(alloc_peak / 2**20, 3),
+        "retained_blocks": retained,
+    }
+
+
+def run_size(rows: int, args) -> Dict[str, Dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATA_DIR = Path(tmp)
+        write(settings.csv_path, Options(rows, args.seed))
+        results = {}
+        with TestClient(app) as client:
+            df = data.load_data()
+            cases = build_cases(df, settings.csv_path, args.routes)
+            del df
+            print(f"\n{rows:,} rows, {len(cases)} cases")
+            print(f"{'case':<78} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+                  f"{'RSS MiB':>8} {'alloc MiB':>9} {'retained':>8}")
+            # Uploads last: they replace the dataset the other cases read
+            for case in sorted(cases, key=lambda c: c.upload is not None):
+                result = results[case.key] = measure(client, case, args.upload_repeat if case.upload else args.repeat)
+                print(f"{case.key:<78} {result['status']:>6} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                      f"{result['p99_ms']:>9.1f} {result['peak_rss_mib']:>8.1f} {result['alloc_peak_mib']:>9.2f} "
+                      f"{result['retained_blocks']:>8}")
+        return results
+
+
+# ─── Baselines ─────────────────────────────────────────────────────────────
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    regressions = []
+    for rows, cases in current["results"].items():
+        for key, result in cases.items():
+            before = baseline["results"].get(rows, {}).get(key)
+            if before is None:
+                continue
+            if result["status"] != before["status"]:
+                regressions.append(f"{rows} rows {key}: status {before['status']} -> {result['status']}")
+            for metric in ("p50_ms", "p95_ms", "alloc_peak_mib"):
+                old, new = before[metric], result[metric]
+                floor = min_delta_ms if metric.endswith("_ms") else 0.0
+                if new > old * (1 + threshold) and new - old > floor:
+                    change = (new / old - 1) * 100 if old else float("inf")
+                    regressions.append(f"{rows} rows {key}: {metric} {old} -> {new} (+{change:.0f}%)")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case, after one warm-up")
+    parser.add_argument("--upload-repeat", type=int, default=2)
+    parser.add_argument("--routes", help="only routes whose template matches this regex")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against results saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative growth that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore latency growth below this")
+    args = parser.parse_args()
+
+    current = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "backend": settings.QUERY_BACKEND,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {str(rows): run_size(rows, args) for rows in args.rows},
+    }
+
+    if args.save:
+        args.save.write_text(json.dumps(current, indent=1))
+        print(f"\nResults saved to {args.save}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(current, baseline, args.threshold, args.min_delta_ms)
+        print(f"\nAgainst {args.baseline} (commit {baseline['meta'].get('commit')}), "
+              f"threshold {args.threshold:.0%}: {len(regressions)} regressions")
+        for line in regressions:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
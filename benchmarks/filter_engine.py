@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the filter engine: add_computed_attributes and
+apply_filter (app/utils/helpers.py), the hot path of every filter endpoint.
+
+For each frame size it times, with the peak traced memory of one run:
+  aggregate[id]              backend.aggregate of computed_aggregations(id)
+  merge[id]                  joining those attributes back onto every row
+  add_computed_attributes[id]  both, as the endpoints call it
+  filter[scenario]           apply_filter on the frame with computed attributes
+  select[scenario]           indexing the frame with that mask
+
+Filter scenarios are generated trees of a given depth, width, column mix and
+target selectivity: leaf values are picked from the column's quantiles or
+value frequencies, and each and/or/not node splits its target between its
+children assuming independence. The closest of a few candidates on a probe
+sample is kept and the measured selectivity is reported next to the target.
+sample_filter.json runs as well, with its values rewritten to ones present
+in the data. Frames come from benchmarks.synthetic with the ID
+columns as plain object strings, as read_csv leaves them in the app.
+
+    python -m benchmarks.filter_engine --rows 100000 1000000 5000000
+    python -m benchmarks.filter_engine --rows 20000000 --ids merchant_id --scenarios "nested|sample"
+    python -m benchmarks.filter_engine --rows 1000000 --backends pandas duckdb polars --save filters.json
+"""
+import argparse
+import gc
+import json
+import random
+import re
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.backends import get_backend
+from app.core.config import settings
+from app.core.data import _prepare_frame
+from app.utils.helpers import add_computed_attributes, apply_filter, computed_aggregations
+from benchmarks.synthetic import synthetic_frame
+
+SAMPLE_FILTER = Path(__file__).resolve().parents[1] / "app" / "logic" / "sample_filter.json"
+NUMERIC_COLUMNS = ["amount", "total_transactions", "avg_transaction_amount", "sum_transaction_amount",
+                   "max_transaction_amount", "unique_customers"]
+CATEGORICAL_COLUMNS = ["channel", "customer_id", "terminal_id", "agent_id"]
+NUMERIC_OPERATORS = ["greater_than", "greater_than_equals", "less_than", "less_than_equals", "between"]
+CATEGORICAL_OPERATORS = ["equals", "not_equals", "in", "not_in"]
+
+# name, depth, width, columns, target selectivity
+SCENARIOS = [
+    ("leaf numeric", 0, 1, "numeric", 0.1),
+    ("leaf categorical", 0, 1, "categorical", 0.1),
+    ("flat w2", 1, 2, "mixed", 0.1),
+    ("flat w8", 1, 8, "mixed", 0.1),
+    ("nested d2 w3", 2, 3, "mixed", 0.1),
+    ("nested d3 w3", 3, 3, "mixed", 0.1),
+    ("nested d4 w4", 4, 4, "mixed", 0.1),
+    ("numeric d3 w3", 3, 3, "numeric", 0.1),
+    ("categorical d3 w3", 3, 3, "categorical", 0.1),
+    ("selective 1%", 2, 3, "mixed", 0.01),
+    ("broad 50%", 2, 3, "mixed", 0.5),
+    ("broad 90%", 2, 3, "mixed", 0.9),
+]
+
+
+# ─── Filter trees ──────────────────────────────────────────────────────────
+class TreeBuilder:
+    """Random filter trees whose leaves hit a target selectivity on df."""
+
+    def __init__(self, df: pd.DataFrame, seed: int):
+        self.rng = random.Random(seed)
+        sample = df.sample(min(len(df), 200_000), random_state=seed)
+        self.probe = sample.iloc[:20_000]
+        self.quantiles = {c: np.quantile(sample[c].dropna(), np.linspace(0, 1, 1001))
+                          for c in NUMERIC_COLUMNS if c in df.columns}
+        self.frequencies = {c: sample[c].value_counts(normalize=True)
+                            for c in CATEGORICAL_COLUMNS if c in df.columns}
+
+    def _q(self, column: str, p: float):
+        value = float(self.quantiles[column][int(round(min(max(p, 0.0), 1.0) * 1000))])
+        return round(value, 2)
+
+    def numeric_leaf(self, column: str, selectivity: float) -> Dict:
+        op = self.rng.choice(NUMERIC_OPERATORS)
+        if op == "between":
+            low = self.rng.uniform(0, 1 - selectivity)
+            value = [self._q(column, low), self._q(column, low + selectivity)]
+        elif op.startswith("greater"):
+            value = self._q(column, 1 - selectivity)
+        else:
+            value = self._q(column, selectivity)
+        return {"column": column, "operator": op, "value": value}
+
+    def categorical_leaf(self, column: str, selectivity: float) -> Dict:
+        op = self.rng.choice(CATEGORICAL_OPERATORS)
+        target = 1 - selectivity if op in ("not_equals", "not_in") else selectivity
+        freq = self.frequencies[column]
+        if op in ("equals", "not_equals"):
+            value = freq.index[int(np.argmin(np.abs(freq.to_numpy() - target)))]
+            return {"column": column, "operator": op, "value": value}
+        values, covered = [], 0.0
+        for value, share in freq.sample(frac=1, random_state=self.rng.randrange(2**31)).items():
+            if covered >= target:
+                break
+            values.append(value)
+            covered += share
+        return {"column": column, "operator": op, "value": values}
+
+    def leaf(self, columns: str, selectivity: float) -> Dict:
+        kind = self.rng.choice(["numeric", "categorical"]) if columns == "mixed" else columns
+        if kind == "numeric":
+            return self.numeric_leaf(self.rng.choice(list(self.quantiles)), selectivity)
+        return self.categorical_leaf(self.rng.choice(list(self.frequencies)), selectivity)
+
+    def tree(self, depth: int, width: int, columns: str, selectivity: float) -> Dict:
+        if depth == 0:
+            return self.leaf(columns, selectivity)
+        kind = self.rng.choice(["and", "or", "not"] if depth > 1 else ["and", "or"])
+        if kind == "not":
+            return {"not": self.tree(depth - 1, width, columns, 1 - selectivity)}
+        if kind == "and":
+            child = selectivity ** (1 / width)
+        else:
+            child = 1 - (1 - selectivity) ** (1 / width)
+        return {kind: [self.tree(depth - 1, width, columns, child) for _ in range(width)]}
+
+    def best_tree(self, depth: int, width: int, columns: str, selectivity: float, tries: int = 8) -> Dict:
+        """The candidate closest to the target on a probe sample; correlated
+        columns (agent/terminal/customer all follow the merchant) break the
+        independence the per-node split assumes."""
+        backend = get_backend()
+        candidates = [self.tree(depth, width, columns, selectivity) for _ in range(tries)]
+        return min(candidates, key=lambda t: abs(backend.filter_mask(self.probe, t).mean() - selectivity))
+
+
+def sample_filter(df: pd.DataFrame) -> Dict:
+    """sample_filter.json with its merchant, date range and amount taken from df."""
+    tree = json.loads(SAMPLE_FILTER.read_text())
+    last = df["date"].max()
+    values = {
+        "merchant_id": df["merchant_id"].value_counts().index[0],
+        "date": [(last - pd.Timedelta(days=30)).strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")],
+        "amount": round(float(df["amount"].quantile(0.9)), 2),
+    }
+
+    def rewrite(node):
+        if isinstance(node, list):
+            return [rewrite(n) for n in node]
+        if isinstance(node, dict):
+            if "column" in node:
+                return {**node, "value": values.get(node["column"], node["value"])}
+            return {k: rewrite(v) for k, v in node.items()}
+        return node
+
+    return rewrite(tree)
+
+
+def leaves(tree) -> int:
+    if isinstance(tree, list):
+        return sum(leaves(t) for t in tree)
+    if "column" in tree:
+        return 1
+    return sum(leaves(v) for k, v in tree.items() if k in ("and", "or", "not"))
+
+
+# ─── Measurement ───────────────────────────────────────────────────────────
+def measure(fn: Callable, repeat: int):
+    """(result, median seconds, min seconds, peak traced MiB of one extra run)."""
+    times, result = [], None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    result = None
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(times), min(times), peak / 2**20
+
+
+def frame(rows: int, seed: int) -> pd.DataFrame:
+    df = synthetic_frame(rows, seed)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    df["date"] = df["date"].astype("datetime64[ns]")
+    return _prepare_frame(df)
+
+
+def report(results: List[Dict], stage: str, rows: int, seconds: float, best: float, peak: float,
+           extra: str = "", **fields) -> None:
+    results.append({"stage": stage, "rows": rows, "median_ms": round(seconds * 1000, 3),
+                    "min_ms": round(best * 1000, 3), "peak_mib": round(peak, 2), **fields})
+    print(f"{stage:<44} {seconds * 1000:>10.1f} {best * 1000:>10.1f} {peak:>10.1f} "
+          f"{rows / seconds / 1e6 if seconds else 0:>10.1f}  {extra}")
+
+
+def run(rows: int, args, scenarios) -> List[Dict]:
+    results = []
+    df = frame(rows, args.seed)
+    print(f"\n{rows:,} rows, backend {settings.QUERY_BACKEND}")
+    print(f"{'stage':<44} {'median ms':>10} {'min ms':>10} {'peak MiB':>10} {'Mrows/s':>10}")
+
+    backend = get_backend()
+    computed = None
+    for id_col in args.ids:
+        aggs = computed_aggregations(id_col)
+        agg_df, s, b, m = measure(lambda: backend.aggregate(df, [id_col], aggs), args.repeat)
+        report(results, f"aggregate[{id_col}]", rows, s, b, m, f"{len(agg_df):,} groups")
+        _, s, b, m = measure(lambda: df.merge(agg_df, on=id_col, how="left"), args.repeat)
+        report(results, f"merge[{id_col}]", rows, s, b, m)
+        result, s, b, m = measure(lambda: add_computed_attributes(df, id_col), args.repeat)
+        report(results, f"add_computed_attributes[{id_col}]", rows, s, b, m)
+        if computed is None:
+            computed = result
+        del result, agg_df
+
+    builder = TreeBuilder(computed, args.seed)
+    trees = [(name, builder.best_tree(depth, width, columns, target), target)
+             for name, depth, width, columns, target in scenarios]
+    if args.scenarios is None or re.search(args.scenarios, "sample_filter.json"):
+        trees.append(("sample_filter.json", sample_filter(computed), None))
+    for name, tree, target in trees:
+        mask, s, b, m = measure(lambda: apply_filter(computed, tree), args.repeat)
+        selectivity = float(mask.mean())
+        note = f"{leaves(tree)} leaves, selectivity {selectivity:.3f}" + (f" (target {target:g})" if target else "")
+        report(results, f"filter[{name}]", rows, s, b, m, note,
+               leaves=leaves(tree), selectivity=round(selectivity, 4), target=target)
+        _, s, b, m = measure(lambda: computed[mask], args.repeat)
+        report(results, f"select[{name}]", rows, s, b, m, f"{int(mask.sum()):,} rows kept")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--ids", nargs="+", default=["merchant_id", "customer_id"],
+                        help="group-by columns for add_computed_attributes; the first one's frame is filtered")
+    parser.add_argument("--scenarios", help="only scenarios whose name matches this regex")
+    parser.add_argument("--backends", nargs="+", default=[settings.QUERY_BACKEND])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    pattern = re.compile(args.scenarios) if args.scenarios else None
+    scenarios = [s for s in SCENARIOS if pattern is None or pattern.search(s[0])]
+    results = []
+    for backend in args.backends:
+        settings.QUERY_BACKEND = backend
+        for rows in args.rows:
+            results.extend({"backend": backend, **r} for r in run(rows, args, scenarios))
+    if args.save:
+        args.save.write_text(json.dumps({"seed": args.seed, "repeat": args.repeat, "results": results}, indent=1))
+
+
+if __name__ == "__main__":
+    main()
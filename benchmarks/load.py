@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Load test: how much dashboard traffic one node sustains.
+
+Replays a weighted mix of dashboard requests (overviews, time series,
+paginated lists, stats, structured and NL filters, CSV exports) against a
+running server over HTTP, while an optional background uploader replaces the
+dataset every --upload-every seconds. Entities are drawn from the dataset the
+server serves, busier ones more often (weight sqrt(rows)).
+
+Two ways to apply load, stepped to trace a throughput/latency curve:
+  --clients 1 2 4 8 ...  closed loop: N users, each sending its next request
+                         when the previous one returns (plus --think-ms)
+  --rates 2 5 10 ...     open loop: Poisson arrivals at R requests/s whatever
+                         the server does; latency counts from the scheduled
+                         arrival, so queueing is not hidden (no coordinated
+                         omission). Arrivals beyond --max-in-flight are dropped.
+
+A step is saturated when its p95 exceeds --slo-p95-ms, errors exceed 1%,
+an open-loop step completes less than 95% of its offered rate, or a
+closed-loop step adds under 10% throughput while p95 grows by half. The
+report names the last step before saturation as the sustainable load.
+
+Without --base-url the harness generates a dataset,
+starts uvicorn on it with the stub LLM (STUB_LLM_LATENCY_MS and a log-normal
+STUB_LLM_LATENCY_JITTER, so NL requests wait like they would on a real model)
+and stops it afterwards. The generator shares the machine with the server, so
+run it on another host (--base-url, --data) for numbers past a few cores.
+
+    python -m benchmarks.load --rows 1000000 --clients 1 2 4 8 16 32 --duration 20
+    python -m benchmarks.load --rows 1000000 --rates 2 4 8 16 --workers 2 --upload-every 30
+    python -m benchmarks.load --base-url http://app:8000 --data transactions.csv --rates 5 10 20 40
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ATTRIBUTE_FILTERS = [
+    {"column": "total_transactions", "operator": "greater_than", "value": 5},
+    {"and": [{"column": "avg_transaction_amount", "operator": "greater_than", "value": 80},
+             {"column": "total_transactions", "operator": "greater_than_equals", "value": 3}]},
+    {"or": [{"column": "sum_transaction_amount", "operator": "greater_than", "value": 2000},
+            {"column": "max_transaction_amount", "operator": "greater_than", "value": 500}]},
+]
+# NL phrasings the rule parser leaves to the model: (template, group-by column, filter for threshold n)
+NL_TEMPLATES = [
+    ("Merchants with more than {n} transactions or fewer than 5 customers", "merchant_id",
+     lambda n: {"or": [{"column": "total_transactions", "operator": "greater_than", "value": n},
+                       {"column": "unique_customers", "operator": "less_than", "value": 5}]}),
+    ("Customers who did not spend over {n} in total", "customer_id",
+     lambda n: {"not": {"column": "sum_transaction_amount", "operator": "greater_than", "value": n}}),
+]
+NL_THRESHOLDS = range(50, 2050, 50)
+ENTITY_PATHS = {"agent_id": "agents", "merchant_id": "merchants",
+                "terminal_id": "terminals", "branch_admin_id": "branch-admins"}
+
+
+# ─── Traffic mix ───────────────────────────────────────────────────────────
+class Traffic:
+    """Draws requests of the mix: (category, method, url, params, json body)."""
+
+    def __init__(self, df: pd.DataFrame, seed: int):
+        self.rng = random.Random(seed)
+        self.entities = {}
+        for column in ENTITY_PATHS:
+            counts = df[column].value_counts()
+            self.entities[column] = (counts.index.tolist(), np.sqrt(counts.to_numpy()).tolist())
+        self.last_day = pd.to_datetime(df["date"]).max().normalize()
+        self.mix = [
+            (25, self.overview), (25, self.time_series), (15, self.lists), (10, self.stats),
+            (10, self.filters), (5, self.nl_filter), (5, self.export),
+        ]
+
+    def next(self):
+        weights = [w for w, _ in self.mix]
+        return self.rng.choices([f for _, f in self.mix], weights)[0]()
+
+    def _entity(self, column: str) -> str:
+        ids, weights = self.entities[column]
+        return self.rng.choices(ids, weights)[0]
+
+    def _kind(self, weights=(4, 4, 1, 1)) -> str:
+        return self.rng.choices(list(ENTITY_PATHS), weights)[0]
+
+    def _window(self) -> Dict:
+        """Whole history half the time, else the last 7, 30 or 90 days."""
+        days = self.rng.choice([None, None, 7, 30, 90])
+        if days is None:
+            return {}
+        start = self.last_day - timedelta(days=days - 1)
+        return {"start_date": start.strftime("%Y-%m-%d"), "end_date": self.last_day.strftime("%Y-%m-%d")}
+
+    def overview(self):
+        kind = self._kind()
+        return "overview", "GET", f"/{ENTITY_PATHS[kind]}/{self._entity(kind)}/overview", self._window(), None
+
+    def time_series(self):
+        kind = self._kind()
+        metric = self.rng.choice(["transaction-volume", "transaction-count", "average-transactions"])
+        params = {"granularity": self.rng.choices(["daily", "weekly", "monthly", "yearly"], (2, 2, 5, 1))[0],
+                  **self._window()}
+        return "time_series", "GET", f"/{ENTITY_PATHS[kind]}/{self._entity(kind)}/{metric}", params, None
+
+    def lists(self):
+        page = {"page": self.rng.choices([1, 2, 3, 4, 5], (6, 2, 1, 1, 1))[0]}
+        which = self.rng.choice(["customers", "merchants", "all_merchants"])
+        if which == "all_merchants":
+            return "lists", "GET", "/merchants/", page, None
+        return "lists", "GET", f"/agents/{self._entity('agent_id')}/{which}", {**page, **self._window()}, None
+
+    def stats(self):
+        if self.rng.random() < 0.5:
+            return "stats", "GET", f"/merchants/{self._entity('merchant_id')}/stats", self._window(), None
+        kind = self._kind()
+        return ("stats", "GET", f"/{ENTITY_PATHS[kind]}/{self._entity(kind)}/top-customers",
+                {"mode": self.rng.choice(["amount", "count"])}, None)
+
+    def filters(self):
+        path = self.rng.choice(["filter", "filter-customers"])
+        return ("filters", "POST", f"/agents/{self._entity('agent_id')}/{path}", {},
+                self.rng.choice(ATTRIBUTE_FILTERS))
+
+    def nl_filter(self):
+        template, _, _ = self.rng.choice(NL_TEMPLATES)
+        query = template.format(n=self.rng.choice(NL_THRESHOLDS))
+        return "nl_filter", "POST", f"/agents/{self._entity('agent_id')}/nl-filter", {}, {"query": query}
+
+    def export(self):
+        kind = self.rng.choice(["merchant_id", "terminal_id"])
+        return "export", "GET", f"/{ENTITY_PATHS[kind]}/{self._entity(kind)}/export", self._window(), None
+
+
+def stub_responses() -> Dict:
+    """Canned model answers for every NL query the mix can send."""
+    responses = {"group_by_column": {}, "filter_object": {}}
+    for template, group_by, build in NL_TEMPLATES:
+        for n in NL_THRESHOLDS:
+            query = template.format(n=n)
+            responses["group_by_column"][query] = group_by
+            responses["filter_object"][query] = build(n)
+    return responses
+
+
+# ─── Load generation ───────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = 0
+        self.completed = 0
+        self.dropped = 0
+
+    def record(self, category: str, scheduled: float, ok: bool) -> None:
+        if scheduled < self.warmup_until:
+            return
+        self.completed += 1
+        if not ok:
+            self.errors += 1
+        self.latencies[category].append((time.perf_counter() - scheduled) * 1000)
+
+
+async def send(client: httpx.AsyncClient, traffic: Traffic, recorder: Recorder, scheduled: float) -> None:
+    category, method, url, params, body = traffic.next()
+    try:
+        response = await client.request(method, url, params=params, json=body)
+        await response.aread()
+        ok = response.status_code < 500
+    except httpx.HTTPError:
+        ok = False
+    recorder.record(category, scheduled, ok)
+
+
+async def closed_loop(client, traffic, clients: int, duration: float, warmup: float, think_ms: float) -> Recorder:
+    started = time.perf_counter()
+    recorder = Recorder(started + warmup)
+    deadline = started + warmup + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await send(client, traffic, recorder, time.perf_counter())
+            if think_ms:
+                await asyncio.sleep(random.expovariate(1000 / think_ms))
+
+    await asyncio.gather(*(user() for _ in range(clients)))
+    return recorder
+
+
+async def open_loop(client, traffic, rate: float, duration: float, warmup: float, max_in_flight: int) -> Recorder:
+    started = time.perf_counter()
+    recorder = Recorder(started + warmup)
+    deadline = started + warmup + duration
+    rng = random.Random(int(rate * 1000))
+    tasks, arrival = set(), started
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival >= deadline:
+            break
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        if len(tasks) >= max_in_flight:
+            if arrival >= recorder.warmup_until:
+                recorder.dropped += 1
+            continue
+        task = asyncio.ensure_future(send(client, traffic, recorder, arrival))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    return recorder
+
+
+async def uploader(base_url: str, csv_path: Path, every: float, stop: asyncio.Event, log: List[float]) -> None:
+    """Replace the dataset every `every` seconds while the reads run."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=every)
+                return
+            except asyncio.TimeoutError:
+                pass
+            started = time.perf_counter()
+            with open(csv_path, "rb") as f:
+                response = await client.post("/upload/", files={"file": ("transactions.csv", f.read(), "text/csv")})
+            if response.status_code == 201:
+                log.append(time.perf_counter() - started)
+
+
+def summarize(load: float, recorder: Recorder, duration: float) -> Dict:
+    everything = [ms for values in recorder.latencies.values() for ms in values]
+    p50, p95, p99 = np.percentile(everything, [50, 95, 99]) if everything else (math.nan,) * 3
+    return {
+        "load": load,
+        "completed": recorder.completed,
+        "errors": recorder.errors,
+        "dropped": recorder.dropped,
+        "throughput": round(recorder.completed / duration, 2),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "max_ms": round(max(everything), 1) if everything else math.nan,
+        "categories": {
+            category: {"count": len(values), "p95_ms": round(float(np.percentile(values, 95)), 1)}
+            for category, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def saturated(step: Dict, previous: Optional[Dict], open_loop: bool, slo_p95_ms: float) -> Optional[str]:
+    if step["completed"] == 0:
+        return "nothing completed"
+    if step["p95_ms"] > slo_p95_ms:
+        return f"p95 {step['p95_ms']:.0f} ms over the {slo_p95_ms:.0f} ms SLO"
+    if step["errors"] > 0.01 * step["completed"]:
+        return f"{step['errors']} errors"
+    if open_loop and (step["dropped"] or step["throughput"] < 0.95 * step["load"]):
+        return f"completes {step['throughput']:.1f}/s of {step['load']:g}/s offered"
+    if not open_loop and previous and previous["throughput"] > 0:
+        gain = step["throughput"] / previous["throughput"] - 1
+        if gain < 0.10 and step["p95_ms"] > 1.5 * previous["p95_ms"]:
+            return f"throughput +{gain:.0%} while p95 grew {step['p95_ms'] / previous['p95_ms']:.1f}x"
+    return None
+
+
+async def run(args, base_url: str, traffic: Traffic, csv_path: Path) -> List[Dict]:
+    open_mode = bool(args.rates)
+    loads = args.rates or args.clients
+    limits = httpx.Limits(max_connections=max(args.max_in_flight, max(args.clients or [1])))
+    steps, previous, strikes = [], None, 0
+    stop, uploads = asyncio.Event(), []
+    upload_task = (asyncio.ensure_future(uploader(base_url, csv_path, args.upload_every, stop, uploads))
+                   if args.upload_every else None)
+
+    print(f"{'rate/s' if open_mode else 'clients':>8} {'done':>6} {'err':>5} {'drop':>5} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  status")
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for load in loads:
+            if open_mode:
+                recorder = await open_loop(client, traffic, load, args.duration, args.warmup, args.max_in_flight)
+            else:
+                recorder = await closed_loop(client, traffic, int(load), args.duration, args.warmup, args.think_ms)
+            step = summarize(load, recorder, args.duration)
+            step["saturated"] = saturated(step, previous, open_mode, args.slo_p95_ms)
+            steps.append(step)
+            print(f"{load:>8g} {step['completed']:>6} {step['errors']:>5} {step['dropped']:>5} "
+                  f"{step['throughput']:>8.2f} {step['p50_ms']:>8.1f} {step['p95_ms']:>8.1f} "
+                  f"{step['p99_ms']:>8.1f} {step['max_ms']:>8.1f}  {step['saturated'] or 'ok'}")
+            previous = step
+            strikes = strikes + 1 if step["saturated"] else 0
+            if strikes >= 2 and not args.keep_going:
+                break
+
+    if upload_task is not None:
+        stop.set()
+        await upload_task
+        if uploads:
+            print(f"\n{len(uploads)} uploads during the run, median {np.median(uploads):.1f} s each")
+    return steps
+
+
+# ─── Server under test ─────────────────────────────────────────────────────
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, data_dir: Path, responses: Path):
+    port = free_port()
+    env = {
+        **os.environ, "DATA_DIR": str(data_dir), "AUTO_RELOAD": "true", "SLOW_REQUEST_MS": "0",
+        "LLM_PROVIDER": "stub", "STUB_LLM_RESPONSES": str(responses),
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms), "STUB_LLM_LATENCY_JITTER": str(args.llm_jitter),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=env, cwd=Path(__file__).resolve().parents[1], stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("The server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/agents/count", timeout=5).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("The server did not come up within 10 minutes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_argument_group("target")
+    target.add_argument("--base-url", help="test a running server instead of starting one")
+    target.add_argument("--data", type=Path, help="the CSV the server serves (entities are drawn from it)")
+    target.add_argument("--rows", type=int, default=1_000_000, help="dataset size when starting the server")
+    target.add_argument("--workers", type=int, default=1, help="uvicorn workers when starting the server")
+    target.add_argument("--llm-latency-ms", type=int, default=800, help="median stub LLM latency")
+    target.add_argument("--llm-jitter", type=float, default=0.35, help="log-normal sigma of the stub LLM latency")
+    load = parser.add_argument_group("load")
+    mode = load.add_mutually_exclusive_group()
+    mode.add_argument("--clients", type=int, nargs="+", help="closed-loop steps (concurrent users)")
+    mode.add_argument("--rates", type=float, nargs="+", help="open-loop steps (requests per second)")
+    load.add_argument("--duration", type=float, default=20.0, help="measured seconds per step")
+    load.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before each step")
+    load.add_argument("--think-ms", type=float, default=0.0, help="mean think time between a user's requests")
+    load.add_argument("--max-in-flight", type=int, default=256, help="open-loop cap on outstanding requests")
+    load.add_argument("--upload-every", type=float, default=0.0, help="replace the dataset every N seconds")
+    load.add_argument("--timeout", type=float, default=60.0)
+    load.add_argument("--slo-p95-ms", type=float, default=2000.0)
+    load.add_argument("--keep-going", action="store_true", help="run every step even after saturation")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--save", type=Path, help="write the curve as JSON")
+    args = parser.parse_args()
+    if not args.clients and not args.rates:
+        args.clients = [1, 2, 4, 8, 16, 32]
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.base_url:
+            if args.data is None:
+                raise SystemExit("--base-url needs --data, the CSV the server serves")
+            base_url, csv_path = args.base_url, args.data
+        else:
+            from benchmarks.synthetic import Options, write
+            data_dir = Path(tmp)
+            csv_path = data_dir / "transactions.csv"
+            write(csv_path, Options(args.rows, args.seed))
+            responses = data_dir / "stub_responses.json"
+            responses.write_text(json.dumps(stub_responses()))
+            server, base_url = start_server(args, data_dir, responses)
+        try:
+            traffic = Traffic(pd.read_csv(csv_path, usecols=[*ENTITY_PATHS, "date"]), args.seed)
+            steps = asyncio.run(run(args, base_url, traffic, csv_path))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    healthy = [s for s in steps if not s["saturated"]]
+    unit = "requests/s offered" if args.rates else "clients"
+    if healthy and len(healthy) < len(steps):
+        best = healthy[-1]
+        print(f"\nSustainable: {best['load']:g} {unit} ({best['throughput']:.1f} req/s, p95 {best['p95_ms']:.0f} ms); "
+              f"saturated next: {next(s['saturated'] for s in steps if s['saturated'])}")
+    elif healthy:
+        print(f"\nNo saturation up to {steps[-1]['load']:g} {unit}; add higher steps")
+    else:
+        print(f"\nSaturated already at {steps[0]['load']:g} {unit}")
+    slowest = max(steps[-1]["categories"].items(), key=lambda item: item[1]["p95_ms"], default=None)
+    if slowest:
+        print(f"Slowest category at the last step: {slowest[0]} (p95 {slowest[1]['p95_ms']:.0f} ms)")
+    if args.save:
+        args.save.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "steps": steps}, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Load test: NL filter traffic against a slow model must not stall other endpoints.
+
+Serves the app in-process on one event loop (httpx ASGITransport) with the
+stub model (LLM_PROVIDER=stub) answering after --latency-ms. It first measures
+a cheap endpoint on its own, then again while --concurrency clients keep
+POST /agents/{id}/nl-filter-merchants busy. With the async pipeline the
+cheap endpoint's latency should barely move; NL requests queue behind
+LLM_MAX_CONCURRENCY and fail with 504 after LLM_TIMEOUT_SECONDS.
+
+    python -m benchmarks.nl_async --concurrency 32 --latency-ms 1000 --max-llm 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+QUERY = "Merchants with more than 50 transactions"
+FILTER = {"column": "total_transactions", "operator": "greater_than", "value": 50}
+
+
+def summary(latencies):
+    if not latencies:
+        return "-"
+    q = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+    return f"p50 {statistics.median(latencies) * 1000:8.1f} ms   p95 {q[-1] * 1000:8.1f} ms   n={len(latencies)}"
+
+
+async def probe(client, path, samples, interval):
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        (await client.get(path)).raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def nl_client(client, path, stop, latencies, statuses):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post(path, json={"query": QUERY})
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run(args):
+    import httpx
+    from app.core.data import load_data
+    from app.main import app
+
+    load_data()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        fast = f"/agents/{args.agent}/stats"
+        await client.get(fast)  # warm up
+        idle = await probe(client, fast, args.samples, args.interval)
+
+        stop, nl_latencies, statuses = asyncio.Event(), [], {}
+        nl_path = f"/agents/{args.agent}/nl-filter-merchants"
+        workers = [asyncio.create_task(nl_client(client, nl_path, stop, nl_latencies, statuses))
+                   for _ in range(args.concurrency)]
+        await asyncio.sleep(args.latency_ms / 1000)  # let the NL load build up
+        loaded = await probe(client, fast, args.samples, args.interval)
+        stop.set()
+        await asyncio.gather(*workers)
+
+    print(f"{fast} alone      {summary(idle)}")
+    print(f"{fast} under load {summary(loaded)}")
+    print(f"{nl_path}  {summary(nl_latencies)}  statuses {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=int, default=1000)
+    parser.add_argument("--max-llm", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--timeout-s", type=float, default=30.0, help="LLM_TIMEOUT_SECONDS")
+    parser.add_argument("--samples", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--agent", default="A1")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    responses = tmp / "stub_responses.json"
+    responses.write_text(json.dumps({"filter_object": {QUERY: FILTER}}))
+    os.environ.update(
+        DATA_DIR=str(tmp), LLM_PROVIDER="stub", STUB_LLM_RESPONSES=str(responses),
+        STUB_LLM_LATENCY_MS=str(args.latency_ms), NL_CACHE_SIZE="0", NL_RULE_PARSER="false",
+        LLM_MAX_CONCURRENCY=str(args.max_llm), LLM_TIMEOUT_SECONDS=str(args.timeout_s),
+    )
+
+    from app.core.config import settings
+    from benchmarks.synthetic import synthetic_frame
+
+    synthetic_frame(args.rows).to_csv(settings.csv_path, index=False)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+A reporting loop of NL filters for one agent: one POST /agents/{id}/nl-filter
+per query versus a single POST /agents/{id}/nl-filter-batch.
+
+Uses the stub model (LLM_PROVIDER=stub) with an injected per-call latency,
+the translation cache and the rule parser disabled, so every query pays an
+LLM extraction. The loop pays them one after another; the batch runs them
+NL_BATCH_CONCURRENCY at a time and aggregates each group-by column once.
+Both must return the same entities.
+
+    python -m benchmarks.nl_batch --queries 24 --latency-ms 800 --concurrency 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.nl_parser import QUERIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=24)
+    parser.add_argument("--latency-ms", type=int, default=800)
+    parser.add_argument("--concurrency", type=int, default=8, help="NL_BATCH_CONCURRENCY")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--agent", default="A1")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    responses = tmp / "stub_responses.json"
+    responses.write_text(json.dumps({
+        "group_by_column": {q: col for q, (col, _) in QUERIES.items()},
+        "filter_object": {q: f for q, (_, f) in QUERIES.items()},
+    }))
+    os.environ.update(
+        DATA_DIR=str(tmp), LLM_PROVIDER="stub", STUB_LLM_RESPONSES=str(responses),
+        STUB_LLM_LATENCY_MS=str(args.latency_ms), NL_CACHE_SIZE="0", NL_RULE_PARSER="false",
+        NL_BATCH_CONCURRENCY=str(args.concurrency), NL_BATCH_MAX_QUERIES=str(max(args.queries, 50)),
+        AUTO_RELOAD="true",
+    )
+
+    from fastapi.testclient import TestClient
+    from app.chains.llm import get_model
+    from app.core.config import settings
+    from app.main import app
+    from benchmarks.synthetic import synthetic_frame
+
+    model = get_model()  # the stub, so its call counter can be read
+    synthetic_frame(args.rows).to_csv(settings.csv_path, index=False)
+    # Distinct wording per position, so the batch cannot collapse repeats
+    queries = [f"{list(QUERIES)[i % len(QUERIES)]}{'?' * (i // len(QUERIES))}" for i in range(args.queries)]
+
+    with TestClient(app) as client:
+        calls, started = model.calls, time.perf_counter()
+        looped = []
+        for query in queries:
+            response = client.post(f"/agents/{args.agent}/nl-filter", json={"query": query})
+            response.raise_for_status()
+            looped.append(response.json())
+        loop_s, loop_calls = time.perf_counter() - started, model.calls - calls
+
+        calls, started = model.calls, time.perf_counter()
+        response = client.post(f"/agents/{args.agent}/nl-filter-batch", json={"queries": queries})
+        response.raise_for_status()
+        batch_s, batch_calls = time.perf_counter() - started, model.calls - calls
+        batched = response.json()["results"]
+
+    print(f"{'mode':>6} {'wall s':>8} {'ms/query':>9} {'LLM calls':>10}")
+    print(f"{'loop':>6} {loop_s:>8.2f} {loop_s / len(queries) * 1000:>9.1f} {loop_calls:>10}")
+    print(f"{'batch':>6} {batch_s:>8.2f} {batch_s / len(queries) * 1000:>9.1f} {batch_calls:>10}")
+    print(f"speed-up {loop_s / batch_s:.1f}x")
+
+    errors = [r for r in batched if "error" in r]
+    same = not errors and all(r["results"] == expected for r, expected in zip(batched, looped))
+    print("batch results identical to the loop" if same else f"RESULTS DIFFER ({len(errors)} errors)")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
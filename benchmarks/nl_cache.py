@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Exercise the NL filter translation cache offline.
+
+Runs a skewed stream of natural-language queries (with whitespace and
+punctuation variants of the same phrasing) against POST /merchants/nl-filter
+with the stub model (LLM_PROVIDER=stub) answering after a simulated latency.
+Reports the hit rate, how many model calls were made, and the latency of
+hits versus misses. It then reopens the cache from disk to check that the
+entries survive a restart.
+
+    python -m benchmarks.nl_cache --requests 200 --latency-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+QUERIES = {
+    "Show me transactions over 500": {"column": "amount", "operator": "greater_than", "value": 500},
+    "Online payments only": {"column": "channel", "operator": "equals", "value": "Online"},
+    "Transactions between 10 and 20": {"column": "amount", "operator": "between", "value": [10, 20]},
+    "Mobile or POS under 5": {"and": [
+        {"column": "channel", "operator": "in", "value": ["Mobile", "POS"]},
+        {"column": "amount", "operator": "less_than", "value": 5},
+    ]},
+    "Everything except agent A1": {"not": {"column": "agent_id", "operator": "equals", "value": "A1"}},
+}
+
+
+def variants(query: str, rng) -> str:
+    """The same phrasing as a user might retype it."""
+    spaced = query.replace(" ", "  ") if rng.random() < 0.3 else query
+    return spaced + rng.choice(["", "?", " .", "  "])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=int, default=800)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    responses = tmp / "stub_responses.json"
+    responses.write_text(json.dumps({"filter_object": QUERIES}))
+    os.environ.update(
+        DATA_DIR=str(tmp), LLM_PROVIDER="stub", STUB_LLM_RESPONSES=str(responses),
+        STUB_LLM_LATENCY_MS=str(args.latency_ms), NL_RULE_PARSER="false", AUTO_RELOAD="true",
+    )
+
+    from fastapi.testclient import TestClient
+    from app.chains.llm import get_model
+    from app.core.config import settings
+    from app.main import app
+    from app.utils.nl_cache import TranslationCache, CACHE_NAME
+    from benchmarks.synthetic import synthetic_frame
+
+    model = get_model()  # the stub, so its call counter can be read
+
+    synthetic_frame(args.rows, args.seed).to_csv(settings.csv_path, index=False)
+    rng = np.random.default_rng(args.seed)
+    phrasings = list(QUERIES)
+    weights = 1 / np.arange(1, len(phrasings) + 1)
+    stream = rng.choice(phrasings, size=args.requests, p=weights / weights.sum())
+
+    hit_s, miss_s = [], []
+    with TestClient(app) as client:
+        for query in stream:
+            calls = model.calls
+            started = time.perf_counter()
+            response = client.post("/merchants/nl-filter", json={"query": variants(str(query), rng)})
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            (miss_s if model.calls > calls else hit_s).append(elapsed)
+        stats = client.get("/nl-cache/stats").json()
+
+    reopened = TranslationCache(settings.DATA_DIR / CACHE_NAME, settings.NL_CACHE_SIZE)
+    print(f"requests       {args.requests}")
+    print(f"model calls    {model.calls}")
+    print(f"cache stats    {stats}")
+    print(f"hit latency    median {statistics.median(hit_s) * 1000:8.1f} ms  ({len(hit_s)} requests)" if hit_s else "hit latency    -")
+    print(f"miss latency   median {statistics.median(miss_s) * 1000:8.1f} ms  ({len(miss_s)} requests)")
+    print(f"after restart  {reopened.stats()['entries']} entries reloaded from disk")
+
+
+if __name__ == "__main__":
+    main()
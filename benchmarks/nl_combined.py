@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of POST /agents/{id}/nl-filter with the combined
+extraction chain versus the separate intent / group-by / filter chains.
+
+Uses the stub model (LLM_PROVIDER=stub) with an injected per-call latency and
+the translation cache disabled, so every request pays its LLM round-trips:
+two serial ones on the separate-chain path (intent and group-by run in
+parallel, then filter extraction), one on the combined path.
+
+    python -m benchmarks.nl_combined --requests 20 --latency-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+QUERIES = {
+    "Merchants with more than 50 transactions": (
+        "merchant_id", {"column": "total_transactions", "operator": "greater_than", "value": 50}),
+    "Customers who spent over 500 in total": (
+        "customer_id", {"column": "sum_transaction_amount", "operator": "greater_than", "value": 500}),
+    "Terminals averaging under 100 per transaction": (
+        "terminal_id", {"column": "avg_transaction_amount", "operator": "less_than", "value": 100}),
+    "Branches serving at least 200 customers": (
+        "branch_admin_id", {"column": "unique_customers", "operator": "greater_than_equals", "value": 200}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency-ms", type=int, default=800)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--agent", default="A1")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    responses = tmp / "stub_responses.json"
+    responses.write_text(json.dumps({
+        "group_by_column": {q: col for q, (col, _) in QUERIES.items()},
+        "filter_object": {q: f for q, (_, f) in QUERIES.items()},
+    }))
+    os.environ.update(
+        DATA_DIR=str(tmp), LLM_PROVIDER="stub", STUB_LLM_RESPONSES=str(responses),
+        STUB_LLM_LATENCY_MS=str(args.latency_ms), NL_CACHE_SIZE="0", NL_RULE_PARSER="false",
+        AUTO_RELOAD="true",
+    )
+
+    from fastapi.testclient import TestClient
+    from app.chains.llm import get_model
+    from app.core.config import settings
+    from app.main import app
+    from benchmarks.synthetic import synthetic_frame
+
+    model = get_model()  # the stub, so its call counter can be read
+
+    synthetic_frame(args.rows).to_csv(settings.csv_path, index=False)
+    queries = [list(QUERIES)[i % len(QUERIES)] for i in range(args.requests)]
+
+    print(f"{'path':>10} {'median ms':>10} {'p95 ms':>8} {'LLM calls/request':>18}")
+    with TestClient(app) as client:
+        results = {}
+        for combined in (False, True):
+            settings.NL_COMBINED_EXTRACTION = combined
+            calls, latencies = model.calls, []
+            for query in queries:
+                started = time.perf_counter()
+                response = client.post(f"/agents/{args.agent}/nl-filter", json={"query": query})
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+                results.setdefault(query, []).append(response.json())
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            print(f"{'combined' if combined else 'separate':>10} {statistics.median(latencies) * 1000:>10.1f} "
+                  f"{p95 * 1000:>8.1f} {(model.calls - calls) / len(queries):>18.1f}")
+
+    same = all(all(r == runs[0] for r in runs) for runs in results.values())
+    print("results identical on both paths" if same else "RESULTS DIFFER between paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Share of NL filter queries the rule parser (NL_RULE_PARSER) answers without
+the LLM, and the latency it saves on POST /agents/{id}/nl-filter.
+
+Runs a mixed workload of simple phrasings (parseable) and complex ones
+(negations, "or", dates) twice against the stub model (LLM_PROVIDER=stub)
+with an injected per-call latency and the translation cache disabled: once
+with the parser off, once with it on. Every simple phrasing must parse to
+the same filter the stub's canned LLM answer gives, and both runs must
+return identical results.
+
+    python -m benchmarks.nl_parser --requests 40 --latency-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# Query -> (group-by column, filter) the LLM would answer with
+SIMPLE = {
+    "Merchants with more than 50 transactions": (
+        "merchant_id", {"column": "total_transactions", "operator": "greater_than", "value": 50}),
+    "Customers who spent over 500 in total": (
+        "customer_id", {"column": "sum_transaction_amount", "operator": "greater_than", "value": 500}),
+    "Customers spending at least 150 on average and at least 3 transactions": (
+        "customer_id", {"and": [
+            {"column": "avg_transaction_amount", "operator": "greater_than_equals", "value": 150},
+            {"column": "total_transactions", "operator": "greater_than_equals", "value": 3},
+        ]}),
+    "Terminals with average transaction amount below 100": (
+        "terminal_id", {"column": "avg_transaction_amount", "operator": "less_than", "value": 100}),
+    "Show me merchants with between 20 and 40 customers": (
+        "merchant_id", {"column": "unique_customers", "operator": "between", "value": [20, 40]}),
+    "Branch admins with total sales above 10k": (
+        "branch_admin_id", {"column": "sum_transaction_amount", "operator": "greater_than", "value": 10000}),
+}
+COMPLEX = {
+    "Merchants with more than 50 transactions or fewer than 5 customers": (
+        "merchant_id", {"or": [
+            {"column": "total_transactions", "operator": "greater_than", "value": 50},
+            {"column": "unique_customers", "operator": "less_than", "value": 5},
+        ]}),
+    "Customers who did not spend over 300 in total": (
+        "customer_id", {"not": {"column": "sum_transaction_amount", "operator": "greater_than", "value": 300}}),
+    "Merchants whose largest transaction is over 900 and serve no more than 10 customers or 3 terminals": (
+        "merchant_id", {"and": [
+            {"column": "max_transaction_amount", "operator": "greater_than", "value": 900},
+            {"or": [
+                {"column": "unique_customers", "operator": "less_than_equals", "value": 10},
+                {"column": "unique_terminals", "operator": "less_than_equals", "value": 3},
+            ]},
+        ]}),
+}
+QUERIES = {**SIMPLE, **COMPLEX}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--latency-ms", type=int, default=800)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--agent", default="A1")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    responses = tmp / "stub_responses.json"
+    responses.write_text(json.dumps({
+        "group_by_column": {q: col for q, (col, _) in QUERIES.items()},
+        "filter_object": {q: f for q, (_, f) in QUERIES.items()},
+    }))
+    os.environ.update(
+        DATA_DIR=str(tmp), LLM_PROVIDER="stub", STUB_LLM_RESPONSES=str(responses),
+        STUB_LLM_LATENCY_MS=str(args.latency_ms), NL_CACHE_SIZE="0", AUTO_RELOAD="true",
+    )
+
+    from fastapi.testclient import TestClient
+    from app.chains.llm import get_model
+    from app.core.config import settings
+    from app.main import app
+    from app.utils.nl_parser import parse_query
+    from benchmarks.synthetic import synthetic_frame
+
+    model = get_model()  # the stub, so its call counter can be read
+
+    wrong = [q for q, expected in SIMPLE.items() if parse_query(q) != expected]
+    guessed = [q for q in COMPLEX if parse_query(q)[1] is not None]
+    for query in wrong:
+        print(f"MISPARSED {query!r}: {parse_query(query)}")
+    for query in guessed:
+        print(f"SHOULD DEFER {query!r}: {parse_query(query)}")
+
+    synthetic_frame(args.rows).to_csv(settings.csv_path, index=False)
+    queries = [list(QUERIES)[i % len(QUERIES)] for i in range(args.requests)]
+
+    print(f"{'parser':>7} {'median ms':>10} {'p95 ms':>8} {'mean ms':>8} {'LLM calls/request':>18}")
+    with TestClient(app) as client:
+        results = {}
+        for enabled in (False, True):
+            settings.NL_RULE_PARSER = enabled
+            calls, latencies = model.calls, []
+            for query in queries:
+                started = time.perf_counter()
+                response = client.post(f"/agents/{args.agent}/nl-filter", json={"query": query})
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+                results.setdefault(query, []).append(response.json())
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            print(f"{'on' if enabled else 'off':>7} {statistics.median(latencies) * 1000:>10.1f} "
+                  f"{p95 * 1000:>8.1f} {statistics.mean(latencies) * 1000:>8.1f} "
+                  f"{(model.calls - calls) / len(queries):>18.1f}")
+        stats = client.get("/nl-cache/parser-stats").json()
+
+    # Both runs counted LLM translations; only the parser-on run has local ones
+    print(f"served locally: {stats['served_locally']} of {len(queries)} parser-on requests "
+          f"({stats['served_locally'] / len(queries):.0%}), avg {stats['avg_local_ms']} ms "
+          f"vs {stats['avg_llm_ms']} ms per LLM translation, ~{stats['estimated_seconds_saved']} s saved")
+    same = all(all(r == runs[0] for r in runs) for runs in results.values())
+    print("results identical with and without the parser" if same else "RESULTS DIFFER with the parser")
+    if wrong or guessed or not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
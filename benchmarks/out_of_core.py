@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark the out-of-core analytics engine against the in-memory one.
+
+For each dataset size it writes a synthetic CSV, checks that both engines
+return identical models for every supported analytic (exactly: the
+out-of-core sums reproduce pandas' groupby summation bit for bit), and
+reports wall time and peak traced memory. Out-of-core peak memory should
+stay flat as the dataset grows, while the in-memory engine grows with it.
+
+    python -m benchmarks.out_of_core --rows 100000 400000 1600000 --budget-mb 64
+"""
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.core.config import settings
+from app.core import data
+from app.utils import analytics, out_of_core
+from app.utils.router_helpers import filter_entity_data
+from benchmarks.synthetic import synthetic_frame
+
+FILTERS = dict(year=None, month=None, week=None, day=None, range_days=None,
+               start_date=None, end_date=None)
+
+
+def in_memory_suite(entity_col, entity_id):
+    df, filters = filter_entity_data(data.get_df(), entity_col, entity_id, **FILTERS)
+    return {
+        "volume": analytics._get_transaction_volume_over_time(df, "monthly", filters),
+        "count": analytics._get_transaction_count_over_time(df, "daily", filters),
+        "average": analytics._get_average_transaction_over_time(df, "weekly", filters),
+        "segmentation": analytics._get_segmentation(df, filters, "customer_id", "Customer Segmentation"),
+        "top": analytics._get_top_entities(df, "amount", 10, filters, entity_col, "merchant_id"),
+        "outliers": analytics._get_transaction_outliers(df, filters, entity_col),
+    }
+
+
+def out_of_core_suite(entity_col, entity_id, budget_mb):
+    kw = dict(entity_id_col=entity_col, entity_id=entity_id, memory_budget_mb=budget_mb)
+    return {
+        "volume": out_of_core.get_transaction_volume_over_time("monthly", FILTERS, **kw),
+        "count": out_of_core.get_transaction_count_over_time("daily", FILTERS, **kw),
+        "average": out_of_core.get_average_transaction_over_time("weekly", FILTERS, **kw),
+        "segmentation": out_of_core.get_segmentation(FILTERS, "customer_id", "Customer Segmentation", **kw),
+        "top": out_of_core.get_top_entities("amount", 10, FILTERS, entity_col, "merchant_id",
+                                            entity_id=entity_id, memory_budget_mb=budget_mb),
+        "outliers": out_of_core.get_transaction_outliers(FILTERS, entity_col, entity_id=entity_id,
+                                                         memory_budget_mb=budget_mb),
+    }
+
+
+def measure(fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 400_000, 1_600_000])
+    parser.add_argument("--budget-mb", type=int, default=64)
+    parser.add_argument("--agent", default="A1")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'engine':>12} {'seconds':>9} {'peak MiB':>9}  parity")
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATA_DIR = Path(tmp)
+        for rows in args.rows:
+            synthetic_frame(rows).to_csv(settings.csv_path, index=False)
+
+            def load_and_run():
+                data.load_data()
+                return in_memory_suite("agent_id", args.agent)
+
+            expected, mem_s, mem_peak = measure(load_and_run)
+            actual, ooc_s, ooc_peak = measure(out_of_core_suite, "agent_id", args.agent, args.budget_mb)
+            mismatched = [k for k in expected if expected[k].model_dump() != actual[k].model_dump()]
+            parity = "identical" if not mismatched else f"MISMATCH: {', '.join(mismatched)}"
+
+            print(f"{rows:>10} {'in-memory':>12} {mem_s:>9.2f} {mem_peak:>9.1f}")
+            print(f"{rows:>10} {'out-of-core':>12} {ooc_s:>9.2f} {ooc_peak:>9.1f}  {parity}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Replay requests from the slow-request log (DATA_DIR/slow_requests.jsonl and
+its rotated files) and compare their stage timings with the logged ones.
+
+By default the app runs in-process on the dataset in DATA_DIR (point it at a
+copy of the production CSV to reproduce against the same data; the logged
+dataset row count is checked). With --base-url the requests go to a running
+server instead. NL routes call whatever LLM_PROVIDER is configured.
+
+    DATA_DIR=/path/to/prod-copy python -m benchmarks.replay_slow --top 10 --repeat 3
+    python -m benchmarks.replay_slow --log slow_requests.jsonl --route overview --base-url http://localhost:8000
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+
+
+def parse_server_timing(header: str) -> dict:
+    """{stage: ms} from a Server-Timing header."""
+    stages = {}
+    for metric in filter(None, (m.strip() for m in (header or "").split(","))):
+        name, *params = metric.split(";")
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "dur":
+                stages[name.strip()] = float(value)
+    return stages
+
+
+def replay(client, entry, repeat):
+    url = entry["path"] + (f"?{entry['query_string']}" if entry.get("query_string") else "")
+    durations, stages, status = [], {}, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if entry.get("body") is not None:
+            response = client.request(entry["method"], url, json=entry["body"])
+        else:
+            response = client.request(entry["method"], url)
+        durations.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        for name, ms in parse_server_timing(response.headers.get("server-timing")).items():
+            stages.setdefault(name, []).append(ms)
+    return statistics.median(durations), {k: statistics.median(v) for k, v in stages.items()}, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", type=Path, help="log file (default DATA_DIR/slow_requests.jsonl)")
+    parser.add_argument("--base-url", help="replay against a running server instead of in-process")
+    parser.add_argument("--top", type=int, default=20, help="replay the N slowest entries")
+    parser.add_argument("--route", help="only entries whose route or path matches this regex")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per entry; the median is reported")
+    parser.add_argument("--stages", type=int, default=4, help="largest logged stages to compare per entry")
+    args = parser.parse_args()
+
+    # Replays must not append to the log being replayed
+    os.environ["SLOW_REQUEST_MS"] = "0"
+    from app.core.slow_log import read_entries
+
+    entries = read_entries(args.log)
+    if args.route:
+        pattern = re.compile(args.route)
+        entries = [e for e in entries if pattern.search(e.get("route") or "") or pattern.search(e["path"])]
+    entries = sorted(entries, key=lambda e: e["duration_ms"], reverse=True)[:args.top]
+    if not entries:
+        raise SystemExit("No matching entries in the slow-request log")
+
+    if args.base_url:
+        import httpx
+        client = httpx.Client(base_url=args.base_url, timeout=None)
+    else:
+        from fastapi.testclient import TestClient
+        from app.main import app
+        client = TestClient(app)
+
+    with client:
+        dataset = None
+        if not args.base_url:
+            from app.core.data import get_dataset
+            dataset = get_dataset()
+
+        mismatched = 0
+        for entry in entries:
+            logged_rows = (entry.get("dataset") or {}).get("rows")
+            if dataset is not None and logged_rows is not None and logged_rows != len(dataset.df):
+                mismatched += 1
+            replay_ms, replay_stages, status = replay(client, entry, args.repeat)
+            query = f"?{entry['query_string']}" if entry.get("query_string") else ""
+            print(f"\n{entry['method']} {entry['path']}{query}  [{entry['ts']}]")
+            print(f"  {'total':<44} logged {entry['duration_ms']:>10.1f} ms   replay {replay_ms:>10.1f} ms"
+                  f"   status {entry['status']} -> {status}")
+            logged_stages = sorted(entry.get("stages", []), key=lambda s: s["ms"], reverse=True)[:args.stages]
+            for stage in logged_stages:
+                replayed = replay_stages.get(stage["stage"])
+                replayed = f"{replayed:>10.1f} ms" if replayed is not None else f"{'-':>10}"
+                print(f"  {stage['stage']:<44} logged {stage['ms']:>10.1f} ms   replay {replayed}")
+
+    if mismatched:
+        print(f"\nWARNING: {mismatched} entries were logged against a dataset with a different row count")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Import cost of the app, from `python -X importtime -c "import app.main"`.
+
+Each run is a fresh interpreter. Reports the median cumulative import time of
+app.main, the packages that dominate it, and whether langchain / openai were
+imported at all (they should only load on the first NL request). With
+--first-nl it also times building the model and chains in the same process,
+i.e. the cost the first NL request now pays instead of every process start.
+
+    python -m benchmarks.startup --runs 5 --top 12
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+LAZY_PACKAGES = ("langchain", "langchain_core", "langchain_openai", "openai")
+
+FIRST_NL = """
+import time
+import app.main
+started = time.perf_counter()
+from app.chains.combined_extraction import combined_extraction_chain
+combined_extraction_chain._get()
+print(f"first-nl {time.perf_counter() - started:.6f}")
+"""
+
+
+def import_profile(env):
+    """({module: cumulative microseconds}, {top-level package: self microseconds}) for one import."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            env=env, capture_output=True, text=True, check=True)
+    cumulative, packages = {}, defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, module = int(match[1]), int(match[2]), match[3]
+        cumulative[module] = cumulative_us
+        packages[module.split(".")[0]] += self_us
+    return cumulative, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages to list by self import time")
+    parser.add_argument("--first-nl", action="store_true", help="also time the first model/chain build")
+    args = parser.parse_args()
+
+    # No API key or network needed: nothing LLM-related should run at import
+    env = {**os.environ, "LLM_PROVIDER": os.environ.get("LLM_PROVIDER", "openai"),
+           "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused")}
+    totals, package_runs, lazy_loaded = [], defaultdict(list), set()
+    for _ in range(args.runs):
+        cumulative, packages = import_profile(env)
+        totals.append(cumulative["app.main"] / 1e6)
+        for package, us in packages.items():
+            package_runs[package].append(us / 1e6)
+        lazy_loaded.update(p for p in LAZY_PACKAGES if p in cumulative)
+
+    print(f"import app.main   median {statistics.median(totals) * 1000:8.1f} ms   "
+          f"min {min(totals) * 1000:8.1f} ms   runs={args.runs}")
+    print(f"\n{'package':<24} {'self ms (median)':>16}")
+    ranked = sorted(package_runs.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for package, seconds in ranked[:args.top]:
+        print(f"{package:<24} {statistics.median(seconds) * 1000:>16.1f}")
+    print("\nLLM packages imported at startup:", ", ".join(sorted(lazy_loaded)) or "none")
+
+    if args.first_nl:
+        runs = []
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, "-c", FIRST_NL], env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            runs.append(float(out.split()[-1]))
+        print(f"first NL request  model + chain build  median {statistics.median(runs) * 1000:8.1f} ms")
+
+    if lazy_loaded:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Vectorised synthetic transactions generator.
+
+Writes the columns the routers read (transaction, customer, merchant,
+terminal, branch admin and agent IDs, customer and merchant names, amount,
+date, channel) at any size, deterministically: the same rows, seed and
+options always give the same file, however it is chunked, so benchmark runs
+on different machines compare like for like.
+
+Shape of the data:
+  - merchant sizes follow a power law (rank r gets weight r**-alpha): M1 is
+    the busiest merchant and most merchants are small. Merchants belong to
+    branch admins and branch admins to agents (skewed the same way), and
+    busier merchants run more terminals.
+  - customers are skewed too and mostly buy from a home merchant, so
+    (merchant, customer) pairs repeat.
+  - daily volume follows a yearly cycle peaking in December, a weekday shape
+    and steady growth; times of day use the business-hour weights of
+    update_dates_with_time.py.
+  - amounts are log-normal around a per-merchant ticket size.
+
+Rows come out in date order, built one day at a time and written in chunks
+of whole days, so memory is bounded by --chunk-rows rather than --rows.
+CSV goes through pyarrow's writer when pyarrow is installed (pandas'
+otherwise); Parquet needs pyarrow.
+
+    python -m benchmarks.synthetic --rows 10000000 --out data/transactions.csv
+    python -m benchmarks.synthetic --rows 100000000 --format parquet --out /tmp/transactions.parquet --seed 7
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["transaction_id", "customer_id", "customer_name", "merchant_id", "merchant_name",
+           "terminal_id", "branch_admin_id", "agent_id", "amount", "date", "channel"]
+CHANNELS = np.array(["POS", "Online", "Mobile"])
+CHANNEL_TICKET = np.array([1.0, 1.3, 0.8])  # amount multiplier per channel
+
+# 00:00 .. 23:00, as in update_dates_with_time.py
+HOUR_WEIGHTS = np.array([0.5, 0.3, 0.2, 0.1, 0.1, 0.2, 0.5, 1.0, 3.0, 4.0, 5.0, 5.5,
+                         6.0, 5.5, 5.0, 4.5, 4.0, 4.5, 5.0, 4.0, 3.0, 2.0, 1.5, 1.0])
+CHANNEL_CDF = np.array([0.55, 0.80, 1.0])  # POS 55%, Online 25%, Mobile 20%
+WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 1.02, 1.05, 1.15, 1.1, 0.75])  # Monday first
+HOUR_CDF = np.cumsum(HOUR_WEIGHTS) / HOUR_WEIGHTS.sum()
+
+
+@dataclass
+class Options:
+    rows: int
+    seed: int = 0
+    start: str = "2022-01-01"
+    days: int = 3 * 365
+    merchants: Optional[int] = None       # default: one per 2,000 rows
+    customers: Optional[int] = None       # default: one per 40 rows
+    branch_admins: Optional[int] = None   # default: one per 10 merchants
+    agents: Optional[int] = None          # default: one per 10 branch admins
+    merchant_alpha: float = 1.1           # power-law exponent of merchant sizes
+    customer_alpha: float = 0.5
+    loyalty: float = 0.7                  # share of purchases made at the customer's home merchant
+    seasonality: float = 0.25             # amplitude of the yearly cycle
+    growth: float = 0.2                   # yearly volume growth
+
+    def __post_init__(self):
+        self.merchants = self.merchants or max(20, self.rows // 2_000)
+        self.customers = self.customers or max(100, self.rows // 40)
+        self.branch_admins = self.branch_admins or max(2, self.merchants // 10)
+        self.agents = self.agents or max(2, self.branch_admins // 10)
+
+
+def _cdf(weights: np.ndarray) -> np.ndarray:
+    cdf = np.cumsum(weights, dtype=np.float64)
+    return cdf / cdf[-1]
+
+
+def _draw(rng: np.random.Generator, cdf: np.ndarray, n: int) -> np.ndarray:
+    """n indices drawn with the probabilities the cdf encodes."""
+    return np.minimum(np.searchsorted(cdf, rng.random(n), side="right"), len(cdf) - 1)
+
+
+def _labels(prefix: str, n: int) -> np.ndarray:
+    return np.char.add(prefix, np.arange(1, n + 1).astype(str)).astype(object)
+
+
+class _Structure:
+    """Entities and their fixed attributes, drawn once per seed."""
+
+    def __init__(self, opts: Options):
+        rng = np.random.default_rng([opts.seed, 0])
+        ranks = np.arange(1, opts.merchants + 1)
+        share = ranks ** -opts.merchant_alpha
+        share /= share.sum()
+        self.merchant_cdf = _cdf(share)
+        self.customer_cdf = _cdf(np.arange(1, opts.customers + 1) ** -opts.customer_alpha)
+        self.home_merchant = _draw(rng, self.merchant_cdf, opts.customers)
+
+        agent_of_branch = _draw(rng, _cdf(np.arange(1, opts.agents + 1) ** -1.0), opts.branch_admins)
+        self.branch = rng.integers(0, opts.branch_admins, opts.merchants)
+        self.agent = agent_of_branch[self.branch]
+
+        terminals = 1 + np.minimum(rng.poisson(share * opts.rows / 20_000), 99)
+        self.terminal_offset = np.concatenate(([0], np.cumsum(terminals)[:-1]))
+        self.terminal_count = terminals
+        self.ticket = rng.lognormal(np.log(45.0), 0.7, opts.merchants)
+
+        merchant_of_terminal = np.repeat(np.arange(opts.merchants), terminals)
+        terminal_no = np.arange(terminals.sum()) - self.terminal_offset[merchant_of_terminal] + 1
+        self.labels = {
+            "customer_id": _labels("C", opts.customers),
+            "customer_name": _labels("Customer ", opts.customers),
+            "merchant_id": _labels("M", opts.merchants),
+            "merchant_name": _labels("Merchant ", opts.merchants),
+            "terminal_id": np.char.add(np.char.add("TM", (merchant_of_terminal + 1).astype(str)),
+                                       np.char.add("-", terminal_no.astype(str))).astype(object),
+            "branch_admin_id": _labels("B", opts.branch_admins),
+            "agent_id": _labels("A", opts.agents),
+            "channel": CHANNELS.astype(object),
+        }
+
+
+def _day_counts(opts: Options) -> np.ndarray:
+    """Rows per day: seasonal, weekday and growth shape with day-to-day noise."""
+    rng = np.random.default_rng([opts.seed, 1])
+    dates = pd.date_range(opts.start, periods=opts.days, freq="D")
+    t = np.arange(opts.days)
+    weights = (
+        (1 + opts.seasonality * np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 350) / 365.25))
+        * WEEKDAY_WEIGHTS[dates.dayofweek.to_numpy()]
+        * (1 + opts.growth) ** (t / 365.25)
+        * rng.gamma(50.0, 1 / 50.0, opts.days)
+    )
+    return rng.multinomial(opts.rows, weights / weights.sum())
+
+
+def _day(opts: Options, structure: _Structure, day: int, n: int) -> Dict[str, np.ndarray]:
+    """Codes and values of one day's n rows, from that day's own random stream."""
+    rng = np.random.default_rng([opts.seed, 2, day])
+    customer = _draw(rng, structure.customer_cdf, n)
+    merchant = np.where(rng.random(n) < opts.loyalty,
+                        structure.home_merchant[customer], _draw(rng, structure.merchant_cdf, n))
+    terminal = structure.terminal_offset[merchant] + (
+        rng.random(n) * structure.terminal_count[merchant]).astype(np.int64)
+    channel = _draw(rng, CHANNEL_CDF, n)
+    amount = structure.ticket[merchant] * CHANNEL_TICKET[channel] * rng.lognormal(0.0, 0.6, n)
+    seconds = np.sort(_draw(rng, HOUR_CDF, n) * 3600 + rng.integers(0, 3600, n))
+    return {
+        "customer_id": customer,
+        "merchant_id": merchant,
+        "terminal_id": terminal,
+        "branch_admin_id": structure.branch[merchant],
+        "agent_id": structure.agent[merchant],
+        "channel": channel,
+        "amount": np.maximum(amount, 0.5).round(2),
+        "seconds": day * 86_400 + seconds,
+    }
+
+
+def _chunks(opts: Options, structure: _Structure, chunk_rows: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Row codes and values in runs of whole days, about chunk_rows rows each."""
+    pending, pending_rows = [], 0
+    counts = _day_counts(opts)
+    for day, n in enumerate(counts):
+        if n:
+            pending.append(_day(opts, structure, day, int(n)))
+            pending_rows += int(n)
+        if pending and (pending_rows >= chunk_rows or day == len(counts) - 1):
+            yield {k: np.concatenate([p[k] for p in pending]) for k in pending[0]}
+            pending, pending_rows = [], 0
+
+
+def _codes(parts: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Label column -> codes into structure.labels."""
+    return {
+        "customer_id": parts["customer_id"], "customer_name": parts["customer_id"],
+        "merchant_id": parts["merchant_id"], "merchant_name": parts["merchant_id"],
+        **{k: parts[k] for k in ("terminal_id", "branch_admin_id", "agent_id", "channel")},
+    }
+
+
+def generate_frames(opts: Options, chunk_rows: int = 2_000_000) -> Iterator[pd.DataFrame]:
+    """The dataset as DataFrames (categorical ID columns), about chunk_rows rows each."""
+    structure = _Structure(opts)
+    start = np.datetime64(opts.start, "s")
+    first_row = 0
+    for parts in _chunks(opts, structure, chunk_rows):
+        n = len(parts["amount"])
+        columns = {k: pd.Categorical.from_codes(v, structure.labels[k]) for k, v in _codes(parts).items()}
+        columns["transaction_id"] = "T" + pd.RangeIndex(first_row, first_row + n).astype(str)
+        columns["amount"] = parts["amount"]
+        columns["date"] = start + parts["seconds"].astype("timedelta64[s]")
+        yield pd.DataFrame(columns, columns=COLUMNS)
+        first_row += n
+
+
+def synthetic_frame(rows: int, seed: int = 0, **options) -> pd.DataFrame:
+    """A whole synthetic dataset in memory; see Options for the knobs."""
+    frames = list(generate_frames(Options(rows, seed, **options), chunk_rows=max(rows, 1)))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+# ─── Writers ───────────────────────────────────────────────────────────────
+def _generate_tables(opts: Options, chunk_rows: int, dictionary: bool):
+    """The dataset as Arrow tables, built from the codes without going through pandas."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    structure = _Structure(opts)
+    labels = {k: pa.array(v, pa.string()) for k, v in structure.labels.items()}
+    start = np.datetime64(opts.start, "s")
+    first_row = 0
+    for parts in _chunks(opts, structure, chunk_rows):
+        n = len(parts["amount"])
+        columns = {}
+        for k, codes in _codes(parts).items():
+            codes = pa.array(codes.astype(np.int32))
+            columns[k] = (pa.DictionaryArray.from_arrays(codes, labels[k]) if dictionary
+                          else labels[k].take(codes))
+        ids = pa.array(np.arange(first_row, first_row + n)).cast(pa.string())
+        columns["transaction_id"] = pc.binary_join_element_wise("T", ids, "")
+        columns["amount"] = pa.array(parts["amount"])
+        columns["date"] = pa.array(start + parts["seconds"].astype("timedelta64[s]"))
+        yield pa.table({k: columns[k] for k in COLUMNS})
+        first_row += n
+
+
+def write(path: Path, opts: Options, fmt: str = "csv", chunk_rows: int = 2_000_000) -> int:
+    """Stream the dataset to path as CSV or Parquet; returns the rows written."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        if fmt == "parquet":
+            raise SystemExit("Parquet output needs pyarrow; install it with `pip install pyarrow`")
+        chunks = generate_frames(opts, chunk_rows)
+    else:
+        chunks = _generate_tables(opts, chunk_rows, dictionary=fmt == "parquet")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written, writer = 0, None
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, pd.DataFrame):
+                chunk.to_csv(path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+            else:
+                if writer is None:
+                    writer = _arrow_writer(path, chunk.schema, fmt)
+                writer.write_table(chunk)
+            written += len(chunk)
+            print(f"  {written:>12,} rows", end="\r", flush=True)
+    finally:
+        if writer is not None:
+            writer.close()
+    print()
+    return written
+
+
+def _arrow_writer(path: Path, schema, fmt: str):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema)
+    import pyarrow.csv as pacsv
+    # No value contains a comma, quote or newline, so nothing needs quoting
+    return pacsv.CSVWriter(path, schema, write_options=pacsv.WriteOptions(quoting_style="none"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", type=Path, default=Path("data/transactions.csv"))
+    parser.add_argument("--format", choices=["csv", "parquet"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2022-01-01", help="first day")
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--merchants", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--branch-admins", type=int)
+    parser.add_argument("--agents", type=int)
+    parser.add_argument("--chunk-rows", type=int, default=2_000_000,
+                        help="rows per write; bounds memory, does not change the output")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.out.suffix == ".parquet" else "csv")
+    opts = Options(args.rows, args.seed, start=args.start, days=args.days, merchants=args.merchants,
+                   customers=args.customers, branch_admins=args.branch_admins, agents=args.agents)
+    started = time.perf_counter()
+    rows = write(args.out, opts, fmt, args.chunk_rows)
+    elapsed = time.perf_counter() - started
+    print(f"{rows:,} rows -> {args.out} ({fmt}, {args.out.stat().st_size / 2**20:,.1f} MiB) "
+          f"in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"merchants {opts.merchants:,}  customers {opts.customers:,}  "
+          f"branch admins {opts.branch_admins:,}  agents {opts.agents:,}  seed {opts.seed}")
+
+
+if __name__ == "__main__":
+    main()
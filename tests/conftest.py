@@ -0,0 +1,39 @@
+"""
+Shared fixtures: a small synthetic dataset written to a temporary DATA_DIR,
+and an API client serving it.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import data
+from app.core.config import settings
+from app.main import app
+from benchmarks.synthetic import synthetic_frame
+
+ROWS = 20_000
+
+
+@pytest.fixture
+def transactions(tmp_path, monkeypatch):
+    """
+    The dataset as written to CSV_PATH: synthetic rows shuffled out of date
+    order, with a few missing dates and amounts. Nothing is loaded yet.
+    """
+    rng = np.random.default_rng(0)
+    frame = synthetic_frame(ROWS, seed=3)
+    frame = frame.iloc[rng.permutation(len(frame))].reset_index(drop=True)
+    frame.loc[rng.choice(np.arange(1, len(frame)), 40, replace=False), "date"] = None
+    frame.loc[rng.choice(len(frame), 40, replace=False), "amount"] = None
+
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(settings, "AUTO_RELOAD", False)
+    monkeypatch.setattr(data, "_current", None)
+    frame.to_csv(settings.csv_path, index=False)
+    return frame
+
+
+@pytest.fixture
+def client(transactions):
+    with TestClient(app) as client:
+        yield client
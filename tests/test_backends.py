@@ -0,0 +1,87 @@
+"""Every query backend must filter and aggregate exactly like the pandas one."""
+import pytest
+
+from app.backends import BACKENDS, get_backend
+from app.core import data
+
+FILTERS = [
+    {"column": "merchant_id", "operator": "equals", "value": "M1"},
+    {"column": "amount", "operator": "greater_than", "value": 100},
+    {"column": "amount", "operator": "less_than_equals", "value": 12.5},
+    {"column": "amount", "operator": "between", "value": [10, 50]},
+    {"column": "amount", "operator": "not_equals", "value": 45.0},
+    {"column": "date", "operator": "greater_than_equals", "value": "2023-06-01"},
+    {"column": "channel", "operator": "in", "value": ["POS", "Mobile"]},
+    {"column": "channel", "operator": "not_in", "value": ["POS"]},
+    {"and": [
+        {"column": "channel", "operator": "equals", "value": "Online"},
+        {"or": [
+            {"column": "amount", "operator": "greater_than", "value": 80},
+            {"not": {"column": "merchant_id", "operator": "in", "value": ["M1", "M2"]}},
+        ]},
+    ]},
+    {"and": []},
+    {"or": []},
+    # Type mismatches: pandas finds nothing equal rather than failing
+    {"column": "amount", "operator": "equals", "value": "abc"},
+    {"column": "customer_id", "operator": "equals", "value": 5},
+    {"column": "customer_id", "operator": "not_equals", "value": 5},
+    {"column": "merchant_id", "operator": "in", "value": ["M1", 2, "M3"]},
+    {"column": "amount", "operator": "not_in", "value": ["abc", 45.0]},
+    {"column": "amount", "operator": "equals", "value": None},
+]
+
+DATE_FILTERS = [
+    {"year": 2023},
+    {"year": 2022, "month": 12},
+    {"week": 10},
+    {"day": 31},
+    {"start_date": "2023-02-01", "end_date": "2023-03-15"},
+]
+
+AGGREGATIONS = {
+    "name": ("customer_name", "first"),
+    "transactions": ("amount", "count"),
+    "customers": ("customer_id", "nunique"),
+    "largest": ("amount", "max"),
+}
+
+
+@pytest.fixture
+def frame(transactions):
+    df = data.load_data().copy()
+    df.loc[::7, "customer_name"] = None     # so "first" has to skip nulls
+    return df
+
+
+@pytest.fixture(params=[name for name in BACKENDS if name != "pandas"])
+def backend(request):
+    pytest.importorskip(request.param)
+    return get_backend(request.param)
+
+
+@pytest.mark.parametrize("filter_obj", FILTERS)
+def test_filter_mask(frame, backend, filter_obj):
+    expected = get_backend("pandas").filter_mask(frame, filter_obj)
+    assert backend.filter_mask(frame, filter_obj).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("op", ["greater_than", "less_than_equals", "between"])
+def test_ordering_against_incomparable_value_is_rejected(frame, backend, op):
+    filter_obj = {"column": "amount", "operator": op, "value": ["a", "z"] if op == "between" else "abc"}
+    for engine in (get_backend("pandas"), backend):
+        with pytest.raises(ValueError):
+            engine.filter_mask(frame, filter_obj)
+
+
+@pytest.mark.parametrize("filters", DATE_FILTERS)
+def test_date_filters(frame, backend, filters):
+    expected = get_backend("pandas").apply_date_filters(frame, **filters)
+    assert backend.apply_date_filters(frame, **filters).index.tolist() == expected.index.tolist()
+
+
+@pytest.mark.parametrize("keys", [["merchant_id"], ["agent_id", "channel"]])
+def test_aggregate(frame, backend, keys):
+    expected = get_backend("pandas").aggregate(frame, keys, AGGREGATIONS)
+    actual = backend.aggregate(frame, keys, AGGREGATIONS)
+    assert actual.to_dict(orient="list") == expected.to_dict(orient="list")
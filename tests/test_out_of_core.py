@@ -0,0 +1,54 @@
+"""The out-of-core engine must answer exactly like the in-memory one."""
+import pytest
+
+from app.core import data
+from app.core.config import settings
+
+COVERED = [
+    "/merchants/M1/transaction-volume?granularity=weekly",
+    "/merchants/M2/transaction-count?granularity=daily",
+    "/merchants/M1/average-transactions?granularity=monthly&year=2023",
+    "/merchants/M3/segmentation",
+    "/merchants/M1/top-customers?mode=amount&limit=5",
+    "/merchants/M2/transaction-outliers?month=12",
+    "/agents/A1/transaction-volume?granularity=yearly",
+    "/agents/A2/average-transactions?granularity=weekly&start_date=2023-03-01&end_date=2023-09-30",
+    "/agents/A1/customer-segmentation?year=2022",
+    "/agents/A1/merchant-segmentation",
+    "/agents/A2/top-merchants?mode=count&limit=3",
+    "/agents/A1/top-customers?mode=count&limit=10",
+    "/agents/A1/transaction-outliers",
+    "/terminals/TM1-1/transaction-count?granularity=monthly",
+    "/terminals/TM1-1/top-customers?mode=amount",
+    "/branch-admins/B1/segmentation?week=10",
+    "/branch-admins/B1/transaction-outliers?year=2024",
+    "/merchants/M404/transaction-volume?granularity=monthly",
+    "/merchants/M1/segmentation?year=1999",
+]
+
+
+def _responses(client, paths):
+    responses = [client.get(path) for path in paths]
+    return [(r.status_code, r.json()) for r in responses]
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_out_of_core_matches_in_memory(client, monkeypatch, partitioned):
+    monkeypatch.setattr(settings, "PARTITIONED_STORAGE", partitioned)
+    data.load_data()            # also writes the partitions the stream reads when enabled
+    assert (settings.partitions_dir / "manifest.json").exists() == partitioned
+    expected = _responses(client, COVERED)
+    assert [status for status, _ in expected].count(200) == len(COVERED) - 2
+
+    monkeypatch.setattr(settings, "OUT_OF_CORE_THRESHOLD_MB", 1)
+    monkeypatch.setattr(settings, "OUT_OF_CORE_MEMORY_MB", 1)   # many chunks
+    monkeypatch.setattr(data, "_current", None)
+    assert data.serves_out_of_core()
+    assert _responses(client, COVERED) == expected
+    assert data.loaded_dataset() is None
+
+
+def test_uncovered_endpoints_need_the_dataset_in_memory(client, monkeypatch):
+    monkeypatch.setattr(settings, "OUT_OF_CORE_THRESHOLD_MB", 1)
+    assert client.get("/merchants/M1/stats").status_code == 503
+    assert client.get("/merchants/M1/segmentation").status_code == 200
@@ -0,0 +1,19 @@
+"""Days-between pages must add up to the unpaginated records, within one dataset generation."""
+from app.core import data
+
+PATH = "/merchants/M1/days-between-transactions"
+
+
+def test_pages_cover_the_records_and_expire_on_reload(client):
+    expected = client.get(PATH).json()["data"]
+    records, page = [], client.get(f"{PATH}?limit=700").json()["data"]
+    records += page["records"]
+    cursor = page["next_after"]
+    while page["next_after"]:
+        page = client.get(f"{PATH}?limit=700&after={page['next_after']}").json()["data"]
+        records += page["records"]
+    assert records == expected
+
+    assert client.get(f"{PATH}?limit=700&after=12").status_code == 400
+    data.load_data()
+    assert client.get(f"{PATH}?limit=700&after={cursor}").status_code == 409
@@ -0,0 +1,46 @@
+"""The day rollup must answer like the transaction rows, undated rows included."""
+from app.core import data
+from app.core.config import settings
+
+GETS = [
+    "/merchants/M1/stats",
+    "/merchants/M2/stats?year=2023",
+    "/merchants/M3/stats?week=10",
+    "/agents/A1/stats",
+    "/agents/A2/stats?start_date=2023-03-01&end_date=2023-09-30",
+    "/merchants/M1/transaction-volume?granularity=weekly",
+    "/merchants/M2/transaction-count?granularity=daily&year=2024",
+    "/agents/A1/transaction-volume?granularity=yearly",
+    "/merchants/M1/overview?fields=stats,transaction_count",
+    "/merchants/M1/window-stats?window_days=90&windows=4",
+]
+BATCH = {"merchant_ids": ["M1", "M2", "M3"], "metrics": ["stats", "transaction_count"]}
+
+
+def _responses(client):
+    responses = [client.get(path) for path in GETS]
+    responses += [client.post(f"/merchants/batch{query}", json=BATCH) for query in ("", "?year=2023")]
+    return [(r.status_code, r.json()) for r in responses]
+
+
+def test_rollup_matches_rows_with_missing_dates(client, transactions, monkeypatch):
+    assert transactions.loc[transactions["merchant_id"] == "M1", "date"].isna().any()
+
+    monkeypatch.setattr(settings, "DAY_ROLLUP", False)
+    data.load_data()
+    expected = _responses(client)
+    assert all(status == 200 for status, _ in expected)
+
+    monkeypatch.setattr(settings, "DAY_ROLLUP", True)
+    data.load_data()
+    assert data.get_dataset().day_rollup("merchant_id") is not None
+    assert _responses(client) == expected
+
+
+def test_window_stats_bounds(client):
+    data.load_data()
+    response = client.get("/merchants/M1/window-stats?window_days=3660&step_days=3660&windows=3660")
+    assert response.status_code == 400
+    assert "windows, step_days and window_days" in response.json()["detail"]
+    assert client.get("/merchants/M1/window-stats?end_date=soon").status_code == 400
+    assert client.get("/merchants/M1/window-stats?end_date=1678-01-01&window_days=365").status_code == 400
@@ -6,11 +6,9 @@ This will modify dates from YYYY-MM-DD format to YYYY-MM-DD HH:MM:SS format
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, time
-import random
 
-def generate_realistic_time():
-    """Generate realistic transaction times with business hour bias"""
+def generate_realistic_times(n):
+    """Generate n realistic transaction times with business hour bias"""
     # Weight towards business hours (8 AM to 8 PM)
     hour_weights = [
         0.5,  # 00:00 - very low
@@ -39,14 +37,13 @@ def generate_realistic_time():
         1.0,  # 23:00 - low
     ]
     
-    # Choose hour based on weights
-    hour = np.random.choice(24, p=np.array(hour_weights) / sum(hour_weights))
+    # Choose hours based on weights, all rows at once
+    hours = np.random.choice(24, size=n, p=np.array(hour_weights) / sum(hour_weights))
     
     # Generate random minutes and seconds
-    minute = random.randint(0, 59)
-    second = random.randint(0, 59)
+    seconds = hours * 3600 + np.random.randint(0, 3600, size=n)
     
-    return f"{hour:02d}:{minute:02d}:{second:02d}"
+    return pd.to_timedelta(seconds, unit="s")
 
 def update_csv_with_times():
     """Update the transactions.csv file to include time components"""
@@ -61,20 +58,16 @@ def update_csv_with_times():
     
     # Set random seed for reproducibility
     np.random.seed(42)
-    random.seed(42)
     
     print("Generating time components...")
     
-    # Generate time components for each transaction
-    times = []
-    for i in range(len(df)):
-        if i % 10000 == 0:
-            print(f"Processing transaction {i+1}/{len(df)}")
-        times.append(generate_realistic_time())
+    # Generate time components for every transaction in one vectorized draw
+    times = generate_realistic_times(len(df))
     
     # Combine date and time
     print("Combining dates with times...")
-    df['date'] = df['date'].astype(str) + ' ' + pd.Series(times)
+    dates = pd.to_datetime(df['date']).dt.normalize()
+    df['date'] = (dates + times).dt.strftime('%Y-%m-%d %H:%M:%S')
     
     print(f"Updated date format sample: {df['date'].head().tolist()}")
     